@@ -0,0 +1,95 @@
+"""
+Runs the loops of main_mock_pump.main() against the local backend stand-in and reports latency of each stage of the
+backend communication together with the number of requests received by the backend.
+
+Usage: python -m benchmarks.backend_latency --duration 30 --latency 0.05 --error-rate 0.05 --circuits 2 --push
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+from benchmarks.stand_in_server import StandInServer, StandInConfig
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Backend latency benchmark')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--latency-jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--access-token-lifetime', type=int, default=120)
+    parser.add_argument('--circuits', type=int, default=1)
+    parser.add_argument('--slots', type=int, default=96)
+    parser.add_argument('--churn-interval', type=float, default=10)
+    parser.add_argument('--push', action='store_true', help='receive schedule changes through the push channel')
+
+    return parser.parse_args()
+
+
+def prepare_environment(server: StandInServer, workdir: str, circuits: int, push: bool) -> None:
+    """
+    Points the settings at the stand-in and a fresh local database. It has to be called before importing modules that
+    read the settings.
+    """
+    db_path = os.path.join(workdir, 'db.sqlite3')
+    with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+        connection.executescript(f.read())
+
+    os.environ.update({
+        'EMAIL': server.config.email,
+        'PASSWORD': server.config.password,
+        'DB_NAME': db_path,
+        'ML_PER_SECOND': '1000',
+        'BACKEND_URL': server.url,
+        'TOKEN_CACHE': os.path.join(workdir, 'tokens.json'),
+        'PUMPS': ','.join('{0}:0'.format(circuit_id) for circuit_id in range(1, circuits + 1)),
+        'PUSH_UPDATES': 'true' if push else ''
+    })
+    os.chdir(workdir)
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = StandInServer(StandInConfig(latency=args.latency, latency_jitter=args.latency_jitter,
+                                         error_rate=args.error_rate, access_token_lifetime=args.access_token_lifetime,
+                                         circuits=args.circuits, slots=args.slots,
+                                         churn_interval=args.churn_interval))
+    await server.start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_environment(server, workdir, args.circuits, args.push)
+
+        import main_mock_pump
+        from data.smart_garden.transport import LatencyRecorder
+
+        latency_recorder = LatencyRecorder()
+        try:
+            await asyncio.wait_for(main_mock_pump.main(latency_recorder), args.duration)
+        except asyncio.TimeoutError:
+            pass
+
+    await server.stop()
+
+    print('\nclient side latency per stage ({0:.0f} s run)'.format(args.duration))
+    print('{0:<40} {1:>8} {2:>10} {3:>10}'.format('endpoint', 'requests', 'avg ms', 'max ms'))
+    for endpoint, stats in sorted(latency_recorder.endpoints.items()):
+        print('{0:<40} {1:>8} {2:>10.1f} {3:>10.1f}'.format(endpoint, stats.count, stats.average * 1000,
+                                                             stats.max * 1000))
+
+    print('\nconnections created: {0}, reused: {1}'.format(latency_recorder.connections_created,
+                                                          latency_recorder.connections_reused))
+    print('requests received by the backend: {0}'.format(sum(server.requests.values())))
+    for path, count in sorted(server.requests.items()):
+        print('    {0:<36} {1:>8}'.format(path, count))
+    print('circuit changes pushed: {0}'.format(server.pushed_events))
+    print('health checks received: {0}'.format(server.health_checks))
+    print('execution logs received: {0}'.format(sum(len(logs) for logs in server.execution_logs.values())))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,96 @@
+"""
+Measures how long the event loop is blocked while pump activations are written to the local database, once with the
+DAO methods called directly on the event loop and once through the database thread. The lag is measured by a task
+that keeps sleeping for a millisecond and records how late it wakes up.
+
+Usage: python -m benchmarks.db_stall --writes 200
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from functools import partial
+from typing import Tuple
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Event loop stalls caused by database writes')
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--db', help='database file, a temporary one is created if it is not specified')
+
+    return parser.parse_args()
+
+
+async def measure_lag(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run_writes(write, writes: int) -> Tuple[float, float]:
+    """
+    Runs the writes while the lag is measured.
+    :return: maximum lag and total duration in seconds
+    """
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.ensure_future(measure_lag(stop, lags))
+
+    start = time.perf_counter()
+    for i in range(writes):
+        await write(i)
+        await asyncio.sleep(0)
+    duration = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+
+    return max(lags), duration
+
+
+async def run(args: argparse.Namespace) -> None:
+    from data.db.db_common import database
+    from data.db.model import PumpActivationEntity
+    from data.db.pump_activation_dao import PumpActivationDao
+
+    dao = PumpActivationDao(database=database)
+    timestamps = itertools.count(1590969600)
+
+    def entity(i: int) -> PumpActivationEntity:
+        return PumpActivationEntity(timestamp=next(timestamps), amount=i, circuit_id=1)
+
+    async def write_on_loop(i: int) -> None:
+        database.execute(partial(PumpActivationDao.store.__wrapped__, dao, entity(i)))
+
+    async def write_in_thread(i: int) -> None:
+        await dao.store(entity(i))
+
+    print('{0:<22} {1:>12} {2:>14}'.format('mode', 'max lag ms', 'writes/s'))
+    for name, write in (('on the event loop', write_on_loop), ('database thread', write_in_thread)):
+        lag, duration = await run_writes(write, args.writes)
+        print('{0:<22} {1:>12.1f} {2:>14.0f}'.format(name, lag * 1000, args.writes / duration))
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = args.db or os.path.join(workdir, 'db.sqlite3')
+        if not args.db:
+            with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+                connection.executescript(f.read())
+
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
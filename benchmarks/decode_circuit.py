@@ -0,0 +1,55 @@
+"""
+Compares the fast circuit decoder with marshmallow schemas on circuits with different number of schedule slots.
+
+Usage: python -m benchmarks.decode_circuit
+"""
+import timeit
+
+from data.smart_garden.decoder import PayloadDecoder
+
+SLOT_COUNTS = (10, 100, 500, 1000)
+
+
+def build_payload(slots: int) -> dict:
+    """
+    Builds a circuit payload similar to the one returned by the backend.
+    :param slots: number of schedule slots
+    :return: decoded JSON payload
+    """
+    return {
+        'id': 1,
+        'name': 'greenhouse',
+        'active': True,
+        'healthy': True,
+        'one_time_activation': None,
+        'today_one_time_activations': [{'timestamp': '2020-06-01T12:00:00', 'amount': 100}],
+        'schedule': [
+            {
+                'id': i,
+                'time': '{0:02d}:{1:02d}:{2:02d}'.format(i // 3600 % 24, i // 60 % 60, i % 60),
+                'amount': 50 + i % 7,
+                'active': i % 5 != 0
+            } for i in range(slots)
+        ]
+    }
+
+
+def main() -> None:
+    fast = PayloadDecoder()
+    strict = PayloadDecoder(strict=True)
+
+    print('{0:>6} {1:>14} {2:>14} {3:>9}'.format('slots', 'marshmallow', 'fast', 'speedup'))
+    for slots in SLOT_COUNTS:
+        payload = build_payload(slots)
+        assert fast.decode_circuit(payload) == strict.decode_circuit(payload)
+
+        number = max(10, 20000 // slots)
+        strict_time = min(timeit.repeat(lambda: strict.decode_circuit(payload), number=number, repeat=5)) / number
+        fast_time = min(timeit.repeat(lambda: fast.decode_circuit(payload), number=number, repeat=5)) / number
+
+        print('{0:>6} {1:>11.1f} us {2:>11.1f} us {3:>8.1f}x'.format(
+            slots, strict_time * 1e6, fast_time * 1e6, strict_time / fast_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Drives pulses of a flow sensor through gpiozero's mock pin factory as fast as possible and compares counting them with
+FlowSensor, which counts in the edge callback of the pin, and with an event handler of a DigitalInputDevice. For both
+the benchmark reports the pulse rate, which includes the cost of the mock pin. Then it doses water with a pump and the
+flow sensor at the maximum pulse rate and reports how many pulses the pump overshot the target by.
+
+Usage: python -m benchmarks.flow_sensor --pulses 200000
+"""
+import argparse
+import threading
+import time
+
+from gpiozero import Device, DigitalInputDevice
+from gpiozero.pins.mock import MockFactory
+
+from device.flow_sensor import FlowSensor
+from device.pump import Pump
+
+SENSOR_PIN = 27
+PUMP_PIN = 17
+PULSES_PER_LITRE = 450.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Pulse counting of the flow sensor with mock pins')
+    parser.add_argument('--pulses', type=int, default=200000)
+    parser.add_argument('--doses', type=int, default=20)
+
+    return parser.parse_args()
+
+
+def drive(pin, pulses: int) -> None:
+    for _ in range(pulses):
+        pin.drive_low()
+        pin.drive_high()
+
+
+def measure(name: str, pin, pulses: int, counted) -> None:
+    start = time.perf_counter()
+    drive(pin, pulses)
+    duration = time.perf_counter() - start
+    # the mock pin keeps the history of its states
+    pin.clear_states()
+
+    print('{0:<36} {1:>12.0f} {2:>10}'.format(name, pulses / duration, counted()))
+
+
+def main() -> None:
+    args = parse_args()
+    Device.pin_factory = MockFactory()
+    pin = Device.pin_factory.pin(SENSOR_PIN)
+
+    print('{0:<36} {1:>12} {2:>10}'.format('counter', 'pulses/s', 'counted'))
+
+    sensor = FlowSensor(SENSOR_PIN, PULSES_PER_LITRE)
+    measure('FlowSensor, pin edge callback', pin, args.pulses, lambda: sensor.pulses)
+    sensor.close()
+
+    # the pin is pulled up, so the rising edge deactivates the device
+    device = DigitalInputDevice(SENSOR_PIN, pull_up=True)
+    count = [0]
+
+    def deactivated():
+        count[0] += 1
+
+    device.when_deactivated = deactivated
+    measure('DigitalInputDevice.when_deactivated', pin, args.pulses, lambda: count[0])
+    device.close()
+
+    # the pulses are driven by a thread, like the callback thread of a real pin factory, while the pump is on
+    sensor = FlowSensor(SENSOR_PIN, PULSES_PER_LITRE)
+    pump = Pump(PUMP_PIN, flow_sensor=sensor)
+    output = Device.pin_factory.pin(PUMP_PIN)
+    overshoots = []
+    for dose in range(args.doses):
+        water = 100 + dose * 10
+        stop = threading.Event()
+
+        def flow():
+            while not stop.is_set():
+                if output.state:
+                    pin.drive_low()
+                    pin.drive_high()
+
+        thread = threading.Thread(target=flow)
+        thread.start()
+        start = sensor.pulses
+        pump.on_async(water)
+        while not output.state:
+            time.sleep(0)
+        while output.state:
+            time.sleep(0)
+        stop.set()
+        thread.join()
+        pin.clear_states()
+
+        overshoots.append(sensor.pulses - start - round(water * PULSES_PER_LITRE / 1000))
+
+    print('\nclosed-loop doses: {0}, overshoot in pulses: max {1}, total {2}'.format(
+        args.doses, max(overshoots), sum(overshoots)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares loading the whole activation history of a circuit with fetch() and walking it with history() and
+history_timestamps(). For every way the benchmark reports the duration, the peak of memory allocated while the history
+is processed (tracemalloc, measured in a separate pass) and, for the paginated ones, the slowest page, which shows that
+pages deep in the history are as fast as the first one.
+
+Usage: python -m benchmarks.history_query --activations 200000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Memory and time of walking the activation history')
+    parser.add_argument('--activations', type=int, default=200000, help='activations of the circuit')
+    parser.add_argument('--page-size', type=int, default=500)
+
+    return parser.parse_args()
+
+
+def generate_history(db_path: str, activations: int) -> None:
+    with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+        connection.executescript(f.read())
+        connection.executemany(
+            'INSERT INTO pump_activations (timestamp, amount, circuit_id) VALUES (?, ?, ?)',
+            ((1500000000 + i * 300, 50 + i % 7, 1) for i in range(activations)))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from data.db.db_common import database
+    from data.db.pump_activation_dao import PumpActivationDao
+    from data.pump_activation_repository import PumpActivationRepository
+
+    repository = PumpActivationRepository(PumpActivationDao(database=database), circuit_id=1)
+
+    async def load_all() -> int:
+        return sum(activation.amount for activation in await repository.fetch())
+
+    async def walk(iterator) -> int:
+        total = 0
+        async for _ in iterator:
+            total += 1
+        return total
+
+    slowest_page = [0.0]
+    fetch_page = repository.pump_activation_dao.fetch_page
+
+    async def timed_fetch_page(*a, **kw):
+        start = time.perf_counter()
+        page = await fetch_page(*a, **kw)
+        if not tracemalloc.is_tracing():
+            slowest_page[0] = max(slowest_page[0], time.perf_counter() - start)
+        return page
+
+    repository.pump_activation_dao.fetch_page = timed_fetch_page
+
+    print('{0:<22} {1:>10} {2:>14} {3:>16}'.format('query', 'time s', 'peak MiB', 'slowest page ms'))
+    # fetch() goes last, so garbage collection of the loaded history doesn't affect pages of the other ones
+    for name, query in (('history()', lambda: walk(repository.history(page_size=args.page_size))),
+                        ('history_timestamps()', lambda: walk(repository.history_timestamps(page_size=args.page_size))),
+                        ('fetch()', lambda: load_all())):
+        # tracing slows allocations down, so memory is measured in a separate pass
+        slowest_page[0] = 0.0
+        gc.collect()
+        start = time.perf_counter()
+        await query()
+        duration = time.perf_counter() - start
+
+        tracemalloc.start()
+        await query()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print('{0:<22} {1:>10.2f} {2:>14.1f} {3:>16}'.format(
+            name, duration, peak / 1024 / 1024, '{0:.1f}'.format(slowest_page[0] * 1000) if slowest_page[0] else '-'))
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'db.sqlite3')
+        generate_history(db_path, args.activations)
+
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
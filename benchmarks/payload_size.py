@@ -0,0 +1,88 @@
+"""
+Measures bytes on the wire of circuit fetches and batched execution log uploads for every encoding supported by the
+backend stand-in: plain JSON, gzip-compressed JSON, MessagePack and gzip-compressed MessagePack. The client always
+negotiates, the stand-in decides what is supported, so the fallbacks are exercised too. MessagePack profiles are
+skipped if msgpack is not installed.
+
+Usage: python -m benchmarks.payload_size
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from benchmarks.stand_in_server import StandInServer, StandInConfig
+from data.model.model import CircuitData
+from data.smart_garden.encoding import msgpack
+from data.smart_garden.smart_garden_backend import SmartGardenBackend
+from data.smart_garden.transport import LatencyRecorder, create_client_session
+from data.smart_garden.transport_config import TransportConfig
+from domain.model import PumpActivation
+
+SLOT_COUNTS = (24, 288, 1440)
+BATCH_SIZE = 50
+
+PROFILES = (
+    ('json', False, False),
+    ('json+gzip', True, False),
+    ('msgpack', False, True),
+    ('msgpack+gzip', True, True),
+)
+
+
+def build_batch(size: int) -> List[PumpActivation]:
+    start = datetime(2020, 6, 1)
+    return [PumpActivation(timestamp=(start + timedelta(minutes=5 * i)).strftime('%Y-%m-%dT%H:%M:%S'),
+                           amount=50 + i % 7) for i in range(size)]
+
+
+async def measure(slots: int, compression: bool, binary: bool) -> Tuple[int, int, CircuitData]:
+    """
+    Fetches the circuit twice, the first fetch negotiates encodings, and uploads a batch of execution logs.
+    :return: bytes of the second circuit response, bytes of the upload and the fetched circuit
+    """
+    server = StandInServer(StandInConfig(slots=slots, compression=compression, binary=binary))
+    await server.start()
+
+    config = TransportConfig()
+    async with create_client_session(config, LatencyRecorder()) as session:
+        backend = SmartGardenBackend(server.config.email, server.config.password, session,
+                                     transport_config=config, base_url=server.url)
+        await backend.fetch_circuit(1)
+        server.churn()
+
+        sent = server.bytes_sent
+        circuit = await backend.fetch_circuit(1)
+        circuit_bytes = server.bytes_sent - sent
+
+        received = server.bytes_received
+        await backend.send_execution_logs(build_batch(BATCH_SIZE), 1)
+        log_bytes = server.bytes_received - received
+
+    await server.stop()
+    assert len(server.execution_logs[1]) == BATCH_SIZE
+
+    return circuit_bytes, log_bytes, circuit
+
+
+async def run() -> None:
+    print('{0:>6} {1:<14} {2:>14} {3:>8} {4:>14} {5:>8}'.format(
+        'slots', 'encoding', 'circuit bytes', 'saved', 'log bytes', 'saved'))
+
+    for slots in SLOT_COUNTS:
+        baseline = None
+        for name, compression, binary in PROFILES:
+            if binary and msgpack is None:
+                print('{0:>6} {1:<14} skipped, msgpack is not installed'.format(slots, name))
+                continue
+
+            circuit_bytes, log_bytes, circuit = await measure(slots, compression, binary)
+            if baseline is None:
+                baseline = (circuit_bytes, log_bytes, circuit)
+            assert len(circuit.schedule) == len(baseline[2].schedule) == slots
+
+            print('{0:>6} {1:<14} {2:>14} {3:>7.0%} {4:>14} {5:>7.0%}'.format(
+                slots, name, circuit_bytes, 1 - circuit_bytes / baseline[0], log_bytes, 1 - log_bytes / baseline[1]))
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,123 @@
+"""
+Measures the local database after years of pump activations, before and after the retention is applied. The history
+is generated for the given number of years, circuits and daily slots, then the activations older than the retention
+period are compacted into daily rollups and the database is vacuumed. The benchmark reports the file size, the time of
+fetching the activation history and of the check done on every schedule tick, and the longest compaction step, which
+is how long the database thread is held by the retention at most.
+
+Usage: python -m benchmarks.retention --years 3 --slots 48
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, date, timedelta, timezone
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Database size and query time with and without the retention')
+    parser.add_argument('--years', type=int, default=3, help='years of generated history')
+    parser.add_argument('--slots', type=int, default=48, help='activations of every circuit per day')
+    parser.add_argument('--circuits', type=int, default=2)
+    parser.add_argument('--retention-days', type=int, default=90)
+
+    return parser.parse_args()
+
+
+def generate_history(db_path: str, args: argparse.Namespace) -> None:
+    """
+    Creates the database and fills it with activations of every circuit up to yesterday.
+    """
+    # timestamps are epochs of the local time taken as UTC, see map_timestamp_to_epoch()
+    today = datetime.combine(date.today(), datetime.min.time(), tzinfo=timezone.utc)
+    start = int(today.timestamp()) - args.years * 365 * 86400
+    step = 86400 // args.slots
+
+    with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+        connection.executescript(f.read())
+        connection.executemany(
+            'INSERT INTO pump_activations (timestamp, amount, circuit_id) VALUES (?, ?, ?)',
+            ((start + i * step, 50 + i % 7, circuit_id)
+             for i in range(args.years * 365 * args.slots) for circuit_id in range(1, args.circuits + 1)))
+
+
+async def measure(repository, label: str, db_path: str) -> None:
+    start = time.perf_counter()
+    history = await repository.fetch()
+    fetch_ms = (time.perf_counter() - start) * 1000
+
+    timestamp = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+    start = time.perf_counter()
+    for _ in range(100):
+        await repository.exists(timestamp)
+    exists_ms = (time.perf_counter() - start) * 10
+
+    size = sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix))
+    print('{0:<10} {1:>10.1f} {2:>12} {3:>10.1f} {4:>10.2f}'.format(
+        label, size / 1024 / 1024, len(history), fetch_ms, exists_ms))
+
+
+async def run(args: argparse.Namespace, db_path: str) -> None:
+    from data.db.db_common import database
+    from data.db.maintenance_dao import MaintenanceDao
+    from data.db.pump_activation_dao import PumpActivationDao
+    from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
+    from data.pump_activation_repository import PumpActivationRepository
+    from data.retention_repository import RetentionRepository
+
+    rollup_dao = PumpActivationRollupDao(database=database)
+    repository = PumpActivationRepository(PumpActivationDao(database=database), circuit_id=1, rollup_dao=rollup_dao)
+    retention_repository = RetentionRepository(rollup_dao, MaintenanceDao(database=database))
+
+    print('{0} years, {1} circuits, {2} activations per day, {3} days kept'.format(
+        args.years, args.circuits, args.slots, args.retention_days))
+    print('{0:<10} {1:>10} {2:>12} {3:>10} {4:>10}'.format('', 'size MiB', 'activations', 'fetch ms', 'exists ms'))
+    await measure(repository, 'raw', db_path)
+
+    cutoff = (datetime.combine(date.today(), datetime.min.time()) -
+              timedelta(days=args.retention_days)).strftime('%Y-%m-%dT%H:%M:%S')
+    steps = []
+    compacted = 0
+    start = time.perf_counter()
+    while True:
+        step_start = time.perf_counter()
+        count = await retention_repository.compact(cutoff)
+        if not count:
+            break
+        steps.append(time.perf_counter() - step_start)
+        compacted += count
+    compaction = time.perf_counter() - start
+
+    await measure(repository, 'compacted', db_path)
+    free_space = await retention_repository.free_space_ratio()
+
+    start = time.perf_counter()
+    await retention_repository.vacuum()
+    vacuum = time.perf_counter() - start
+    await measure(repository, 'vacuumed', db_path)
+
+    rollups = await repository.fetch_rollups()
+    print('compacted {0} activations into {1} rollups of the circuit in {2:.1f} s, longest step {3:.1f} ms'.format(
+        compacted, len(rollups), compaction, max(steps, default=0) * 1000))
+    print('vacuum released {0:.0%} of the file in {1:.2f} s'.format(free_space, vacuum))
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'db.sqlite3')
+        generate_history(db_path, args)
+
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args, db_path))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
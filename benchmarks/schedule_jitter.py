@@ -0,0 +1,113 @@
+"""
+Measures how precisely RunScheduleExecutionLoop starts activations and how often it wakes up. The loop runs with a
+circuit whose slots are due every few seconds, the circuit is served from memory like the snapshot of the circuit repository
+and the pump is not driven, so only the scheduling is measured. The benchmark reports the delay between every slot and
+its activation, the number of times the loop checked the circuit and the CPU time used by the process.
+
+Usage: python -m benchmarks.schedule_jitter --slots 10 --spacing 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+from domain.model import Circuit, ScheduledActivation, PumpActivation
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Activation delay and wake-ups of the schedule execution loop')
+    parser.add_argument('--slots', type=int, default=10)
+    parser.add_argument('--spacing', type=int, default=2, help='seconds between slots')
+
+    return parser.parse_args()
+
+
+class FetchCircuitStub:
+    """
+    Serves the circuit from memory like the snapshot of the circuit repository.
+    """
+
+    def __init__(self, circuit: Circuit) -> None:
+        self.circuit = circuit
+        self.fetches = 0
+        self._updated = asyncio.Event()
+
+    def execute(self) -> Optional[Circuit]:
+        self.fetches += 1
+        return self.circuit
+
+    async def wait_for_update(self, timeout: Optional[float] = None) -> None:
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._updated.clear()
+
+
+class PumpActivationRepositoryStub:
+    def __init__(self) -> None:
+        self.circuit_id = None
+        self.executed = set()
+
+    async def exists(self, timestamp: str) -> bool:
+        return timestamp in self.executed
+
+    async def store(self, activation: PumpActivation) -> None:
+        self.executed.add(activation.timestamp)
+
+
+class ActivatePumpStub:
+    """
+    Records the delay between the slot and the activation instead of driving the pump.
+    """
+
+    def __init__(self, repository: PumpActivationRepositoryStub) -> None:
+        self._repository = repository
+        self.delays: List[float] = []
+
+    async def execute(self, timestamp: str, water: int) -> None:
+        self.delays.append((datetime.now() - datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')).total_seconds())
+        await self._repository.store(PumpActivation(timestamp=timestamp, amount=water))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+    from log.logger import logger
+
+    first = datetime.now().replace(microsecond=0) + timedelta(seconds=2)
+    slots = [ScheduledActivation(time=(first + timedelta(seconds=i * args.spacing)).strftime('%H:%M:%S'), amount=10,
+                                 active=True) for i in range(args.slots)]
+    fetch_circuit = FetchCircuitStub(Circuit(id=1, name='bench', active=True, one_time_activations=[], schedule=slots))
+    repository = PumpActivationRepositoryStub()
+    activate_pump = ActivatePumpStub(repository)
+
+    loop = RunScheduleExecutionLoop(fetch_circuit=fetch_circuit, activate_pump=activate_pump, repository=repository,
+                                    logger=logger)
+
+    duration = 2 + args.slots * args.spacing + 1
+    cpu = time.process_time()
+    task = asyncio.ensure_future(loop.execute())
+    await asyncio.sleep(duration)
+    task.cancel()
+    cpu = time.process_time() - cpu
+
+    delays = sorted(activate_pump.delays)
+    print('activations: {0}/{1}'.format(len(delays), args.slots))
+    if delays:
+        print('delay ms: avg {0:.1f}, p95 {1:.1f}, max {2:.1f}'.format(
+            statistics.mean(delays) * 1000, delays[int(len(delays) * 0.95) - 1] * 1000, delays[-1] * 1000))
+    print('circuit checks: {0} in {1} s'.format(fetch_circuit.fetches, duration))
+    print('cpu time: {0:.1f} ms'.format(cpu * 1000))
+
+
+def main() -> None:
+    os.environ.setdefault('ML_PER_SECOND', '1')
+    os.environ.setdefault('DB_NAME', ':memory:')
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures the cost of finding due slots in a schedule with many slots, like drip irrigation circuits have. The old way
+parsed the time of every slot with strptime on every check and scanned the whole schedule, the compiled schedule is
+built once per version of the circuit and looked up with a binary search. The benchmark reports the time of a check
+for both and the time of compiling the schedule.
+
+Usage: python -m benchmarks.schedule_lookup --slots 500 --checks 2000
+"""
+import argparse
+import time
+from datetime import datetime, date, timedelta
+
+from domain.model import Circuit, ScheduledActivation
+from domain.schedule import ActivationQueue
+
+DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+TIME_FORMAT = '%H:%M:%S'
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Lookup of due slots in a schedule with many slots')
+    parser.add_argument('--slots', type=int, default=500)
+    parser.add_argument('--checks', type=int, default=2000)
+
+    return parser.parse_args()
+
+
+def old_check(circuit: Circuit, margin_in_minutes: int = 60) -> list:
+    """
+    Finds due slots the way RunScheduleExecutionLoop did on every tick.
+    """
+    due = []
+    for item in [pi for pi in circuit.schedule if pi.active]:
+        slot_time = datetime.strptime(item.time, TIME_FORMAT).time()
+        now = datetime.now().time()
+        slot = datetime.combine(date.today(), slot_time)
+        delta = datetime.combine(date.today(), now) - slot
+        if now > slot_time and delta.seconds < margin_in_minutes * 60:
+            due.append(slot.strftime(DATE_TIME_FORMAT))
+    return due
+
+
+def main() -> None:
+    args = parse_args()
+
+    step = 86400 // args.slots
+    schedule = [ScheduledActivation(time='{0:02d}:{1:02d}:{2:02d}'.format(i * step // 3600, i * step // 60 % 60,
+                                                                          i * step % 60), amount=5, active=True)
+                for i in range(args.slots)]
+    circuit = Circuit(id=1, name='drip', active=True, one_time_activations=[], schedule=schedule)
+
+    print('{0} slots, {1} checks'.format(args.slots, args.checks))
+    print('{0:<34} {1:>12}'.format('operation', 'us'))
+
+    start = time.perf_counter()
+    for _ in range(args.checks):
+        old_check(circuit)
+    print('{0:<34} {1:>12.1f}'.format('old check', (time.perf_counter() - start) / args.checks * 1e6))
+
+    start = time.perf_counter()
+    queue = ActivationQueue(circuit, datetime.now(), timedelta(hours=1))
+    print('{0:<34} {1:>12.1f}'.format('compile schedule', (time.perf_counter() - start) * 1e6))
+
+    # every check advances the clock by a minute, so a day and more of slots is walked through
+    now = datetime.now()
+    due = 0
+    start = time.perf_counter()
+    for i in range(args.checks):
+        due += len(queue.pop_due(now + timedelta(minutes=i)))
+        queue.next_instant()
+    duration = time.perf_counter() - start
+    print('{0:<34} {1:>12.1f}'.format('compiled check and next instant', duration / args.checks * 1e6))
+    print('activations due: {0}'.format(due))
+
+
+if __name__ == '__main__':
+    main()
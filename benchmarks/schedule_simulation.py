@@ -0,0 +1,296 @@
+"""
+Replays weeks of schedule execution in simulated time. The schedule execution and circuit sync loops of every circuit
+run with the local database, the repositories and simulated pumps, in VirtualTimeEventLoop, which jumps straight to
+the next timer, so a day takes a fraction of a second. The backend is simulated too: it serves circuits with slots
+spread over the day, publishes one-time activations a while before they are due and goes down for a few hours every
+day.
+
+Every pump run is matched with the slot or one-time activation it was started for. The benchmark reports missed,
+duplicate, late and unexpected activations, activations caught up right after the start, which are late by design,
+and the throughput of the scheduling core.
+
+Usage: python -m benchmarks.schedule_simulation --days 28 --circuits 2 --slots 48 --outages 2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from bisect import bisect_right
+from dataclasses import replace
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Schedule execution replayed in simulated time')
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--circuits', type=int, default=2)
+    parser.add_argument('--slots', type=int, default=48, help='slots of every circuit per day')
+    parser.add_argument('--one-time', type=int, default=1, help='one-time activations of every circuit per day')
+    parser.add_argument('--outages', type=int, default=2, help='backend outages per day')
+    parser.add_argument('--outage-hours', type=float, default=3, help='maximum length of an outage')
+    parser.add_argument('--poll-interval', type=float, default=60)
+    parser.add_argument('--late', type=float, default=1, help='seconds after which an activation is late')
+    parser.add_argument('--seed', type=int, default=1)
+
+    return parser.parse_args()
+
+
+class Scenario:
+    """
+    Schedules, one-time activations and outages of the simulated backend.
+    """
+
+    def __init__(self, args: argparse.Namespace, start: datetime) -> None:
+        from data.model.model import ScheduledActivationData
+
+        rng = random.Random(args.seed)
+        self.start = start
+        self.end = start + timedelta(days=args.days)
+
+        self.outages: List[Tuple[datetime, datetime]] = []
+        for day in range(args.days):
+            for _ in range(args.outages):
+                begin = start + timedelta(days=day, seconds=rng.randrange(86400))
+                self.outages.append((begin, begin + timedelta(hours=rng.uniform(1 / 6, args.outage_hours))))
+
+        step = 86400 // args.slots
+        self.schedules: Dict[int, List[ScheduledActivationData]] = {}
+        # published time, due time and amount of one-time activations of every circuit
+        self.one_time: Dict[int, List[Tuple[datetime, datetime, int]]] = {}
+        for circuit_id in range(1, args.circuits + 1):
+            offsets = [slot * step + rng.randrange(step) for slot in range(args.slots)]
+            self.schedules[circuit_id] = [
+                ScheduledActivationData(time='{0:02d}:{1:02d}:{2:02d}'.format(o // 3600, o // 60 % 60, o % 60),
+                                        amount=20 + rng.randrange(30), active=True) for o in offsets]
+
+            activations = []
+            for day in range(args.days):
+                for _ in range(args.one_time):
+                    due = start + timedelta(days=day, seconds=rng.randrange(86400))
+                    published = due - timedelta(minutes=rng.uniform(5, 30))
+                    # the device has to be able to see the activation before it's due, and a later one replaces it
+                    if self._offline(published, args.poll_interval * 2) or \
+                            due.strftime('%H:%M:%S') in {item.time for item in self.schedules[circuit_id]} or \
+                            (activations and published <= activations[-1][1]):
+                        continue
+                    activations.append((published, due, 5 + rng.randrange(20)))
+            self.one_time[circuit_id] = activations
+
+    def _offline(self, instant: datetime, seconds: float = 0) -> bool:
+        return any(begin <= instant + timedelta(seconds=seconds) and instant < end for begin, end in self.outages)
+
+    def offline(self, instant: datetime) -> bool:
+        return self._offline(instant)
+
+    def expected(self, circuit_id: int, margin: timedelta) -> List[Tuple[datetime, int]]:
+        """
+        Returns due times and amounts of all activations of the circuit from the execution margin before the start
+        until the end of the simulation.
+        """
+        expected = []
+        day = self.start.date() - timedelta(days=1)
+        while day < self.end.date():
+            for item in self.schedules[circuit_id]:
+                instant = datetime.combine(day, datetime.strptime(item.time, '%H:%M:%S').time())
+                if self.start - margin <= instant < self.end:
+                    expected.append((instant, item.amount))
+            day += timedelta(days=1)
+
+        expected.extend((due, amount) for _, due, amount in self.one_time[circuit_id] if due < self.end)
+        return sorted(expected)
+
+
+class SimulatedBackend:
+    """
+    Serves circuits of the scenario at the time of the clock. The same instance of the circuit is returned until
+    a one-time activation is published, like the backend does when the circuit has not changed.
+    """
+
+    def __init__(self, scenario: Scenario, clock) -> None:
+        from data.model.model import CircuitData
+
+        self._scenario = scenario
+        self._clock = clock
+        self._circuits = {circuit_id: CircuitData(id=circuit_id, name=str(circuit_id), active=True,
+                                                  one_time_activations=[], schedule=schedule)
+                          for circuit_id, schedule in scenario.schedules.items()}
+        self._published = {circuit_id: 0 for circuit_id in scenario.schedules}
+        self.fetches = 0
+        self.failures = 0
+
+    @property
+    def connectivity_state(self):
+        from data.smart_garden.connectivity import ConnectivityState
+
+        return ConnectivityState.OFFLINE if self._scenario.offline(self._clock.now()) else ConnectivityState.ONLINE
+
+    async def fetch_circuit(self, circuit_id: Optional[int] = None):
+        from data.model.model import OneTimeActivationData
+        from data.smart_garden.exceptions import SmartGardenConnectionError
+
+        self.fetches += 1
+        now = self._clock.now()
+        if self._scenario.offline(now):
+            self.failures += 1
+            raise SmartGardenConnectionError()
+
+        activations = self._scenario.one_time[circuit_id]
+        published = self._published[circuit_id]
+        while published < len(activations) and activations[published][0] <= now:
+            published += 1
+        if published != self._published[circuit_id]:
+            # like the backend, all one-time activations published for today are served
+            today = [OneTimeActivationData(timestamp=due.strftime(DATE_TIME_FORMAT), amount=amount)
+                     for _, due, amount in activations[:published] if due.date() == now.date()]
+            self._circuits[circuit_id] = replace(self._circuits[circuit_id], one_time_activations=today)
+            self._published[circuit_id] = published
+
+        return self._circuits[circuit_id]
+
+
+def analyze(expected: List[Tuple[datetime, int]], runs, start: datetime, margin: timedelta,
+            late: float) -> Dict[str, float]:
+    """
+    Matches every pump run with the latest activation of the same amount due within the execution margin before it,
+    preferring the ones that were not matched yet.
+    """
+    instants = [instant for instant, _ in expected]
+    matched = [0] * len(expected)
+    report = {'expected': len(expected), 'executed': len(runs), 'missed': 0, 'duplicate': 0, 'late': 0,
+              'unexpected': 0, 'caught up at start': 0, 'max delay s': 0.0}
+
+    for run in runs:
+        candidates = []
+        i = bisect_right(instants, run.started) - 1
+        while i >= 0 and run.started - instants[i] <= margin:
+            if expected[i][1] == run.water:
+                candidates.append(i)
+            i -= 1
+
+        if not candidates:
+            report['unexpected'] += 1
+            continue
+
+        i = next((c for c in candidates if not matched[c]), candidates[0])
+        matched[i] += 1
+        if matched[i] > 1:
+            report['duplicate'] += 1
+        elif instants[i] < start:
+            report['caught up at start'] += 1
+        else:
+            delay = (run.started - instants[i]).total_seconds()
+            report['max delay s'] = max(report['max delay s'], delay)
+            if delay > late:
+                report['late'] += 1
+
+    report['missed'] = matched.count(0)
+    return report
+
+
+async def simulate(args: argparse.Namespace, start: datetime):
+    from data.circuit_repository import CircuitRepository
+    from data.db.circuit_dao import CircuitDao
+    from data.db.db_common import database
+    from data.db.execution_log_dao import ExecutionLogDao
+    from data.db.pump_activation_dao import PumpActivationDao
+    from data.db.scheduled_activation_dao import ScheduledActivationDao
+    from data.execution_log_repository import ExecutionLogRepository
+    from data.pump_activation_repository import PumpActivationRepository
+    from device.clock import SimulatedClock
+    from device.pump_simulated import SimulatedPump
+    from interactors.activate_pump import ActivatePump
+    from interactors.fetch_circuit import FetchCircuit
+    from interactors.run_circuit_controller import RunCircuitController
+    from interactors.run_circuit_sync_loop import RunCircuitSyncLoop
+    from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+
+    # failed fetches during outages are logged on every poll, so the log is kept out of the way
+    logger = logging.getLogger('pytomatoes.simulation')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    clock = SimulatedClock(start)
+    scenario = Scenario(args, start)
+    backend = SimulatedBackend(scenario, clock)
+    execution_log_repository = ExecutionLogRepository(ExecutionLogDao(database=database), backend, logger)
+
+    circuit_repositories, loops, pumps = {}, {}, {}
+    for circuit_id in scenario.schedules:
+        circuit_repository = CircuitRepository(backend, ScheduledActivationDao(database=database),
+                                               CircuitDao(database=database), logger, circuit_id=circuit_id,
+                                               poll_interval=args.poll_interval, clock=clock)
+        pump_activation_repository = PumpActivationRepository(PumpActivationDao(database=database),
+                                                              circuit_id=circuit_id, clock=clock)
+        pumps[circuit_id] = SimulatedPump(clock)
+        activate_pump = ActivatePump(pump=pumps[circuit_id], repository=pump_activation_repository,
+                                     execution_log_repository=execution_log_repository, logger=logger, clock=clock)
+
+        circuit_repositories[circuit_id] = circuit_repository
+        loops[circuit_id] = RunScheduleExecutionLoop(fetch_circuit=FetchCircuit(circuit_repository=circuit_repository),
+                                                     activate_pump=activate_pump, repository=pump_activation_repository,
+                                                     logger=logger, clock=clock)
+
+    sync_loop = RunCircuitSyncLoop(repositories=circuit_repositories, logger=logger)
+    controller = RunCircuitController(loops=loops, logger=logger)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.gather(sync_loop.execute(), controller.execute()),
+                               (scenario.end - start).total_seconds())
+    except asyncio.TimeoutError:
+        pass
+    duration = time.perf_counter() - started
+
+    return scenario, backend, pumps, duration
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'db.sqlite3')
+        with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+            connection.executescript(f.read())
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+
+        from device.clock import VirtualTimeEventLoop
+        from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+
+        loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(loop)
+        start = datetime.combine(date.today(), datetime.min.time())
+        try:
+            scenario, backend, pumps, duration = loop.run_until_complete(simulate(args, start))
+        finally:
+            loop.close()
+
+    margin = timedelta(minutes=RunScheduleExecutionLoop.EXECUTION_MARGIN)
+    print('{0} days, {1} circuits, {2} slots per day, {3} outages per day, poll interval {4:.0f} s'.format(
+        args.days, args.circuits, args.slots, args.outages, args.poll_interval))
+    print('{0:<22}'.format('circuit') + ''.join('{0:>10}'.format(circuit_id) for circuit_id in pumps))
+
+    reports = [analyze(scenario.expected(circuit_id, margin), pump.runs, start, margin, args.late)
+               for circuit_id, pump in pumps.items()]
+    for key in reports[0]:
+        print('{0:<22}'.format(key) + ''.join('{0:>10}'.format(
+            '{0:.1f}'.format(report[key]) if isinstance(report[key], float) else report[key]) for report in reports))
+
+    executed = sum(report['executed'] for report in reports)
+    print('\nbackend fetches: {0}, failed: {1}'.format(backend.fetches, backend.failures))
+    print('wall time: {0:.2f} s, {1:.1f} simulated days per second, {2:.0f} activations per second'.format(
+        duration, args.days / duration, executed / duration))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
@@ -0,0 +1,122 @@
+"""
+Measures how a slow backend affects watering. The schedule execution loop runs with the circuit repository and the
+sync loop against a backend that takes the given number of seconds to return the circuit, with the push channel down
+so the circuit is polled. Slots are due every few seconds and the pump is not driven. The benchmark reports the delay
+between every slot and its activation and the number of fetches of the circuit.
+
+Usage: python -m benchmarks.slow_backend --latency 3 --slots 10 --spacing 2
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Activation delay with a slow backend')
+    parser.add_argument('--latency', type=float, default=3, help='seconds the backend takes to return the circuit')
+    parser.add_argument('--slots', type=int, default=10)
+    parser.add_argument('--spacing', type=int, default=2, help='seconds between slots')
+
+    return parser.parse_args()
+
+
+class SlowBackend:
+    """
+    Returns the same circuit after the latency, so the local database is written only once.
+    """
+
+    def __init__(self, circuit_data, latency: float) -> None:
+        self._circuit_data = circuit_data
+        self._latency = latency
+        self.fetches = 0
+
+    async def fetch_circuit(self, circuit_id: Optional[int] = None):
+        self.fetches += 1
+        await asyncio.sleep(self._latency)
+        return self._circuit_data
+
+
+class ActivatePumpStub:
+    """
+    Records the delay between the slot and the activation instead of driving the pump.
+    """
+
+    def __init__(self, repository) -> None:
+        self._repository = repository
+        self.delays: List[float] = []
+
+    async def execute(self, timestamp: str, water: int) -> None:
+        from domain.model import PumpActivation
+
+        self.delays.append((datetime.now() - datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')).total_seconds())
+        await self._repository.store(PumpActivation(timestamp=timestamp, amount=water))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from data.circuit_repository import CircuitRepository
+    from data.db.circuit_dao import CircuitDao
+    from data.db.db_common import database
+    from data.db.pump_activation_dao import PumpActivationDao
+    from data.db.scheduled_activation_dao import ScheduledActivationDao
+    from data.model.model import CircuitData, ScheduledActivationData
+    from data.pump_activation_repository import PumpActivationRepository
+    from interactors.fetch_circuit import FetchCircuit
+    from interactors.run_circuit_sync_loop import RunCircuitSyncLoop
+    from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+    from log.logger import logger
+
+    # the first fetch is done before the slots are due, so only the following ones can delay activations
+    first = datetime.now().replace(microsecond=0) + timedelta(seconds=int(args.latency) + 2)
+    slots = [ScheduledActivationData(time=(first + timedelta(seconds=i * args.spacing)).strftime('%H:%M:%S'), amount=10,
+                                     active=True) for i in range(args.slots)]
+    backend = SlowBackend(CircuitData(id=1, name='bench', active=True, one_time_activations=[], schedule=slots),
+                          args.latency)
+
+    circuit_repository = CircuitRepository(backend, ScheduledActivationDao(database=database),
+                                           CircuitDao(database=database), logger, circuit_id=1)
+    pump_activation_repository = PumpActivationRepository(PumpActivationDao(database=database), circuit_id=1)
+    activate_pump = ActivatePumpStub(pump_activation_repository)
+
+    loops = [
+        RunScheduleExecutionLoop(fetch_circuit=FetchCircuit(circuit_repository=circuit_repository),
+                                 activate_pump=activate_pump, repository=pump_activation_repository, logger=logger),
+        RunCircuitSyncLoop(repositories={1: circuit_repository}, logger=logger)
+    ]
+
+    duration = (first - datetime.now()).total_seconds() + args.slots * args.spacing + 1
+    try:
+        await asyncio.wait_for(asyncio.gather(*(loop.execute() for loop in loops)), duration)
+    except asyncio.TimeoutError:
+        pass
+
+    delays = sorted(activate_pump.delays)
+    print('activations: {0}/{1}'.format(len(delays), args.slots))
+    if delays:
+        print('delay ms: avg {0:.1f}, p95 {1:.1f}, max {2:.1f}'.format(
+            statistics.mean(delays) * 1000, delays[int(len(delays) * 0.95) - 1] * 1000, delays[-1] * 1000))
+    print('circuit fetches: {0} in {1:.0f} s'.format(backend.fetches, duration))
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'db.sqlite3')
+        with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+            connection.executescript(f.read())
+
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
@@ -0,0 +1,342 @@
+"""
+Local stand-in for the Smart Garden backend. It implements the endpoints used by SmartGardenBackend and allows for
+simulating latency, failures, short-lived tokens and schedule changes, so the backend path can be benchmarked and
+tested without network access. Changes of circuits are pushed to clients connected to the WebSocket push channel.
+Circuits and execution logs are exchanged as JSON or MessagePack, optionally compressed with gzip, depending on what
+the client asks for and what the server is configured to support.
+
+Usage: python -m benchmarks.stand_in_server --port 8080 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from data.smart_garden.encoding import JSON, MSGPACK, msgpack
+
+
+@dataclass
+class StandInConfig:
+    """
+    Behaviour of the stand-in server. Latency is specified in seconds, rates as a fraction of requests.
+    """
+    email: str = 'user@example.com'
+    password: str = 'password'
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    access_token_lifetime: int = 300
+    refresh_token_lifetime: int = 86400
+    circuits: int = 1
+    slots: int = 24
+    churn_interval: Optional[float] = None
+    compression: bool = True
+    binary: bool = True
+
+
+def _encode_token(lifetime: int) -> str:
+    now = int(time.time())
+    claims = {'iat': now, 'exp': now + lifetime, 'jti': uuid.uuid4().hex}
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+
+    return 'stand-in.{0}.signature'.format(payload)
+
+
+def _token_expiry(token: str) -> float:
+    payload = token.split('.')[1]
+    payload += '=' * (-len(payload) % 4)
+
+    return json.loads(base64.urlsafe_b64decode(payload))['exp']
+
+
+class StandInServer:
+    """
+    Stand-in server that keeps its state in memory. Requests, received execution logs and bytes of request and
+    response bodies as sent over the wire are counted so the results can be checked after a run.
+    """
+
+    def __init__(self, config: StandInConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or StandInConfig()
+        self.requests = Counter()
+        self.execution_logs: Dict[Optional[int], List[dict]] = {}
+        self.health_checks = 0
+        self.pushed_events = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+        self._host = host
+        self._port = port
+        self._runner = None
+        self._access_tokens = set()
+        self._refresh_tokens = set()
+        self._circuits = {circuit_id: self._build_circuit(circuit_id)
+                          for circuit_id in range(1, self.config.circuits + 1)}
+        self._churn_task = None
+        self._subscribers = set()
+
+    @property
+    def url(self) -> str:
+        return 'http://{0}:{1}'.format(self._host, self._port)
+
+    def _build_circuit(self, circuit_id: int) -> dict:
+        slots = self.config.slots
+        return {
+            'id': circuit_id,
+            'name': 'circuit {0}'.format(circuit_id),
+            'active': True,
+            'healthy': True,
+            'today_one_time_activations': [],
+            'schedule': [
+                {
+                    'time': '{0:02d}:{1:02d}:00'.format(i * 1440 // slots // 60, i * 1440 // slots % 60),
+                    'amount': 50,
+                    'active': True
+                } for i in range(slots)
+            ]
+        }
+
+    def add_one_time_activation(self, circuit_id: int, timestamp: str, amount: int) -> None:
+        """
+        Adds a one-time activation to the circuit, the equivalent of the "water now" command.
+        """
+        self._circuits[circuit_id]['today_one_time_activations'].append({'timestamp': timestamp, 'amount': amount})
+        self._push([circuit_id])
+
+    def churn(self) -> None:
+        """
+        Changes a random slot of every circuit, so the devices have to fetch and store the schedule again.
+        """
+        for circuit in self._circuits.values():
+            if circuit['schedule']:
+                random.choice(circuit['schedule'])['amount'] = random.randint(10, 100)
+        self._push(list(self._circuits))
+
+    def _push(self, circuit_ids: List[int]) -> None:
+        if self._subscribers:
+            asyncio.ensure_future(self._broadcast(circuit_ids))
+
+    async def _send_circuits(self, ws: web.WebSocketResponse, circuit_ids: List[int]) -> None:
+        for circuit_id in circuit_ids:
+            await ws.send_str(json.dumps({'type': 'circuit', 'circuit': self._circuits[circuit_id]}))
+            self.pushed_events += 1
+
+    async def _broadcast(self, circuit_ids: List[int]) -> None:
+        for ws in list(self._subscribers):
+            try:
+                await self._send_circuits(ws, circuit_ids)
+            except ConnectionError:
+                self._subscribers.discard(ws)
+
+    async def _churn_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.churn_interval)
+            self.churn()
+
+    @web.middleware
+    async def _simulate_network(self, request: web.Request, handler):
+        self.requests[request.path] += 1
+
+        delay = self.config.latency + random.uniform(0, self.config.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if random.random() < self.config.error_rate:
+            raise web.HTTPServiceUnavailable()
+
+        self.bytes_received += request.content_length or 0
+        response = await handler(request)
+        if isinstance(response, web.Response) and response.body is not None:
+            self.bytes_sent += len(response.body)
+
+        return response
+
+    @property
+    def _binary(self) -> bool:
+        return self.config.binary and msgpack is not None
+
+    def _encode(self, request: web.Request, data) -> Tuple[bytes, str]:
+        if self._binary and MSGPACK in request.headers.get('Accept', ''):
+            return msgpack.packb(data, use_bin_type=True), MSGPACK
+
+        return json.dumps(data).encode(), JSON
+
+    def _respond(self, request: web.Request, body: bytes, content_type: str, headers: dict = None) -> web.Response:
+        headers = dict(headers or {})
+        if self.config.compression:
+            headers['Accept-Encoding'] = 'gzip'
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body)
+                headers['Content-Encoding'] = 'gzip'
+
+        return web.Response(body=body, content_type=content_type, headers=headers)
+
+    async def _read(self, request: web.Request):
+        if 'Content-Encoding' in request.headers and not self.config.compression:
+            raise web.HTTPUnsupportedMediaType()
+
+        # aiohttp has already decompressed the body
+        body = await request.read()
+        if request.content_type == MSGPACK:
+            if not self._binary:
+                raise web.HTTPUnsupportedMediaType()
+            return msgpack.unpackb(body, raw=False)
+
+        return json.loads(body)
+
+    def _authorize(self, request: web.Request) -> None:
+        token = request.headers.get('Authorization', '')[len('Bearer '):]
+        if token not in self._access_tokens or _token_expiry(token) <= time.time():
+            raise web.HTTPUnauthorized()
+
+    def _issue_tokens(self) -> web.Response:
+        access = _encode_token(self.config.access_token_lifetime)
+        refresh = _encode_token(self.config.refresh_token_lifetime)
+        self._access_tokens.add(access)
+        self._refresh_tokens.add(refresh)
+
+        return web.json_response({'access': access, 'refresh': refresh})
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if data.get('email') != self.config.email or data.get('password') != self.config.password:
+            raise web.HTTPUnauthorized()
+
+        return self._issue_tokens()
+
+    async def _auth_refresh(self, request: web.Request) -> web.Response:
+        refresh = (await request.json()).get('refresh')
+        if refresh not in self._refresh_tokens or _token_expiry(refresh) <= time.time():
+            raise web.HTTPUnauthorized()
+
+        self._refresh_tokens.discard(refresh)
+        return self._issue_tokens()
+
+    def _circuit_id(self, request: web.Request) -> int:
+        circuit_id = request.match_info.get('circuit_id')
+        if circuit_id is None:
+            return 1
+        if int(circuit_id) not in self._circuits:
+            raise web.HTTPNotFound()
+
+        return int(circuit_id)
+
+    async def _circuit(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+
+        body, content_type = self._encode(request, self._circuits[self._circuit_id(request)])
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+
+        return self._respond(request, body, content_type, {'ETag': etag})
+
+    async def _events(self, request: web.Request) -> web.WebSocketResponse:
+        self._authorize(request)
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await self._send_circuits(ws, list(self._circuits))
+
+        self._subscribers.add(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self._subscribers.discard(ws)
+
+        return ws
+
+    async def _activation_log(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+
+        circuit_id = self._circuit_id(request) if 'circuit_id' in request.match_info else None
+        data = await self._read(request)
+        self.execution_logs.setdefault(circuit_id, []).extend(data if isinstance(data, list) else [data])
+
+        return web.json_response({})
+
+    async def _health_check(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        self.health_checks += 1
+
+        return web.json_response({})
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._simulate_network])
+        app.router.add_post('/api/auth/token', self._auth)
+        app.router.add_post('/api/auth/token/refresh', self._auth_refresh)
+        app.router.add_get('/api/circuits/mine', self._circuit)
+        app.router.add_post('/api/circuits/mine/activation-log', self._activation_log)
+        app.router.add_patch('/api/circuits/mine/health-check', self._health_check)
+        app.router.add_get('/api/circuits/mine/events', self._events)
+        app.router.add_get('/api/circuits/{circuit_id:\\d+}', self._circuit)
+        app.router.add_post('/api/circuits/{circuit_id:\\d+}/activation-log', self._activation_log)
+
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+
+        if self.config.churn_interval:
+            self._churn_task = asyncio.ensure_future(self._churn_periodically())
+
+    async def stop(self) -> None:
+        if self._churn_task:
+            self._churn_task.cancel()
+        for ws in list(self._subscribers):
+            await ws.close()
+        await self._runner.cleanup()
+
+
+def parse_config(args: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Smart Garden backend stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=StandInConfig.latency)
+    parser.add_argument('--latency-jitter', type=float, default=StandInConfig.latency_jitter)
+    parser.add_argument('--error-rate', type=float, default=StandInConfig.error_rate)
+    parser.add_argument('--access-token-lifetime', type=int, default=StandInConfig.access_token_lifetime)
+    parser.add_argument('--circuits', type=int, default=StandInConfig.circuits)
+    parser.add_argument('--slots', type=int, default=StandInConfig.slots)
+    parser.add_argument('--churn-interval', type=float, default=StandInConfig.churn_interval)
+    parser.add_argument('--no-compression', action='store_true', help='reject compressed requests, send plain responses')
+    parser.add_argument('--no-binary', action='store_true', help='exchange JSON only')
+
+    return parser.parse_args(args)
+
+
+def config_from_args(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+                         access_token_lifetime=args.access_token_lifetime, circuits=args.circuits, slots=args.slots,
+                         churn_interval=args.churn_interval, compression=not args.no_compression,
+                         binary=not args.no_binary)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = StandInServer(config_from_args(args), host=args.host, port=args.port)
+    await server.start()
+    print('stand-in backend listening on {0}'.format(server.url))
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve(parse_config()))
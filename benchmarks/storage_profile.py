@@ -0,0 +1,126 @@
+"""
+Compares storage profiles of the local database. Every activation stores the pump activation and the execution log
+concurrently like ActivatePump does, and all circuits are activated at the same time. For every profile the benchmark
+reports committed transactions, which are the points where SQLite has to fsync, the write and flush requests that
+reached the block device according to /proc/diskstats (Linux only) and latency per activation.
+
+Point --dir at a directory on the SD card, or on a loop-mounted image, to measure the real device.
+
+Usage: python -m benchmarks.storage_profile --activations 100 --circuits 2 --dir /mnt/sdcard
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Storage profiles of the local database')
+    parser.add_argument('--activations', type=int, default=100, help='activations of every circuit')
+    parser.add_argument('--circuits', type=int, default=2)
+    parser.add_argument('--dir', help='directory of the database files, a temporary one is used if not specified')
+
+    return parser.parse_args()
+
+
+def device_stats(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Reads the number of completed write and flush requests of the block device the path is stored on.
+    :return: writes and flushes or None if the statistics are not available
+    """
+    st_dev = os.stat(path).st_dev
+    try:
+        with open('/proc/diskstats') as f:
+            for line in f:
+                fields = line.split()
+                if (int(fields[0]), int(fields[1])) == (os.major(st_dev), os.minor(st_dev)):
+                    return int(fields[7]), int(fields[18]) if len(fields) > 18 else 0
+    except OSError:
+        pass
+
+    return None
+
+
+async def run_profile(name: str, profile, args: argparse.Namespace, workdir: str) -> None:
+    from data.db.db_common import create_database
+    from data.db.execution_log_dao import ExecutionLogDao
+    from data.db.model import PumpActivationEntity, ExecutionLogEntity
+    from data.db.pump_activation_dao import PumpActivationDao
+
+    db_path = os.path.join(workdir, '{0}.sqlite3'.format(name))
+    with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+        connection.executescript(f.read())
+
+    database = create_database(db_path, profile)
+    commits = []
+    event.listen(database.engine, 'commit', lambda connection: commits.append(1))
+
+    pump_activation_dao = PumpActivationDao(database=database)
+    execution_log_dao = ExecutionLogDao(database=database)
+
+    async def activate(circuit_id: int, i: int) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(
+            pump_activation_dao.store(PumpActivationEntity(timestamp=i * 60, amount=50, circuit_id=circuit_id)),
+            execution_log_dao.store(ExecutionLogEntity(timestamp=str(i), amount=50, circuit_id=circuit_id))
+        )
+        return time.perf_counter() - start
+
+    # the first connection switches the journal mode, which is not a part of the measurement
+    await pump_activation_dao.exists(0, 0)
+    commits.clear()
+    before = device_stats(workdir)
+
+    latencies = []
+    for i in range(args.activations):
+        latencies += await asyncio.gather(*(activate(circuit_id, i) for circuit_id in range(1, args.circuits + 1)))
+
+    after = device_stats(workdir)
+    activations = len(latencies)
+    database.engine.dispose()
+
+    writes, flushes = ('{0:.2f}'.format((after[i] - before[i]) / activations) if before and after else 'n/a'
+                       for i in (0, 1))
+    print('{0:<22} {1:>10.2f} {2:>10} {3:>10} {4:>10.1f} {5:>10.1f}'.format(
+        name, len(commits) / activations, writes, flushes, statistics.mean(latencies) * 1000,
+        sorted(latencies)[int(activations * 0.95) - 1] * 1000))
+
+
+async def run(args: argparse.Namespace, workdir: str) -> None:
+    from data.db.storage import STORAGE_PROFILES
+
+    profiles = [
+        ('default', STORAGE_PROFILES['default']),
+        ('sd_card, no group', replace(STORAGE_PROFILES['sd_card'], commit_window=0)),
+        ('sd_card', STORAGE_PROFILES['sd_card']),
+    ]
+
+    print('per activation, {0} circuits activated together'.format(args.circuits))
+    print('{0:<22} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10}'.format(
+        'profile', 'commits', 'dev writes', 'dev flush', 'avg ms', 'p95 ms'))
+    for name, profile in profiles:
+        await run_profile(name, profile, args, workdir)
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        os.environ.update({'DB_NAME': os.path.join(workdir, 'settings.sqlite3'),
+                           'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args, workdir))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
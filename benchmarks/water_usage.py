@@ -0,0 +1,130 @@
+"""
+Measures water usage reports for a year of history. Daily and weekly totals are computed the old way, by loading all
+pump activations of every circuit and aggregating them in Python, and by WaterUsageRepository, first with an empty
+cache and then again with the closed periods cached. Missed activations of a circuit are reported too. The history is
+generated for the given number of circuits and daily slots with a few missed slots, and activations older than the
+retention period are compacted into rollups like on a device running for a year.
+
+Usage: python -m benchmarks.water_usage --circuits 2 --slots 48
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+DAYS = 365
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Water usage reports for a year of history')
+    parser.add_argument('--circuits', type=int, default=2)
+    parser.add_argument('--slots', type=int, default=48, help='activations of every circuit per day')
+    parser.add_argument('--retention-days', type=int, default=90)
+
+    return parser.parse_args()
+
+
+def generate_history(db_path: str, args: argparse.Namespace) -> None:
+    """
+    Creates the database with schedules of all circuits and their activations up to yesterday, every 97th slot is
+    missed.
+    """
+    # timestamps are epochs of the local time taken as UTC, see map_timestamp_to_epoch()
+    today = int(datetime.combine(date.today(), datetime.min.time(), tzinfo=timezone.utc).timestamp())
+    step = 86400 // args.slots
+    circuits = range(1, args.circuits + 1)
+
+    with open(SCHEMA_PATH) as f, sqlite3.connect(db_path) as connection:
+        connection.executescript(f.read())
+        connection.executemany('INSERT INTO circuits (id, name, active) VALUES (?, ?, 1)',
+                               ((circuit_id, str(circuit_id)) for circuit_id in circuits))
+        connection.executemany(
+            'INSERT INTO scheduled_activations (time, amount, active, circuit_id) VALUES (?, 50, 1, ?)',
+            (('{0:02d}:{1:02d}:{2:02d}'.format(slot * step // 3600, slot * step // 60 % 60, slot * step % 60),
+              circuit_id) for slot in range(args.slots) for circuit_id in circuits))
+        connection.executemany(
+            'INSERT INTO pump_activations (timestamp, amount, circuit_id) VALUES (?, 50, ?)',
+            ((today - DAYS * 86400 + i * step, circuit_id)
+             for i in range(DAYS * args.slots) for circuit_id in circuits if i % 97))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from data.db.db_common import database
+    from data.db.maintenance_dao import MaintenanceDao
+    from data.db.pump_activation_dao import PumpActivationDao
+    from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
+    from data.db.water_usage_dao import WaterUsageDao
+    from data.pump_activation_repository import PumpActivationRepository
+    from data.retention_repository import RetentionRepository
+    from data.water_usage_repository import WaterUsageRepository
+
+    since = (date.today() - timedelta(days=DAYS)).isoformat()
+    until = (date.today() + timedelta(days=1)).isoformat()
+
+    # the old way works only on activations that were not compacted, so it's measured before the retention is applied
+    async def python_report() -> int:
+        days, weeks = defaultdict(int), defaultdict(int)
+        for circuit_id in range(1, args.circuits + 1):
+            repository = PumpActivationRepository(PumpActivationDao(database=database), circuit_id=circuit_id)
+            for activation in await repository.fetch():
+                day = datetime.strptime(activation.timestamp[:10], '%Y-%m-%d').date()
+                days[circuit_id, day] += activation.amount
+                weeks[circuit_id, day - timedelta(days=day.weekday())] += activation.amount
+        return len(days) + len(weeks)
+
+    print('{0} circuits, {1} activations per day, a year of history'.format(args.circuits, args.slots))
+    print('{0:<46} {1:>10} {2:>8}'.format('report', 'ms', 'rows'))
+
+    start = time.perf_counter()
+    rows = await python_report()
+    print('{0:<46} {1:>10.1f} {2:>8}'.format('python, daily and weekly', (time.perf_counter() - start) * 1000, rows))
+
+    retention_repository = RetentionRepository(PumpActivationRollupDao(database=database),
+                                               MaintenanceDao(database=database))
+    cutoff = (datetime.combine(date.today(), datetime.min.time()) -
+              timedelta(days=args.retention_days)).strftime('%Y-%m-%dT%H:%M:%S')
+    while await retention_repository.compact(cutoff):
+        pass
+
+    repository = WaterUsageRepository(WaterUsageDao(database=database))
+    for label in ('sql, empty cache', 'sql, closed periods cached'):
+        start = time.perf_counter()
+        rows = 0
+        for period in (WaterUsageRepository.DAY, WaterUsageRepository.WEEK):
+            rows += len(await repository.usage(period, since, until))
+        print('{0:<46} {1:>10.1f} {2:>8}'.format(label + ', daily and weekly', (time.perf_counter() - start) * 1000,
+                                                 rows))
+
+    start = time.perf_counter()
+    totals = await repository.usage(WaterUsageRepository.CIRCUIT, since, until)
+    print('{0:<46} {1:>10.1f} {2:>8}'.format('sql, totals per circuit', (time.perf_counter() - start) * 1000,
+                                             len(totals)))
+
+    recent = (date.today() - timedelta(days=args.retention_days)).isoformat()
+    start = time.perf_counter()
+    missed = await repository.missed_activations(recent, until, circuit_id=1)
+    print('{0:<46} {1:>10.1f} {2:>8}'.format('sql, missed slots of circuit 1', (time.perf_counter() - start) * 1000,
+                                             len(missed)))
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'db.sqlite3')
+        generate_history(db_path, args)
+
+        os.environ.update({'DB_NAME': db_path, 'ML_PER_SECOND': os.getenv('ML_PER_SECOND', '1')})
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(SCHEMA_PATH))
+    main()
@@ -1,3 +1,5 @@
+import asyncio
+from dataclasses import replace
 from logging import Logger
 from typing import Optional
 
@@ -5,50 +7,213 @@ from data.db.circuit_dao import CircuitDao
 from data.db.mapper import map_plan_item_entity_to_domain, map_circuit_to_entity
 from data.db.scheduled_activation_dao import ScheduledActivationDao
 from data.model.mapper import map_circuit_to_domain
-from data.smart_garden.exceptions import SmartGardenException
+from data.model.model import CircuitData
+from data.smart_garden.exceptions import SmartGardenException, SmartGardenOfflineError
 from data.smart_garden.smart_garden_backend import SmartGardenBackend
+from device.clock import Clock
 from domain.model import Circuit
 
 
 class CircuitRepository:
     """
-    Repository of circuits that allows for fetching the circuit in the online-first fashion. If it's not possible
-    to fetch the circuit from the smart garden backend, local database is used.
+    Repository of circuits that keeps an in-memory snapshot of the circuit synchronized in the online-first fashion.
+    If it's not possible to fetch the circuit from the smart garden backend, local database is used. The repository is
+    bound to a single circuit.
+
+    The snapshot is fresh for the sync interval and is replaced as a whole by sync(), which is run by a background
+    task. Once the interval passes, the stale snapshot is still served while it's being revalidated, so readers of the
+    snapshot never wait for the backend.
+
+    Only changes of the circuit are written to the local database, so a circuit that is fetched again and again
+    without being modified causes no writes at all.
+
+    Circuits pushed by the backend are applied as they arrive. While the push channel is connected, the backend is
+    polled only once per resync interval as a safety net; otherwise it's polled once per poll interval.
+    """
+
+    """
+    Default number of seconds between fetches from the backend when the push channel is not connected.
+    """
+    POLL_INTERVAL = 5
+
+    """
+    Number of seconds between fetches from the backend when the push channel is connected.
     """
+    RESYNC_INTERVAL = 900
 
     def __init__(self, backend: SmartGardenBackend, plan_item_dao: ScheduledActivationDao, circuit_dao: CircuitDao,
-                 logger: Logger):
+                 logger: Logger, circuit_id: Optional[int] = None, poll_interval: float = POLL_INTERVAL,
+                 clock: Optional[Clock] = None):
+        """
+        :param circuit_id: id of the circuit, None stands for the single circuit assigned to the account
+        :param poll_interval: number of seconds between fetches when the push channel is not connected
+        :param clock: clock used for measuring the sync interval, the system clock if it's not specified
+        """
+        self._circuit_id = circuit_id
+        self._poll_interval = poll_interval
         self._backend = backend
         self._plan_item_dao = plan_item_dao
         self._circuit_dao = circuit_dao
         self._logger = logger
+        self._clock = clock or Clock()
+
+        self._circuit_data = None
+        self._circuit = None
+        self._persisted = None
+        self._synced_at = None
+        self._subscribed = False
+        self._updated = asyncio.Event()
+        self._sync_requested = asyncio.Event()
+
+    @property
+    def circuit_id(self) -> Optional[int]:
+        return self._circuit_id
+
+    @property
+    def circuit(self) -> Optional[Circuit]:
+        """
+        The snapshot of the circuit, None if it was neither synced nor found in local database yet.
+        """
+        return self._circuit
+
+    @property
+    def subscribed(self) -> bool:
+        return self._subscribed
+
+    @subscribed.setter
+    def subscribed(self, subscribed: bool) -> None:
+        if subscribed != self._subscribed:
+            # the sync interval changes, so the sync task has to recompute its timeout
+            self._sync_requested.set()
+        self._subscribed = subscribed
+
+    def _in_sync(self) -> bool:
+        return self._synced_at is not None and self._clock.monotonic() - self._synced_at < self._sync_interval()
+
+    def _sync_interval(self) -> float:
+        return self.RESYNC_INTERVAL if self._subscribed else self._poll_interval
+
+    def time_until_sync(self) -> float:
+        """
+        Returns the number of seconds until the circuit has to be fetched from the backend again. If it's due already,
+        the last fetch failed and the stale snapshot is served, so the backend is retried after the poll interval.
+        :return: number of seconds
+        """
+        if self._synced_at is None:
+            return self._poll_interval
+
+        remaining = self._sync_interval() - (self._clock.monotonic() - self._synced_at)
+        return remaining if remaining > 0 else self._poll_interval
+
+    async def _store(self, circuit_data: CircuitData) -> Circuit:
+        """
+        Stores the circuit received from the backend in the local database unless it's the cached instance.
+        """
+        self._synced_at = self._clock.monotonic()
+        if circuit_data is self._circuit_data:
+            return self._circuit
 
-    async def fetch(self) -> Optional[Circuit]:
+        circuit = map_circuit_to_domain(circuit_data)
+        await self._persist(circuit)
+
+        self._circuit_data = circuit_data
+        self._swap(circuit)
+
+        return circuit
+
+    def _swap(self, circuit: Circuit) -> None:
+        """
+        Replaces the snapshot and wakes up the callers of wait_for_update() if the circuit has changed.
+        """
+        if circuit != self._circuit:
+            self._circuit = circuit
+            self._updated.set()
+
+    async def _persist(self, circuit: Circuit) -> None:
+        """
+        Writes the circuit to the local database if it differs from the last persisted one. One-time activations are
+        not stored, so they are not taken into account.
         """
-        Fetches the circuit using smart garden backend as primary data source and local database as the secondary.
-        :return: circuit or None if it cannot be fetched
+        persisted = replace(circuit, one_time_activations=[])
+        if persisted == self._persisted:
+            return
+
+        await self._circuit_dao.store(map_circuit_to_entity(circuit), exclusive=self._circuit_id is None)
+        self._persisted = persisted
+
+    async def apply(self, circuit_data: CircuitData) -> None:
+        """
+        Applies the circuit pushed by the backend to the snapshot.
+        :param circuit_data: pushed circuit
+        """
+        await self._store(circuit_data)
+
+    async def wait_for_update(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until the snapshot changes or the timeout passes.
+        :param timeout: maximum waiting time in seconds, None to wait for the change
         """
         try:
-            circuit = map_circuit_to_domain(await self._backend.fetch_circuit())
-            await self._circuit_dao.store(map_circuit_to_entity(circuit))
-            return circuit
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        self._updated.clear()
+
+    async def wait_for_sync(self) -> None:
+        """
+        Waits until the snapshot has to be synced with the backend or the sync interval changes.
+        """
+        try:
+            await asyncio.wait_for(self._sync_requested.wait(), self.time_until_sync())
+        except asyncio.TimeoutError:
+            pass
+
+        self._sync_requested.clear()
+
+    async def sync(self) -> None:
+        """
+        Fetches the circuit using smart garden backend as primary data source and replaces the snapshot. If the circuit
+        was synchronized within the sync interval, or the backend reports that it has not changed since the last fetch,
+        nothing is written to the local database. If the backend can't be reached, the stale snapshot is kept, or
+        the circuit is taken from local database if there is no snapshot yet.
+        """
+        if self._in_sync():
+            return
+
+        try:
+            await self._store(await self._backend.fetch_circuit(self._circuit_id))
+            return
+        except SmartGardenOfflineError:
+            pass
         except SmartGardenException as e:
-            self._logger.error('could not fetch the circuit: {0)'.format(e))
-            self._logger.info('fetching the circuit from local database')
+            self._logger.error('could not fetch the circuit: {0}'.format(e))
+            self._logger.info('serving the last known circuit, backend state: {0}'.format(
+                self._backend.connectivity_state.value))
 
-            circuit_entity = await self._circuit_dao.fetch()
-            if not circuit_entity:
-                self._logger.error('could not fetch the circuit from local database')
-                return None
+        if self._circuit is None:
+            circuit = await self._fetch_local()
+            if circuit:
+                self._swap(circuit)
+
+    async def _fetch_local(self) -> Optional[Circuit]:
+        """
+        Fetches the circuit from local database.
+        :return: circuit or None if there is no stored circuit
+        """
+        circuit_entity = await self._circuit_dao.fetch(self._circuit_id)
+        if not circuit_entity:
+            self._logger.error('could not fetch the circuit from local database')
+            return None
 
-            schedule = [map_plan_item_entity_to_domain(item) for item in circuit_entity.schedule]
+        schedule = [map_plan_item_entity_to_domain(item) for item in circuit_entity.schedule]
 
-            return Circuit(id=circuit_entity.id, schedule=schedule, active=circuit_entity.active,
-                           one_time_activation=None, name=circuit_entity.name)
+        return Circuit(id=circuit_entity.id, schedule=schedule, active=circuit_entity.active,
+                       one_time_activations=[], name=circuit_entity.name)
 
     async def update_circuit(self, circuit: Circuit) -> None:
         """
         Updates the circuit and stores updated data in the local database.
         :param circuit: updated circuit
         """
-        await self._circuit_dao.store(map_circuit_to_entity(circuit))
+        await self._persist(circuit)
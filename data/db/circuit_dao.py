@@ -1,29 +1,79 @@
-from data.db.db_common import Session
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+from data.db.db_common import Database, in_db_thread
 from data.db.model import CircuitEntity, ScheduledActivationEntity
 
 
 class CircuitDao:
     """
-    Represents a data access object for circuit. It allows for fetching and storing schedule in the database.
-    Currently there can be only one circuit.
+    Represents a data access object for circuit. It allows for fetching and storing schedule in the database. Circuits
+    are identified by the ids assigned by the backend, so several circuits can be stored at the same time. Scheduled
+    activations of a circuit are identified by their time.
     """
 
-    def __init__(self, session: Session):
-        self.session = session
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
 
-    async def fetch(self) -> CircuitEntity:
+    @in_db_thread
+    def fetch(self, circuit_id: Optional[int] = None) -> CircuitEntity:
         """
         Fetch stored circuit.
+        :param circuit_id: id of the circuit, the first stored circuit is returned if it's not specified
         :return: stored circuit
         """
-        return self.session.query(CircuitEntity).first()
+        query = self.session.query(CircuitEntity).options(joinedload(CircuitEntity.schedule))
+        if circuit_id is not None:
+            query = query.filter_by(id=circuit_id)
+
+        return query.first()
 
-    async def store(self, circuit: CircuitEntity) -> None:
+    @in_db_thread
+    def store(self, circuit: CircuitEntity, exclusive: bool = False) -> None:
         """
-        Removes previously stored circuit and stores a new one.
+        Stores the circuit writing only what differs from the stored one. Scheduled activations are upserted by their
+        time and the ones that are no longer in the schedule are removed. If several activations have the same time,
+        the first active one is kept. Nothing is written if the circuit is unchanged.
         :param circuit: new circuit
+        :param exclusive: specifies if other circuits should be removed when the circuit is stored for the first time,
+        used for the single circuit of the account, which replaces the circuit cached by older versions
         """
-        self.session.query(ScheduledActivationEntity).delete()
-        self.session.query(CircuitEntity).delete()
-        self.session.add(circuit)
+        stored = self.session.query(CircuitEntity).options(joinedload(CircuitEntity.schedule)) \
+            .filter_by(id=circuit.id).first()
+        if stored is None:
+            if exclusive:
+                self.session.query(ScheduledActivationEntity).filter(
+                    or_(ScheduledActivationEntity.circuit_id != circuit.id,
+                        ScheduledActivationEntity.circuit_id.is_(None))).delete(synchronize_session=False)
+                self.session.query(CircuitEntity).filter(CircuitEntity.id != circuit.id) \
+                    .delete(synchronize_session=False)
+
+            stored = CircuitEntity(id=circuit.id)
+            self.session.add(stored)
+
+        stored.name = circuit.name
+        stored.active = circuit.active
+
+        schedule = {}
+        for activation in circuit.schedule:
+            if activation.time not in schedule or activation.active and not schedule[activation.time].active:
+                schedule[activation.time] = activation
+
+        existing = {activation.time: activation for activation in stored.schedule}
+        for time, activation in schedule.items():
+            current = existing.pop(time, None)
+            if current is None:
+                stored.schedule.append(ScheduledActivationEntity(time=time, amount=activation.amount,
+                                                                 active=activation.active))
+            else:
+                current.amount = activation.amount
+                current.active = activation.active
+
+        for activation in existing.values():
+            stored.schedule.remove(activation)
+            self.session.delete(activation)
+
         self.session.commit()
@@ -1,11 +1,234 @@
-from sqlalchemy import create_engine
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps, partial
+from typing import Optional, Callable, Tuple, TypeVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import StaticPool
 
+from data.db.storage import StorageProfile
 from settings import Settings
 
+T = TypeVar('T')
+
+"""
+All the database work is done by a single dedicated thread. Slow writes don't block the event loop and the connection
+is never used by two threads at the same time, so it can be shared by all tasks.
+"""
+db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+
+
+class _CommitBatch:
+    """
+    Writes waiting for the same deferred commit.
+    """
+
+    def __init__(self):
+        self.future = asyncio.get_event_loop().create_future()
+
+
+class Database:
+    """
+    Local database accessed in units of work. Every unit, usually a single DAO call, runs in the database thread with
+    a new session that is closed when the unit ends, so entities don't pile up in an identity map over months of uptime
+    and a failed unit doesn't leave a broken session behind for the other ones.
+
+    Units run in a savepoint of a transaction of the single connection. Without a commit window the transaction is
+    committed after every unit. With a commit window, the transaction is committed once for all the writes done within
+    the window (group commit), so they share one fsync, and the units that wrote wait until it's done. A failed unit is
+    rolled back to its savepoint, so writes of other units in the group are kept.
+    """
+
+    def __init__(self, engine: Engine, commit_window: float = 0):
+        """
+        :param engine: engine of the local database
+        :param commit_window: number of seconds for which commits are delayed, 0 commits every unit at once
+        """
+        self.engine = engine
+        self.commit_window = commit_window
+
+        """
+        Session of the current unit of work. DAOs use it like a session, it's bound to the connection for each unit.
+        """
+        self.session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+        self._connection: Optional[Connection] = None
+        self._transaction = None
+        self._uncommitted_writes = False
+        self._batch: Optional[_CommitBatch] = None
+
+    @property
+    def connection(self) -> Connection:
+        """
+        The connection used by all units of work. It must be used only in the database thread.
+        """
+        if self._connection is None:
+            self._connection = self.engine.connect()
+
+        return self._connection
+
+    def _commit(self) -> None:
+        transaction, self._transaction = self._transaction, None
+        self._uncommitted_writes = False
+        if transaction is not None:
+            try:
+                transaction.commit()
+            except Exception:
+                transaction.rollback()
+                raise
+
+    def execute(self, work: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Executes the work as a unit of work. It must be called in the database thread.
+        :param work: function that uses the session
+        :return: result of the work and true if the unit wrote something that waits for a deferred commit
+        """
+        if self._transaction is None:
+            self._transaction = self.connection.begin()
+
+        changes = self.connection.connection.total_changes
+        savepoint = self.connection.begin_nested()
+        self.session(bind=self.connection)
+        try:
+            result = work()
+            self.session.flush()
+            savepoint.commit()
+        except Exception:
+            savepoint.rollback()
+            raise
+        finally:
+            self.session.remove()
+
+            wrote = self.connection.connection.total_changes != changes
+            if self.commit_window and (wrote or self._uncommitted_writes):
+                self._uncommitted_writes = True
+            else:
+                self._commit()
+
+        return result, wrote and self._transaction is not None
+
+    def execute_outside_transaction(self, work: Callable[[Connection], T]) -> T:
+        """
+        Executes the work outside of any transaction after writes waiting for a deferred commit are committed. It must
+        be called in the database thread.
+        :param work: function that uses the connection
+        :return: result of the work
+        """
+        self._commit()
+        return work(self.connection)
+
+    async def _commit_later(self, batch: _CommitBatch) -> None:
+        await asyncio.sleep(self.commit_window)
+
+        # the commit is queued right after the batch is closed, so it runs after all the writes of the batch
+        self._batch = None
+        try:
+            await asyncio.get_event_loop().run_in_executor(db_executor, self._commit)
+        except Exception as e:
+            batch.future.set_exception(e)
+        else:
+            batch.future.set_result(None)
+
+    async def _wait_for_commit(self) -> None:
+        """
+        Waits until the writes done so far are committed.
+        """
+        if self._batch is None:
+            self._batch = _CommitBatch()
+            asyncio.ensure_future(self._commit_later(self._batch))
+
+        await asyncio.shield(self._batch.future)
+
+    async def run(self, work: Callable[[], T]) -> T:
+        """
+        Runs the work as a unit of work in the database thread. If the commit is deferred, it returns once the writes
+        are committed.
+        :param work: function that uses the session
+        :return: result of the work
+        """
+        result, deferred = await asyncio.get_event_loop().run_in_executor(db_executor, partial(self.execute, work))
+        if deferred:
+            await self._wait_for_commit()
+
+        return result
+
+    async def run_outside_transaction(self, work: Callable[[Connection], T]) -> T:
+        """
+        Runs the work in the database thread outside of any transaction, see execute_outside_transaction().
+        :param work: function that uses the connection
+        :return: result of the work
+        """
+        return await asyncio.get_event_loop().run_in_executor(db_executor,
+                                                              partial(self.execute_outside_transaction, work))
+
+
+def configure_engine(engine: Engine, profile: StorageProfile) -> None:
+    """
+    Makes the engine apply the profile to every new connection.
+    :param engine: engine of the local database
+    :param profile: storage profile
+    """
+    pragmas = [
+        ('journal_mode', profile.journal_mode),
+        ('synchronous', profile.synchronous),
+        ('cache_size', profile.cache_size),
+        ('mmap_size', profile.mmap_size),
+        ('busy_timeout', int(profile.busy_timeout * 1000)),
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def apply_profile(connection, connection_record):
+        cursor = connection.cursor()
+        for name, value in pragmas:
+            if value is not None:
+                cursor.execute('PRAGMA {0}={1}'.format(name, value))
+        cursor.close()
+
+
+def create_database(db_name: str, profile: StorageProfile) -> Database:
+    """
+    Creates the engine of the local database configured according to the storage profile.
+    :param db_name: path of the database file
+    :param profile: storage profile
+    :return: database using the engine
+    """
+    # a single connection is kept open, so pragmas are applied once and WAL is not checkpointed on every close; it's
+    # used only by the database thread, but it may be closed by the garbage collector in another one
+    engine = create_engine('sqlite:///{0}'.format(db_name), poolclass=StaticPool,
+                           connect_args={'check_same_thread': False, 'timeout': profile.busy_timeout})
+
+    # the driver doesn't begin transactions before savepoints, so they are begun explicitly
+    @event.listens_for(engine, 'connect')
+    def disable_driver_transactions(connection, connection_record):
+        connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        connection.execute('BEGIN')
+
+    configure_engine(engine, profile)
+
+    return Database(engine, commit_window=profile.commit_window)
+
+
 settings = Settings()
 
-engine = create_engine('sqlite:///{0}'.format(settings.local_db_name))
-Session = sessionmaker(bind=engine)
+database = create_database(settings.local_db_name, settings.storage_profile)
 Base = declarative_base()
+
+
+def in_db_thread(f):
+    """
+    Turns a synchronous DAO method into a coroutine executed as a unit of work of the database of the DAO, see
+    Database. The method uses the session of the unit, which is closed when the method returns, so returned entities
+    have to be loaded completely.
+    """
+
+    @wraps(f)
+    async def decorated(self, *args, **kwargs):
+        return await self.database.run(partial(f, self, *args, **kwargs))
+
+    return decorated
@@ -0,0 +1,42 @@
+from typing import List
+
+from data.db.db_common import Database, in_db_thread
+from data.db.model import ExecutionLogEntity
+
+
+class ExecutionLogDao:
+    """
+    Represents a data access object for the execution log outbox. Logs are stored when the pump is activated and
+    removed once they are uploaded to the backend.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
+
+    @in_db_thread
+    def fetch_batch(self, limit: int) -> List[ExecutionLogEntity]:
+        """
+        Fetches the oldest logs waiting for upload.
+        :param limit: maximum number of logs
+        :return: list of logs ordered from the oldest one
+        """
+        return self.session.query(ExecutionLogEntity).order_by(ExecutionLogEntity.id).limit(limit).all()
+
+    @in_db_thread
+    def store(self, execution_log: ExecutionLogEntity) -> None:
+        """
+        Adds a new log to the outbox.
+        :param execution_log: log that should be uploaded
+        """
+        self.session.add(execution_log)
+        self.session.commit()
+
+    @in_db_thread
+    def delete(self, ids: List[int]) -> None:
+        """
+        Removes uploaded logs from the outbox.
+        :param ids: ids of uploaded logs
+        """
+        self.session.query(ExecutionLogEntity).filter(ExecutionLogEntity.id.in_(ids)).delete(synchronize_session=False)
+        self.session.commit()
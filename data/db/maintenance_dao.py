@@ -0,0 +1,39 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from data.db.db_common import Database, in_db_thread
+
+
+class MaintenanceDao:
+    """
+    Represents a data access object for maintenance of the local database file.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
+
+    @in_db_thread
+    def free_page_ratio(self) -> float:
+        """
+        Returns the ratio of unused pages in the database file. Pages freed by deleted rows are reused by new rows, but
+        the file doesn't shrink until it's vacuumed.
+        :return: number between 0 and 1
+        """
+        page_count = self.session.execute(text('PRAGMA page_count')).scalar()
+        free_pages = self.session.execute(text('PRAGMA freelist_count')).scalar()
+
+        return free_pages / page_count if page_count else 0
+
+    async def vacuum(self) -> None:
+        """
+        Rebuilds the database file without unused pages and truncates the write-ahead log if it's used. VACUUM can't
+        run inside a transaction, so it runs outside of units of work after pending writes are committed. It rewrites
+        the whole file and blocks all other database calls until it's done.
+        """
+        await self.database.run_outside_transaction(self._vacuum)
+
+    @staticmethod
+    def _vacuum(connection: Connection) -> None:
+        connection.execute(text('VACUUM'))
+        connection.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
@@ -1,5 +1,46 @@
-from data.db.model import PumpActivationEntity, ScheduledActivationEntity, CircuitEntity
-from domain.model import Circuit, ScheduledActivation, PumpActivation
+from datetime import datetime, timezone
+
+from data.db.model import PumpActivationEntity, ScheduledActivationEntity, CircuitEntity, ExecutionLogEntity, \
+    PumpActivationRollupEntity
+from domain.model import Circuit, ScheduledActivation, PumpActivation, PumpActivationRollup
+
+"""
+Date and time format of timestamps in the domain model.
+"""
+DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+"""
+Date format of days of pump activation rollups in the domain model.
+"""
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def map_timestamp_to_epoch(timestamp: str) -> int:
+    """
+    Maps a local timestamp of the domain model to the integer stored in the database. The timestamp is taken as UTC,
+    so the value doesn't depend on the time zone of the device and is the same as strftime('%s') in SQLite.
+    :param timestamp: timestamp in DATE_TIME_FORMAT
+    :return: seconds since the epoch
+    """
+    return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
+
+
+def map_epoch_to_timestamp(epoch: int) -> str:
+    """
+    Maps an integer stored in the database back to a local timestamp of the domain model.
+    :param epoch: seconds since the epoch
+    :return: timestamp in DATE_TIME_FORMAT
+    """
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(DATE_TIME_FORMAT)
+
+
+def map_epoch_to_date(epoch: int) -> str:
+    """
+    Maps an integer stored in the database to the local date it falls on.
+    :param epoch: seconds since the epoch
+    :return: date in DATE_FORMAT
+    """
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(DATE_FORMAT)
 
 
 def map_scheduled_activation_to_entity(activation: ScheduledActivation) -> ScheduledActivationEntity:
@@ -17,7 +58,7 @@ def map_circuit_to_entity(circuit: Circuit) -> CircuitEntity:
     :param circuit: domain model
     :return: database model
     """
-    return CircuitEntity(name=circuit.name,
+    return CircuitEntity(id=circuit.id, name=circuit.name,
                          schedule=[map_scheduled_activation_to_entity(item) for item in circuit.schedule],
                          active=circuit.active)
 
@@ -28,7 +69,8 @@ def map_pump_activation_to_entity(pump_activation: PumpActivation) -> PumpActiva
     :param pump_activation: domain model
     :return: database model
     """
-    return PumpActivationEntity(timestamp=pump_activation.timestamp, amount=pump_activation.amount)
+    return PumpActivationEntity(timestamp=map_timestamp_to_epoch(pump_activation.timestamp),
+                                amount=pump_activation.amount, circuit_id=pump_activation.circuit_id)
 
 
 def map_plan_item_entity_to_domain(activation: ScheduledActivationEntity) -> ScheduledActivation:
@@ -48,7 +90,7 @@ def map_circuit_entity_to_domain(circuit: CircuitEntity) -> Circuit:
     """
     return Circuit(id=circuit.id, name=circuit.name,
                    schedule=[map_scheduled_activation_to_entity(item) for item in circuit.schedule],
-                   active=circuit.active, one_time_activation=None)
+                   active=circuit.active, one_time_activations=[])
 
 
 def map_pump_activation_entity_to_domain(pump_activation: PumpActivationEntity) -> PumpActivation:
@@ -57,4 +99,38 @@ def map_pump_activation_entity_to_domain(pump_activation: PumpActivationEntity)
     :param pump_activation: database model
     :return: domain model
     """
-    return PumpActivation(timestamp=pump_activation.timestamp, amount=pump_activation.amount)
+    return PumpActivation(timestamp=map_epoch_to_timestamp(pump_activation.timestamp), amount=pump_activation.amount,
+                          circuit_id=pump_activation.circuit_id)
+
+
+def map_pump_activation_rollup_entity_to_domain(rollup: PumpActivationRollupEntity) -> PumpActivationRollup:
+    """
+    Maps entity representation of pump activation rollup to a domain model.
+    :param rollup: database model
+    :return: domain model
+    """
+    return PumpActivationRollup(day=map_epoch_to_date(rollup.day),
+                                count=rollup.count, amount=rollup.amount,
+                                first_timestamp=map_epoch_to_timestamp(rollup.first_timestamp),
+                                last_timestamp=map_epoch_to_timestamp(rollup.last_timestamp),
+                                circuit_id=rollup.circuit_id)
+
+
+def map_pump_activation_to_execution_log_entity(pump_activation: PumpActivation) -> ExecutionLogEntity:
+    """
+    Maps domain model of pump activation to its outbox entity representation.
+    :param pump_activation: domain model
+    :return: database model
+    """
+    return ExecutionLogEntity(timestamp=pump_activation.timestamp, amount=pump_activation.amount,
+                              circuit_id=pump_activation.circuit_id)
+
+
+def map_execution_log_entity_to_domain(execution_log: ExecutionLogEntity) -> PumpActivation:
+    """
+    Maps outbox entity representation of pump activation to a domain model.
+    :param execution_log: database model
+    :return: domain model
+    """
+    return PumpActivation(timestamp=execution_log.timestamp, amount=execution_log.amount,
+                          circuit_id=execution_log.circuit_id)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, func, literal_column
 from sqlalchemy.orm import relationship
 
 from data.db.db_common import Base
@@ -6,7 +6,8 @@ from data.db.db_common import Base
 
 class CircuitEntity(Base):
     """
-    Represents circuits in the database. It has a 1 - n relation with ScheduledActivationEntity.
+    Represents circuits in the database. It has a 1 - n relation with ScheduledActivationEntity. The id is the same
+    as the id of the circuit in the smart garden backend.
     """
 
     __tablename__ = 'circuits'
@@ -35,23 +36,87 @@ class ScheduledActivationEntity(Base):
     circuit_id = Column(Integer, ForeignKey('circuits.id'))
     circuit = relationship('CircuitEntity', back_populates="schedule")
 
+    __table_args__ = (
+        Index('ix_scheduled_activations_circuit_time', circuit_id, time, unique=True),
+    )
+
     def __repr__(self) -> str:
-        return "<PlanItem(id='{0}', time='{1}', water='{2}', active='{3}')>".format(
-            self.id, self.time, self.water, self.active
+        return "<PlanItem(id='{0}', time='{1}', amount='{2}', active='{3}')>".format(
+            self.id, self.time, self.amount, self.active
         )
 
 
 class PumpActivationEntity(Base):
     """
-    Represents history of pump activations.
+    Represents history of pump activations. Timestamps are stored as integer epochs, see map_timestamp_to_epoch().
+    A circuit can be activated only once for a timestamp, which is enforced by a unique index that is also used for
+    checking if an activation exists. The single circuit assigned to the account is represented by 0 in the index.
     """
 
     __tablename__ = 'pump_activations'
 
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(Integer, nullable=False)
+    amount = Column(Integer)
+    circuit_id = Column(Integer)
+
+    """
+    Circuit id as it's used in the unique index.
+    """
+    circuit_key = func.ifnull(circuit_id, literal_column('0'))
+
+    __table_args__ = (
+        Index('ix_pump_activations_circuit_slot', circuit_key, timestamp, unique=True),
+    )
+
+    def __repr__(self) -> str:
+        return "<PumpActivationEntity(id='{0}', timestamp='{1}', amount='{2}', circuit_id='{3}')>".format(
+            self.id, self.timestamp, self.amount, self.circuit_id)
+
+
+class PumpActivationRollupEntity(Base):
+    """
+    Represents pump activations of a circuit within a day that were compacted by the retention, see
+    PumpActivationRollupDao.compact(). The day and the first and last activation timestamps are integer epochs like
+    timestamps of PumpActivationEntity. The amount is the total amount of water in ml.
+    """
+
+    __tablename__ = 'pump_activation_rollups'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+    amount = Column(Integer, nullable=False)
+    first_timestamp = Column(Integer, nullable=False)
+    last_timestamp = Column(Integer, nullable=False)
+    circuit_id = Column(Integer)
+
+    """
+    Circuit id as it's used in the unique index.
+    """
+    circuit_key = func.ifnull(circuit_id, literal_column('0'))
+
+    __table_args__ = (
+        Index('ix_pump_activation_rollups_circuit_day', circuit_key, day, unique=True),
+    )
+
+    def __repr__(self) -> str:
+        return "<PumpActivationRollupEntity(id='{0}', day='{1}', count='{2}', amount='{3}', circuit_id='{4}')>".format(
+            self.id, self.day, self.count, self.amount, self.circuit_id)
+
+
+class ExecutionLogEntity(Base):
+    """
+    Represents an execution log waiting in the outbox until it's uploaded to the backend.
+    """
+
+    __tablename__ = 'execution_log_outbox'
+
     id = Column(Integer, primary_key=True)
     timestamp = Column(String)
     amount = Column(Integer)
+    circuit_id = Column(Integer)
 
     def __repr__(self) -> str:
-        return "<PumpActivationEntity(id='{0}', timestamp='{1}', amount='{2}')>".format(self.id, self.timestamp,
-                                                                                        self.amount)
+        return "<ExecutionLogEntity(id='{0}', timestamp='{1}', amount='{2}', circuit_id='{3}')>".format(
+            self.id, self.timestamp, self.amount, self.circuit_id)
@@ -1,26 +1,84 @@
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
-from data.db.db_common import Session
+from data.db.db_common import Database, in_db_thread
 from data.db.model import PumpActivationEntity
 
 
 class PumpActivationDao:
     """
     Represents a data access object for pump activations. It allows for fetching, storing and checking if an activation
-    with specified timestamp is present in the database.
+    with specified timestamp is present in the database. Timestamps are integer epochs.
     """
 
-    def __init__(self, session: Session):
-        self.session = session
+    """
+    Default number of activations in a page of history.
+    """
+    PAGE_SIZE = 500
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
 
-    async def fetch_all(self) -> List[PumpActivationEntity]:
+    @in_db_thread
+    def fetch_all(self, circuit_id: Optional[int] = None) -> List[PumpActivationEntity]:
         """
         Fetches all stored pump activations.
+        :param circuit_id: id of the circuit, activations of all circuits are returned if it's not specified
         :return: list of pump activations
         """
-        return self.session.query(PumpActivationEntity)
+        query = self.session.query(PumpActivationEntity)
+        if circuit_id is not None:
+            query = query.filter_by(circuit_id=circuit_id)
+
+        return query.all()
+
+    @in_db_thread
+    def fetch_page(self, circuit_id: Optional[int] = None, columns: Sequence[str] = (), since: Optional[int] = None,
+                   until: Optional[int] = None, after: Optional[int] = None, limit: int = PAGE_SIZE,
+                   newest_first: bool = False) -> List[Tuple]:
+        """
+        Fetches a page of history of the circuit ordered by timestamp. Pages are addressed by the last timestamp of the
+        previous page (keyset pagination), so every page is a range scan of the unique index on the circuit and
+        timestamp no matter how deep in the history it is. Only the requested columns are selected and no entities are
+        created.
+        :param circuit_id: id of the circuit that was activated
+        :param columns: names of the columns of PumpActivationEntity selected besides the timestamp
+        :param since: the oldest timestamp, inclusive
+        :param until: the newest timestamp, exclusive
+        :param after: the last timestamp of the previous page, None for the first page
+        :param limit: maximum number of activations in the page
+        :param newest_first: true if the history is walked from the newest activation
+        :return: list of rows, each of them contains the timestamp followed by the requested columns
+        """
+        timestamp = PumpActivationEntity.timestamp
+        query = self.session.query(timestamp, *(getattr(PumpActivationEntity, column) for column in columns)).filter(
+            PumpActivationEntity.circuit_key == (circuit_id or 0))
+
+        if since is not None:
+            query = query.filter(timestamp >= since)
+        if until is not None:
+            query = query.filter(timestamp < until)
+        if after is not None:
+            query = query.filter(timestamp < after if newest_first else timestamp > after)
+
+        return [tuple(row) for row in query.order_by(timestamp.desc() if newest_first else timestamp).limit(limit)]
+
+    @in_db_thread
+    def fetch_timestamps(self, since: int, circuit_id: Optional[int] = None) -> List[int]:
+        """
+        Fetches timestamps of pump activations of the circuit starting from the given one. The unique index on the
+        circuit and timestamp covers the query, so rows are not read at all.
+        :param since: the oldest timestamp
+        :param circuit_id: id of the circuit that was activated
+        :return: list of timestamps
+        """
+        return [timestamp for timestamp, in self.session.query(PumpActivationEntity.timestamp).filter(
+            PumpActivationEntity.circuit_key == (circuit_id or 0),
+            PumpActivationEntity.timestamp >= since
+        )]
 
-    async def store(self, pump_activation: PumpActivationEntity) -> None:
+    @in_db_thread
+    def store(self, pump_activation: PumpActivationEntity) -> None:
         """
         Stores a new pump activation in the database.
         :param pump_activation: pump activation that should be stored
@@ -28,11 +86,18 @@ class PumpActivationDao:
         self.session.add(pump_activation)
         self.session.commit()
 
-    async def exists(self, timestamp: str) -> bool:
+    @in_db_thread
+    def exists(self, timestamp: int, circuit_id: Optional[int] = None) -> bool:
         """
-        Checks if there is a pump activation with specified timestamp in the database.
+        Checks if there is a pump activation with specified timestamp in the database. The lookup uses the unique index
+        on the circuit and timestamp, so it doesn't slow down as the history grows.
         :param timestamp: activation timestamp
+        :param circuit_id: id of the circuit that was activated
         :return: true if such activation exists, false otherwise
         """
         return self.session.query(
-            self.session.query(PumpActivationEntity).filter_by(timestamp=timestamp).exists()).scalar()
+            self.session.query(PumpActivationEntity).filter(
+                PumpActivationEntity.circuit_key == (circuit_id or 0),
+                PumpActivationEntity.timestamp == timestamp
+            ).exists()
+        ).scalar()
@@ -0,0 +1,85 @@
+from typing import List, Optional
+
+from sqlalchemy import func
+
+from data.db.db_common import Database, in_db_thread
+from data.db.model import PumpActivationEntity, PumpActivationRollupEntity
+
+"""
+Number of seconds in a day, days of rollups start at multiples of it.
+"""
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class PumpActivationRollupDao:
+    """
+    Represents a data access object for daily rollups of pump activations. It allows for fetching rollups and for
+    compacting old pump activations into them.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
+
+    @in_db_thread
+    def fetch_all(self, circuit_id: Optional[int] = None) -> List[PumpActivationRollupEntity]:
+        """
+        Fetches all stored rollups ordered by day.
+        :param circuit_id: id of the circuit, rollups of all circuits are returned if it's not specified
+        :return: list of rollups
+        """
+        query = self.session.query(PumpActivationRollupEntity)
+        if circuit_id is not None:
+            query = query.filter_by(circuit_id=circuit_id)
+
+        return query.order_by(PumpActivationRollupEntity.day).all()
+
+    @in_db_thread
+    def compact(self, before: int) -> int:
+        """
+        Compacts pump activations of the oldest day that has activations older than the given timestamp. Activations of
+        every circuit within the day are aggregated into its rollup, which is created or extended, and removed. Only
+        a single day is compacted, so the database is not held for long even if years of history are waiting.
+        :param before: timestamp, only older activations are compacted
+        :return: number of compacted activations, 0 if there is nothing to compact
+        """
+        oldest = self.session.query(func.min(PumpActivationEntity.timestamp)).filter(
+            PumpActivationEntity.timestamp < before).scalar()
+        if oldest is None:
+            return 0
+
+        day = oldest - oldest % SECONDS_PER_DAY
+        in_range = (PumpActivationEntity.timestamp >= day,
+                    PumpActivationEntity.timestamp < min(day + SECONDS_PER_DAY, before))
+
+        totals = self.session.query(
+            PumpActivationEntity.circuit_id,
+            func.count(PumpActivationEntity.id),
+            func.ifnull(func.sum(PumpActivationEntity.amount), 0),
+            func.min(PumpActivationEntity.timestamp),
+            func.max(PumpActivationEntity.timestamp)
+        ).filter(*in_range).group_by(PumpActivationEntity.circuit_key).all()
+
+        compacted = 0
+        for circuit_id, count, amount, first_timestamp, last_timestamp in totals:
+            rollup = self.session.query(PumpActivationRollupEntity).filter(
+                PumpActivationRollupEntity.circuit_key == (circuit_id or 0),
+                PumpActivationRollupEntity.day == day
+            ).first()
+
+            if rollup is None:
+                self.session.add(PumpActivationRollupEntity(
+                    day=day, count=count, amount=amount, first_timestamp=first_timestamp,
+                    last_timestamp=last_timestamp, circuit_id=circuit_id))
+            else:
+                rollup.count += count
+                rollup.amount += amount
+                rollup.first_timestamp = min(rollup.first_timestamp, first_timestamp)
+                rollup.last_timestamp = max(rollup.last_timestamp, last_timestamp)
+
+            compacted += count
+
+        self.session.query(PumpActivationEntity).filter(*in_range).delete(synchronize_session=False)
+        self.session.commit()
+
+        return compacted
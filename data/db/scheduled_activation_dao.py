@@ -1,32 +1,29 @@
-from typing import List
+from typing import List, Optional
 
-from data.db.db_common import Session
+from data.db.db_common import Database, in_db_thread
 from data.db.model import ScheduledActivationEntity
 
 
 class ScheduledActivationDao:
     """
-    Represents a data access object for scheduled activations. It allows for fetching and storing items in the database.
-    Currently the table is cleared every time when a new list is stored because for now the app supports only one
-    schedule that is constantly pulled and cached from the backend.
+    Represents a data access object for scheduled activations. It allows for fetching items from the database.
+    Activations are written together with their circuit by CircuitDao.store(), which upserts only the ones that
+    changed.
     """
 
-    def __init__(self, session: Session):
-        self.session = session
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
 
-    async def fetch_all(self) -> List[ScheduledActivationEntity]:
+    @in_db_thread
+    def fetch_all(self, circuit_id: Optional[int] = None) -> List[ScheduledActivationEntity]:
         """
         Fetches all stored plan items.
+        :param circuit_id: id of the circuit, plan items of all circuits are returned if it's not specified
         :return: list of plan items
         """
-        return self.session.query(ScheduledActivationEntity)
+        query = self.session.query(ScheduledActivationEntity)
+        if circuit_id is not None:
+            query = query.filter_by(circuit_id=circuit_id)
 
-    async def store(self, schedule: List[ScheduledActivationEntity]) -> None:
-        """
-        Removes all existing activations and stores new ones. The table is cleared because current design supports only
-        one schedule that is frequently pulled.
-        :param schedule: list of activations that should be stored
-        """
-        self.session.query(ScheduledActivationEntity).delete()
-        self.session.add_all(schedule)
-        self.session.commit()
+        return query.all()
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StorageProfile:
+    """
+    SQLite settings applied to every connection to the local database. Settings that are None are left at the SQLite
+    defaults. The busy timeout is specified in seconds. The commit window is the time in seconds for which commits are
+    delayed, so all the writes done within it are committed in a single transaction; 0 commits every write at once.
+    """
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    cache_size: Optional[int] = None
+    mmap_size: Optional[int] = None
+    busy_timeout: float = 5
+    commit_window: float = 0
+
+
+"""
+Storage profiles that can be selected in the settings. The default profile keeps the SQLite defaults: a rollback
+journal and several fsyncs for every write. The SD card profile uses WAL with synchronous=NORMAL, so commits are
+appended to the log without fsync and the log is synced only at checkpoints, and groups writes within 50 ms into one
+transaction. After a power loss the database stays consistent, but the last commits may be lost.
+"""
+STORAGE_PROFILES = {
+    'default': StorageProfile(),
+    'sd_card': StorageProfile(
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        cache_size=-4096,
+        mmap_size=32 * 1024 * 1024,
+        busy_timeout=10,
+        commit_window=0.05
+    ),
+}
@@ -0,0 +1,109 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from data.db.db_common import Database, in_db_thread
+from data.db.pump_activation_rollup_dao import SECONDS_PER_DAY
+
+"""
+Expressions that map the day of an activation to the start of the period it's aggregated into. Days are integer epochs
+of midnight, the epoch was on Thursday, so weeks starting on Monday are shifted by 3 days.
+"""
+PERIOD_EXPRESSIONS = {
+    'day': 'day',
+    'week': 'day - ((day / {0} + 3) % 7) * {0}'.format(SECONDS_PER_DAY),
+    'circuit': ':since',
+}
+
+USAGE_QUERY = '''
+WITH usage(circuit_key, day, count, amount) AS (
+    SELECT IFNULL(circuit_id, 0), timestamp - timestamp % {day}, 1, IFNULL(amount, 0)
+    FROM pump_activations
+    WHERE timestamp >= :since AND timestamp < :until {activation_filter}
+    UNION ALL
+    SELECT IFNULL(circuit_id, 0), day, count, amount
+    FROM pump_activation_rollups
+    WHERE day >= :since AND day < :until {rollup_filter}
+)
+SELECT NULLIF(circuit_key, 0), {period} AS period, SUM(count), SUM(amount)
+FROM usage
+GROUP BY circuit_key, period
+ORDER BY period, circuit_key
+'''
+
+MISSED_ACTIVATIONS_QUERY = '''
+WITH RECURSIVE days(day) AS (
+    SELECT :since
+    UNION ALL
+    SELECT day + {day} FROM days WHERE day + {day} < :until
+),
+slots(seconds, amount) AS (
+    SELECT SUBSTR(time, 1, 2) * 3600 + SUBSTR(time, 4, 2) * 60 + SUBSTR(time, 7, 2), amount
+    FROM scheduled_activations
+    WHERE circuit_id = :schedule_circuit_id AND active
+)
+SELECT days.day + slots.seconds AS timestamp, slots.amount
+FROM days, slots
+WHERE days.day + slots.seconds < :until
+    AND NOT EXISTS (SELECT 1 FROM pump_activations
+                    WHERE IFNULL(circuit_id, 0) = :circuit_key AND timestamp = days.day + slots.seconds)
+    AND NOT EXISTS (SELECT 1 FROM pump_activation_rollups
+                    WHERE IFNULL(circuit_id, 0) = :circuit_key AND day = days.day)
+ORDER BY timestamp
+'''
+
+
+class WaterUsageDao:
+    """
+    Represents a data access object for water usage analytics. Aggregation is done by SQLite, which combines pump
+    activations with daily rollups of the compacted ones, so only the aggregated rows are transferred. Timestamps and
+    days are integer epochs.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.session = database.session
+
+    @in_db_thread
+    def fetch_usage(self, period: str, since: int, until: int,
+                    circuit_id: Optional[int] = None) -> List[Tuple[Optional[int], int, int, int]]:
+        """
+        Fetches the number of activations and the total amount of water per period and circuit.
+        :param period: 'day', 'week' starting on Monday, or 'circuit' for totals of the whole range
+        :param since: start of the first day of the range, inclusive
+        :param until: start of the day after the range, exclusive
+        :param circuit_id: id of the circuit, all circuits are aggregated if it's not specified
+        :return: list of circuit id, start of the period, count and amount ordered by period and circuit
+        """
+        parameters = {'since': since, 'until': until}
+        activation_filter = rollup_filter = ''
+        if circuit_id is not None:
+            activation_filter = rollup_filter = 'AND IFNULL(circuit_id, 0) = :circuit_key'
+            parameters['circuit_key'] = circuit_id
+
+        query = USAGE_QUERY.format(day=SECONDS_PER_DAY, period=PERIOD_EXPRESSIONS[period],
+                                   activation_filter=activation_filter, rollup_filter=rollup_filter)
+
+        return [tuple(row) for row in self.session.execute(text(query), parameters)]
+
+    @in_db_thread
+    def fetch_missed_activations(self, since: int, until: int,
+                                 circuit_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Fetches slots of the stored schedule of the circuit for which the pump was not activated. Days that were
+        compacted into rollups are skipped, because their activations can't be matched with slots anymore. The
+        schedule may have been different in the past, so the result is exact only for days since the last change.
+        :param since: start of the first day of the range, inclusive
+        :param until: end of the range, exclusive
+        :param circuit_id: id of the circuit, None stands for the single circuit assigned to the account
+        :return: list of timestamps and amounts of the missed slots
+        """
+        schedule_circuit_id = circuit_id
+        if schedule_circuit_id is None:
+            schedule_circuit_id = self.session.execute(text('SELECT id FROM circuits ORDER BY id LIMIT 1')).scalar()
+
+        query = MISSED_ACTIVATIONS_QUERY.format(day=SECONDS_PER_DAY)
+        parameters = {'since': since, 'until': until, 'schedule_circuit_id': schedule_circuit_id,
+                      'circuit_key': circuit_id or 0}
+
+        return [tuple(row) for row in self.session.execute(text(query), parameters)]
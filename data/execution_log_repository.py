@@ -0,0 +1,92 @@
+import asyncio
+from itertools import groupby
+from logging import Logger
+from typing import List, Optional
+
+from data.db.execution_log_dao import ExecutionLogDao
+from data.db.mapper import map_execution_log_entity_to_domain, map_pump_activation_to_execution_log_entity
+from data.db.model import ExecutionLogEntity
+from data.smart_garden.exceptions import SmartGardenRejectedError
+from data.smart_garden.smart_garden_backend import SmartGardenBackend
+from domain.model import PumpActivation
+
+
+class ExecutionLogRepository:
+    """
+    Repository of execution logs that works as an outbox. Logs are stored in the local database first and uploaded to
+    the smart garden backend in batches, so the pump activation never waits for the network and logs created while
+    offline are not lost. Logs the backend rejects are dropped, so they don't block the newer ones forever.
+    """
+
+    def __init__(self, execution_log_dao: ExecutionLogDao, backend: SmartGardenBackend, logger: Logger):
+        self._execution_log_dao = execution_log_dao
+        self._backend = backend
+        self._logger = logger
+        self._pending = asyncio.Event()
+        self._pending.set()
+
+    async def store(self, activation: PumpActivation) -> None:
+        """
+        Adds the execution log to the outbox.
+        :param activation: activation details with timestamp and water amount
+        """
+        await self._execution_log_dao.store(map_pump_activation_to_execution_log_entity(activation))
+        self._pending.set()
+
+    async def wait_for_pending(self, timeout: float) -> None:
+        """
+        Waits until a new log is stored or the timeout passes.
+        :param timeout: maximum waiting time in seconds
+        """
+        try:
+            await asyncio.wait_for(self._pending.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def upload(self, batch_size: int) -> int:
+        """
+        Uploads the oldest logs from the outbox and removes them once the backend accepts them. Logs of each circuit
+        are sent in a separate request. If the backend rejects the request, the logs are sent one by one as single
+        objects, the format the activation log endpoint accepted before batches, and the ones rejected on their own
+        are dropped.
+        :param batch_size: maximum number of logs sent in a single request
+        :return: number of uploaded logs
+        :raises SmartGardenException: if the logs could not be uploaded
+        """
+        self._pending.clear()
+
+        batch = await self._execution_log_dao.fetch_batch(batch_size)
+        if not batch:
+            return 0
+
+        batch.sort(key=lambda log: (log.circuit_id is not None, log.circuit_id or 0))
+        try:
+            for circuit_id, logs in groupby(batch, key=lambda log: log.circuit_id):
+                logs = list(logs)
+                try:
+                    await self._backend.send_execution_logs([map_execution_log_entity_to_domain(log) for log in logs],
+                                                            circuit_id)
+                except SmartGardenRejectedError as e:
+                    self._logger.warning('the backend rejected {0} execution logs, uploading them one by one: {1}'
+                                         .format(len(logs), e))
+                    await self._upload_one_by_one(logs, circuit_id)
+                else:
+                    await self._execution_log_dao.delete([log.id for log in logs])
+        except Exception:
+            self._pending.set()
+            raise
+
+        if len(batch) == batch_size:
+            self._pending.set()
+
+        return len(batch)
+
+    async def _upload_one_by_one(self, logs: List[ExecutionLogEntity], circuit_id: Optional[int]) -> None:
+        for log in logs:
+            try:
+                await self._backend.send_execution_log(map_execution_log_entity_to_domain(log), circuit_id)
+            except SmartGardenRejectedError as e:
+                self._logger.error('dropping execution log {0} of {1} ml rejected by the backend: {2}'.format(
+                    log.timestamp, log.amount, e))
+
+            await self._execution_log_dao.delete([log.id])
@@ -38,8 +38,7 @@ def map_circuit_to_domain(circuit: CircuitData) -> Circuit:
         id=circuit.id,
         name=circuit.name,
         active=circuit.active,
-        one_time_activation=map_one_time_activation_to_domain(
-            circuit.one_time_activation) if circuit.one_time_activation else None,
+        one_time_activations=[map_one_time_activation_to_domain(a) for a in circuit.one_time_activations],
         schedule=[map_scheduled_activation_to_domain(p) for p in circuit.schedule]
     )
 
@@ -49,8 +48,7 @@ def map_domain_to_circuit(circuit: Circuit) -> CircuitData:
         id=circuit.id,
         name=circuit.name,
         active=circuit.active,
-        one_time_activation=map_domain_to_one_time_activation(
-            circuit.one_time_activation) if circuit.one_time_activation else None,
+        one_time_activations=[map_domain_to_one_time_activation(a) for a in circuit.one_time_activations],
         schedule=[map_domain_to_scheduled_activation(p) for p in circuit.schedule]
     )
 
@@ -20,5 +20,5 @@ class CircuitData:
     id: int
     name: str
     active: bool
-    one_time_activation: OneTimeActivationData
+    one_time_activations: List[OneTimeActivationData]
     schedule: List[ScheduledActivationData]
@@ -5,7 +5,7 @@ class OneTimeActivationSchema(Schema):
     class Meta:
         unknown = EXCLUDE
 
-    timestamp = fields.Str()
+    timestamp = fields.Str(required=True)
     amount = fields.Int(missing=0)
 
 
@@ -13,7 +13,7 @@ class ScheduledActivationSchema(Schema):
     class Meta:
         unknown = EXCLUDE
 
-    time = fields.Str()
+    time = fields.Str(required=True)
     amount = fields.Int(missing=0)
     active = fields.Bool(missing=False)
 
@@ -27,4 +27,5 @@ class CircuitSchema(Schema):
     active = fields.Bool()
     healthy = fields.Bool()
     one_time_activation = fields.Nested(OneTimeActivationSchema, allow_none=True, missing=None)
+    today_one_time_activations = fields.Nested(OneTimeActivationSchema, many=True, allow_none=True, missing=[])
     schedule = fields.Nested(ScheduledActivationSchema, many=True, allow_none=True, missing=[])
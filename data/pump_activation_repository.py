@@ -1,39 +1,166 @@
-from typing import List
+import asyncio
+from dataclasses import replace
+from datetime import datetime, time, timedelta
+from typing import List, Optional, Set, AsyncIterator, Sequence, Tuple
 
 from data.db.pump_activation_dao import PumpActivationDao
-from data.db.mapper import map_pump_activation_entity_to_domain, \
-    map_pump_activation_to_entity
-from domain.model import PumpActivation
+from data.db.mapper import map_pump_activation_entity_to_domain, map_pump_activation_to_entity, \
+    map_timestamp_to_epoch, map_pump_activation_rollup_entity_to_domain, map_epoch_to_timestamp, DATE_TIME_FORMAT
+from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
+from device.clock import Clock
+from domain.model import PumpActivation, PumpActivationRollup
 
 
 class PumpActivationRepository:
     """
     Repository of pump activations that uses only local database. This data represents local activation history and
-    currently is not synchronized with the backend.
+    currently is not synchronized with the backend. The repository is bound to a single circuit.
+
+    Activations older than the retention period are compacted into daily rollups, see RetentionRepository, so fetch()
+    returns only the recent ones. history() walks them page by page, so memory doesn't depend on the length of the
+    history.
+
+    Timestamps of activations executed since the start of the previous day are kept in memory, so checking if a recent
+    slot was executed doesn't touch the database. The index is loaded on first use, written through by store() and
+    rolled over at midnight. It relies on the repository being the only writer of activations of its circuit.
+    """
+
+    """
+    Number of past days, besides today, covered by the in-memory index of executed activations.
     """
+    INDEXED_DAYS = 1
 
-    def __init__(self, pump_activation_dao: PumpActivationDao):
+    def __init__(self, pump_activation_dao: PumpActivationDao, circuit_id: Optional[int] = None,
+                 rollup_dao: Optional[PumpActivationRollupDao] = None, clock: Optional[Clock] = None):
+        """
+        :param pump_activation_dao: data access object for pump activations
+        :param circuit_id: id of the circuit, None stands for the single circuit assigned to the account
+        :param rollup_dao: data access object for rollups of compacted pump activations
+        :param clock: clock used for rolling over the in-memory index, the system clock if it's not specified
+        """
         self.pump_activation_dao = pump_activation_dao
+        self.circuit_id = circuit_id
+        self.rollup_dao = rollup_dao
+        self._clock = clock or Clock()
+
+        self._executed: Optional[Set[int]] = None
+        self._window_start: Optional[int] = None
+        self._index_lock = asyncio.Lock()
+
+    def _current_window_start(self) -> int:
+        """
+        Returns the timestamp of the start of the oldest day covered by the in-memory index.
+        """
+        start = datetime.combine(self._clock.now().date(), time()) - timedelta(
+            days=PumpActivationRepository.INDEXED_DAYS)
+        return map_timestamp_to_epoch(start.strftime(DATE_TIME_FORMAT))
+
+    async def _index(self) -> Set[int]:
+        """
+        Returns the in-memory index of executed activations, loading it from the database the first time and dropping
+        days that left the window after midnight.
+        """
+        window_start = self._current_window_start()
+        if self._executed is not None and self._window_start == window_start:
+            return self._executed
+
+        async with self._index_lock:
+            if self._executed is None:
+                self._executed = set(await self.pump_activation_dao.fetch_timestamps(window_start, self.circuit_id))
+            elif self._window_start != window_start:
+                self._executed = {timestamp for timestamp in self._executed if timestamp >= window_start}
+            self._window_start = window_start
+
+        return self._executed
 
     async def fetch(self) -> List[PumpActivation]:
         """
-        Returns all stored pump activations.
+        Returns all stored pump activations of the circuit that were not compacted yet.
         :return: list of pump activations
         """
         return [map_pump_activation_entity_to_domain(activation) for activation in
-                await self.pump_activation_dao.fetch_all()]
+                await self.pump_activation_dao.fetch_all(self.circuit_id)]
+
+    async def _pages(self, columns: Sequence[str], since: Optional[str], until: Optional[str], newest_first: bool,
+                     page_size: int) -> AsyncIterator[Tuple]:
+        """
+        Yields rows of the history page by page, see PumpActivationDao.fetch_page().
+        """
+        since = map_timestamp_to_epoch(since) if since else None
+        until = map_timestamp_to_epoch(until) if until else None
+        after = None
+
+        while True:
+            page = await self.pump_activation_dao.fetch_page(self.circuit_id, columns, since=since, until=until,
+                                                             after=after, limit=page_size, newest_first=newest_first)
+            for row in page:
+                yield row
+
+            if len(page) < page_size:
+                return
+
+            after = page[-1][0]
+
+    async def history(self, since: Optional[str] = None, until: Optional[str] = None, newest_first: bool = False,
+                      page_size: int = PumpActivationDao.PAGE_SIZE) -> AsyncIterator[PumpActivation]:
+        """
+        Iterates over pump activations of the circuit that were not compacted yet, fetching them page by page. Only
+        timestamps and amounts are read from the database.
+        :param since: the oldest timestamp, inclusive, the history is not limited if it's not specified
+        :param until: the newest timestamp, exclusive, the history is not limited if it's not specified
+        :param newest_first: true if the history is walked from the newest activation
+        :param page_size: number of activations fetched at once
+        :return: async iterator of pump activations ordered by timestamp
+        """
+        async for timestamp, amount in self._pages(('amount',), since, until, newest_first, page_size):
+            yield PumpActivation(timestamp=map_epoch_to_timestamp(timestamp), amount=amount, circuit_id=self.circuit_id)
+
+    async def history_timestamps(self, since: Optional[str] = None, until: Optional[str] = None,
+                                 newest_first: bool = False,
+                                 page_size: int = PumpActivationDao.PAGE_SIZE) -> AsyncIterator[str]:
+        """
+        Iterates over timestamps of pump activations of the circuit like history(). The query is covered by the index,
+        so table rows are not read at all.
+        :return: async iterator of timestamps
+        """
+        async for timestamp, in self._pages((), since, until, newest_first, page_size):
+            yield map_epoch_to_timestamp(timestamp)
+
+    async def fetch_rollups(self) -> List[PumpActivationRollup]:
+        """
+        Returns daily rollups of compacted pump activations of the circuit.
+        :return: list of rollups ordered by day, empty if the repository has no rollup dao
+        """
+        if self.rollup_dao is None:
+            return []
+
+        return [map_pump_activation_rollup_entity_to_domain(rollup) for rollup in
+                await self.rollup_dao.fetch_all(self.circuit_id)]
 
     async def store(self, activation: PumpActivation) -> None:
         """
-        Stores new pump activation in the database.
+        Stores new pump activation of the circuit in the database and adds it to the in-memory index.
         :param activation: pump activation
         """
-        await self.pump_activation_dao.store(map_pump_activation_to_entity(activation))
+        # the index is loaded before the write, so the loading query can't miss it
+        await self._index()
+        entity = map_pump_activation_to_entity(replace(activation, circuit_id=self.circuit_id))
+        await self.pump_activation_dao.store(entity)
+
+        executed = await self._index()
+        if entity.timestamp >= self._window_start:
+            executed.add(entity.timestamp)
 
     async def exists(self, timestamp: str) -> bool:
         """
-        Checks if pump was activated in the past for given timestamp.
+        Checks if pump of the circuit was activated in the past for given timestamp. Timestamps since the start of the
+        previous day are looked up in memory, older ones in the database.
         :param timestamp: activation timestamp
         :return: true if pump was activated for the timestamp, false otherwise
         """
-        return await self.pump_activation_dao.exists(timestamp)
+        executed = await self._index()
+        epoch = map_timestamp_to_epoch(timestamp)
+        if epoch >= self._window_start:
+            return epoch in executed
+
+        return await self.pump_activation_dao.exists(epoch, self.circuit_id)
@@ -0,0 +1,36 @@
+from data.db.maintenance_dao import MaintenanceDao
+from data.db.mapper import map_timestamp_to_epoch
+from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
+
+
+class RetentionRepository:
+    """
+    Repository that keeps the local database bounded. Pump activations of all circuits older than the retention period
+    are compacted into daily rollups with the number of activations, the total amount of water and the first and last
+    activation time, and the space freed by them is returned to the file system by vacuuming the database.
+    """
+
+    def __init__(self, rollup_dao: PumpActivationRollupDao, maintenance_dao: MaintenanceDao):
+        self._rollup_dao = rollup_dao
+        self._maintenance_dao = maintenance_dao
+
+    async def compact(self, before: str) -> int:
+        """
+        Compacts pump activations of the oldest day that has activations older than the given timestamp. It has to be
+        called repeatedly until it returns 0 to compact all of them.
+        :param before: timestamp in DATE_TIME_FORMAT, only older activations are compacted
+        :return: number of compacted activations
+        """
+        return await self._rollup_dao.compact(map_timestamp_to_epoch(before))
+
+    async def free_space_ratio(self) -> float:
+        """
+        Returns the ratio of the database file that is unused and would be released by vacuum().
+        """
+        return await self._maintenance_dao.free_page_ratio()
+
+    async def vacuum(self) -> None:
+        """
+        Rebuilds the database file to release the unused space. All other database calls wait until it's done.
+        """
+        await self._maintenance_dao.vacuum()
@@ -0,0 +1,68 @@
+import base64
+import json
+import os
+from typing import Optional
+
+from marshmallow import ValidationError
+
+from data.smart_garden.model import SmartGardenAuthData
+from data.smart_garden.schema import SmartGardenAuthSchema
+
+
+def token_expiry(token: str, received_at: Optional[float] = None) -> Optional[float]:
+    """
+    Extracts the expiry time from a JWT without verifying its signature. The backend remains responsible for
+    validation, the value is used only to refresh the token before it expires. If the time of receiving the token is
+    known and the token carries its issue time, the expiry is calculated from the token lifetime so that the device
+    clock doesn't have to be in sync with the backend.
+    :param token: encoded JWT
+    :param received_at: unix timestamp of receiving the token
+    :return: expiry as a unix timestamp or None if the token does not carry one
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+
+        if received_at is not None and 'iat' in claims:
+            return received_at + float(claims['exp']) - float(claims['iat'])
+
+        return float(claims['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenStore:
+    """
+    Keeps access and refresh tokens in a local file so they survive restarts and the app doesn't have to log in with
+    the password every time it starts.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the file used for storing the tokens
+        """
+        self._path = path
+
+    def load(self) -> Optional[SmartGardenAuthData]:
+        """
+        Loads previously stored tokens.
+        :return: stored tokens or None if there are no usable tokens
+        """
+        try:
+            with open(self._path) as f:
+                return SmartGardenAuthData(**SmartGardenAuthSchema().load(json.load(f)))
+        except (OSError, TypeError, ValueError, ValidationError):
+            return None
+
+    def store(self, auth_data: SmartGardenAuthData) -> None:
+        """
+        Stores tokens replacing the previous ones. The file is replaced atomically and is readable only by the owner.
+        :param auth_data: tokens that should be stored
+        """
+        tmp_path = '{0}.tmp'.format(self._path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(SmartGardenAuthSchema().dumps(auth_data))
+
+        os.replace(tmp_path, self._path)
@@ -0,0 +1,97 @@
+import random
+import time
+from enum import Enum
+
+
+class ConnectivityState(Enum):
+    ONLINE = 'online'
+    DEGRADED = 'degraded'
+    OFFLINE = 'offline'
+
+
+class ConnectivityMonitor:
+    """
+    Tracks the connectivity with the smart garden backend and works as a circuit breaker. After the first failure
+    the backend is considered degraded and after several consecutive failures it's considered offline. While offline,
+    requests fail immediately instead of waiting for a timeout and only a single probe request is let through once
+    the backoff passes. The backoff grows exponentially with each failed probe and is jittered so a fleet of devices
+    doesn't probe the backend at the same moment.
+    """
+
+    """
+    Number of consecutive failures after which the backend is considered offline.
+    """
+    OFFLINE_THRESHOLD = 3
+
+    """
+    Initial and maximum delay in seconds between probes while the backend is offline.
+    """
+    MIN_BACKOFF = 5
+    MAX_BACKOFF = 300
+
+    def __init__(self, offline_threshold: int = OFFLINE_THRESHOLD, min_backoff: float = MIN_BACKOFF,
+                 max_backoff: float = MAX_BACKOFF):
+        """
+        :param offline_threshold: number of consecutive failures after which the backend is considered offline
+        :param min_backoff: initial delay between probes
+        :param max_backoff: maximum delay between probes
+        """
+        self._offline_threshold = offline_threshold
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+
+        self._state = ConnectivityState.ONLINE
+        self._failures = 0
+        self._backoff = min_backoff
+        self._next_probe = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> ConnectivityState:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Checks if a request can be sent. While offline only one probe is allowed after the backoff passes.
+        :return: true if the request should be sent, false if it should fail immediately
+        """
+        if self._state != ConnectivityState.OFFLINE:
+            return True
+
+        if self._probe_in_flight or time.monotonic() < self._next_probe:
+            return False
+
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """
+        Records a request that reached the backend.
+        """
+        self._state = ConnectivityState.ONLINE
+        self._failures = 0
+        self._backoff = self._min_backoff
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Records a request that did not reach the backend or was not handled by it.
+        """
+        self._failures += 1
+
+        if self._state == ConnectivityState.OFFLINE:
+            self._backoff = min(self._backoff * 2, self._max_backoff)
+        elif self._failures >= self._offline_threshold:
+            self._state = ConnectivityState.OFFLINE
+        else:
+            self._state = ConnectivityState.DEGRADED
+            return
+
+        self._probe_in_flight = False
+        self._next_probe = time.monotonic() + random.uniform(self._backoff / 2, self._backoff)
+
+    def cancel_request(self) -> None:
+        """
+        Releases the probe if the request was cancelled before it completed.
+        """
+        self._probe_in_flight = False
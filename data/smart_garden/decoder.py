@@ -0,0 +1,194 @@
+from typing import List
+
+from marshmallow import ValidationError
+
+from data.model.model import CircuitData, OneTimeActivationData, ScheduledActivationData
+from data.model.schema import CircuitSchema
+from data.smart_garden.model import SmartGardenAuthData, SmartGardenAuthRefreshData, PumpActivationData
+from data.smart_garden.schema import SmartGardenAuthSchema, SmartGardenAuthRefreshSchema, PumpActivationSchema
+
+
+class _UnsupportedPayload(Exception):
+    """
+    Raised by the fast path when a payload needs type coercion or is invalid, so it has to be handled by marshmallow.
+    """
+    pass
+
+
+def _require_str(value) -> str:
+    if type(value) is not str:
+        raise _UnsupportedPayload()
+    return value
+
+
+def _optional_int(data: dict, key: str, default: int) -> int:
+    value = data.get(key, default)
+    if type(value) is not int:
+        raise _UnsupportedPayload()
+    return value
+
+
+def _optional_bool(data: dict, key: str, default: bool) -> bool:
+    value = data.get(key, default)
+    if type(value) is not bool:
+        raise _UnsupportedPayload()
+    return value
+
+
+def _decode_one_time_activation_fast(data) -> OneTimeActivationData:
+    if type(data) is not dict or 'timestamp' not in data:
+        raise _UnsupportedPayload()
+
+    return OneTimeActivationData(timestamp=_require_str(data['timestamp']), amount=_optional_int(data, 'amount', 0))
+
+
+def _decode_circuit_fast(data) -> CircuitData:
+    if type(data) is not dict:
+        raise _UnsupportedPayload()
+
+    name = _require_str(data['name']) if 'name' in data else None
+    if 'healthy' in data:
+        _optional_bool(data, 'healthy', False)
+    if data.get('one_time_activation') is not None:
+        _decode_one_time_activation_fast(data['one_time_activation'])
+
+    schedule = []
+    items = data.get('schedule')
+    if items is not None:
+        if type(items) is not list:
+            raise _UnsupportedPayload()
+
+        append = schedule.append
+        for item in items:
+            if type(item) is not dict or 'time' not in item:
+                raise _UnsupportedPayload()
+
+            amount = item.get('amount', 0)
+            active = item.get('active', False)
+            if type(amount) is not int or type(active) is not bool:
+                raise _UnsupportedPayload()
+
+            append(ScheduledActivationData(time=_require_str(item['time']), amount=amount, active=active))
+
+    one_time_activations = []
+    activations = data.get('today_one_time_activations')
+    if activations is not None:
+        if type(activations) is not list:
+            raise _UnsupportedPayload()
+
+        one_time_activations = [_decode_one_time_activation_fast(activation) for activation in activations]
+
+    return CircuitData(
+        id=_optional_int(data, 'id', 0),
+        name=name,
+        active=_optional_bool(data, 'active', False),
+        one_time_activations=one_time_activations,
+        schedule=schedule,
+    )
+
+
+def _decode_auth_fast(data) -> dict:
+    if type(data) is not dict or len(data) != 2:
+        raise _UnsupportedPayload()
+
+    return {'access': _require_str(data.get('access')), 'refresh': _require_str(data.get('refresh'))}
+
+
+class PayloadDecoder:
+    """
+    Decodes payloads received from the smart garden backend and encodes the ones sent to it. Well-formed payloads are
+    handled by a hand-written fast path that creates only the resulting objects. Payloads that need type coercion or
+    are invalid are handled by marshmallow schemas, so defaults, excluded fields and validation errors are the same
+    as before. In the strict mode marshmallow is used for every payload, which is useful for debugging.
+    """
+
+    _circuit_schema = CircuitSchema()
+    _auth_schema = SmartGardenAuthSchema()
+    _auth_refresh_schema = SmartGardenAuthRefreshSchema()
+    _pump_activations_schema = PumpActivationSchema(many=True)
+
+    def __init__(self, strict: bool = False):
+        """
+        :param strict: specifies if marshmallow should be used for all payloads
+        """
+        self._strict = strict
+
+    def decode_circuit(self, data) -> CircuitData:
+        """
+        Decodes the circuit payload.
+        :param data: decoded JSON response body
+        :return: circuit data
+        :raises ValidationError: if the payload is invalid
+        """
+        if not self._strict:
+            try:
+                return _decode_circuit_fast(data)
+            except _UnsupportedPayload:
+                pass
+
+        return self._load_circuit(data)
+
+    def _load_circuit(self, data) -> CircuitData:
+        loaded_data = self._circuit_schema.load(data=data)
+
+        one_time_activations = [OneTimeActivationData(timestamp=a['timestamp'], amount=a['amount']) for a in
+                                loaded_data.get('today_one_time_activations') or []]
+
+        schedule = [ScheduledActivationData(time=p['time'], amount=p['amount'], active=p['active']) for p in
+                    loaded_data.get('schedule') or []]
+
+        return CircuitData(
+            id=loaded_data.get('id', 0),
+            name=loaded_data.get('name'),
+            active=loaded_data.get('active', False),
+            one_time_activations=one_time_activations,
+            schedule=schedule,
+        )
+
+    def decode_auth(self, data) -> SmartGardenAuthData:
+        """
+        Decodes the auth payload.
+        :param data: decoded JSON response body
+        :return: auth data
+        :raises ValidationError: if the payload is invalid
+        """
+        if not self._strict:
+            try:
+                return SmartGardenAuthData(**_decode_auth_fast(data))
+            except _UnsupportedPayload:
+                pass
+
+        return self._build(SmartGardenAuthData, self._auth_schema.load(data=data))
+
+    def decode_auth_refresh(self, data) -> SmartGardenAuthRefreshData:
+        """
+        Decodes the auth refresh payload.
+        :param data: decoded JSON response body
+        :return: auth refresh data
+        :raises ValidationError: if the payload is invalid
+        """
+        if not self._strict:
+            try:
+                return SmartGardenAuthRefreshData(**_decode_auth_fast(data))
+            except _UnsupportedPayload:
+                pass
+
+        return self._build(SmartGardenAuthRefreshData, self._auth_refresh_schema.load(data=data))
+
+    @staticmethod
+    def _build(cls, loaded_data: dict):
+        try:
+            return cls(**loaded_data)
+        except TypeError as e:
+            raise ValidationError(str(e))
+
+    def dump_pump_activations(self, activations: List[PumpActivationData]) -> List[dict]:
+        """
+        Converts pump activations sent as the execution log to primitive values.
+        :param activations: pump activations
+        :return: list of dictionaries that can be encoded as JSON or MessagePack
+        """
+        if not self._strict and all(type(a.timestamp) is str and type(a.amount) is int for a in activations):
+            return [{'timestamp': a.timestamp, 'amount': a.amount} for a in activations]
+
+        return self._pump_activations_schema.dump(activations)
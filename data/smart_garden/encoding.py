@@ -0,0 +1,113 @@
+import gzip
+import json
+from typing import Tuple
+
+from aiohttp import ClientResponse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+_MSGPACK_ERRORS = (ValueError, msgpack.UnpackException) if msgpack is not None else (ValueError,)
+
+
+def _codings(header: str) -> set:
+    return {coding.split(';')[0].strip().lower() for coding in header.split(',') if coding.strip()}
+
+
+class ContentNegotiator:
+    """
+    Negotiates encoding of payloads exchanged with the backend, JSON being the fallback in both directions.
+
+    Responses are requested as MessagePack if the optional msgpack package is installed. They are compressed by
+    the backend with gzip or deflate if it supports them, as aiohttp always sends Accept-Encoding and decompresses
+    responses itself.
+
+    Request bodies use MessagePack once the backend has responded with it, and are compressed with gzip once the
+    backend has advertised gzip in the Accept-Encoding response header (RFC 7694). Small bodies are not compressed.
+    If the backend rejects an encoded body, plain JSON is used from then on.
+    """
+
+    def __init__(self, binary: bool = True, compress: bool = True, min_compress_size: int = 512):
+        """
+        :param binary: specifies if MessagePack should be negotiated, ignored if msgpack is not installed
+        :param compress: specifies if request bodies should be compressed when the backend supports it
+        :param min_compress_size: minimum size in bytes of request bodies that are compressed
+        """
+        self._binary = binary and msgpack is not None
+        self._compress = compress
+        self._min_compress_size = min_compress_size
+
+        self._request_content_type = JSON
+        self._request_encoding = None
+
+    @property
+    def accept(self) -> str:
+        """
+        Value of the Accept header sent with requests for payloads.
+        """
+        return '{0}, {1};q=0.5'.format(MSGPACK, JSON) if self._binary else JSON
+
+    def observe(self, response: ClientResponse) -> None:
+        """
+        Updates encodings of request bodies according to a successful response of the backend.
+        :param response: response of the backend
+        """
+        if self._binary and response.content_type == MSGPACK:
+            self._request_content_type = MSGPACK
+        if self._compress and 'gzip' in _codings(response.headers.get('Accept-Encoding', '')):
+            self._request_encoding = 'gzip'
+
+    def reject(self) -> bool:
+        """
+        Falls back to plain JSON request bodies after the backend rejected an encoded one.
+        :return: true if encoded bodies were used, so the request can be sent again
+        """
+        if self._request_content_type == JSON and self._request_encoding is None:
+            return False
+
+        self._binary = False
+        self._compress = False
+        self._request_content_type = JSON
+        self._request_encoding = None
+
+        return True
+
+    def encode(self, data) -> Tuple[bytes, dict]:
+        """
+        Encodes a request body.
+        :param data: list or dict of primitive values
+        :return: encoded body and headers that have to be sent with it
+        """
+        if self._request_content_type == MSGPACK:
+            body = msgpack.packb(data, use_bin_type=True)
+        else:
+            body = json.dumps(data).encode()
+
+        headers = {'Content-Type': self._request_content_type}
+        if self._request_encoding == 'gzip' and len(body) >= self._min_compress_size:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        return body, headers
+
+    @staticmethod
+    def decode(content_type: str, body: bytes):
+        """
+        Decodes a response body according to its content type; anything but MessagePack is treated as JSON.
+        :param content_type: content type of the response
+        :param body: response body, already decompressed
+        :return: decoded payload
+        :raises ValueError: if the body cannot be decoded
+        """
+        if content_type == MSGPACK and msgpack is not None:
+            try:
+                return msgpack.unpackb(body, raw=False)
+            except _MSGPACK_ERRORS as e:
+                raise ValueError(str(e))
+
+        return json.loads(body)
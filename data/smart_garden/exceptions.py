@@ -12,13 +12,20 @@ class SmartGardenException(Exception):
         self.response = response
 
     def __str__(self) -> str:
-        return str(self.response)
+        return str(self.response or self.internal_error)
 
 
 class SmartGardenResponseError(SmartGardenException):
     pass
 
 
+class SmartGardenRejectedError(SmartGardenResponseError):
+    """
+    Raised when the backend refuses the request itself, so sending it again would fail the same way.
+    """
+    pass
+
+
 class SmartGardenUnauthorizedError(SmartGardenException):
     pass
 
@@ -33,3 +40,8 @@ class SmartGardenPayloadError(SmartGardenException):
 
 class SmartGardenInvalidUrl(SmartGardenException):
     pass
+
+
+class SmartGardenOfflineError(SmartGardenConnectionError):
+    def __str__(self) -> str:
+        return 'smart garden backend is offline'
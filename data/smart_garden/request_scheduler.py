@@ -0,0 +1,68 @@
+import time
+
+
+class RequestScheduler:
+    """
+    Keeps track of requests sent to the smart garden backend and decides when an explicit health check is needed.
+    Every successful authenticated request proves that the device is alive, so a health check is sent only when
+    nothing else reached the backend within the interval. While requests keep failing the interval grows
+    exponentially so an unreachable backend is not flooded with health checks.
+    """
+
+    """
+    Default interval between liveness signals in seconds.
+    """
+    INTERVAL = 30
+
+    """
+    Maximum interval between health checks in seconds, used while the backend is unreachable.
+    """
+    MAX_INTERVAL = 600
+
+    def __init__(self, interval: float = INTERVAL, max_interval: float = MAX_INTERVAL):
+        """
+        :param interval: interval between liveness signals while the backend is reachable
+        :param max_interval: upper limit of the interval while the backend is unreachable
+        """
+        self._interval = interval
+        self._max_interval = max_interval
+        self._last_request = None
+        self._failures = 0
+
+    @property
+    def interval(self) -> float:
+        """
+        Current health check interval that takes into account consecutive failures.
+        """
+        return min(self._interval * 2 ** min(self._failures, 16), self._max_interval)
+
+    def record_success(self) -> None:
+        """
+        Records a successful authenticated request.
+        """
+        self._last_request = time.monotonic()
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """
+        Records a failed request.
+        """
+        self._last_request = time.monotonic()
+        self._failures += 1
+
+    def time_until_health_check(self) -> float:
+        """
+        Calculates how long a health check can be postponed.
+        :return: time in seconds, 0 if the health check is due
+        """
+        if self._last_request is None:
+            return 0
+
+        return max(self._last_request + self.interval - time.monotonic(), 0)
+
+    def health_check_due(self) -> bool:
+        """
+        Checks if a health check should be sent because nothing else reached the backend within the interval.
+        :return: true if the health check should be sent
+        """
+        return self.time_until_health_check() == 0
@@ -1,18 +1,32 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
 from functools import wraps
+from typing import Optional, List, Dict, AsyncIterator
 
-from aiohttp import ClientSession, ClientResponse
+from aiohttp import ClientSession, ClientResponse, ClientTimeout, WSMsgType
 from aiohttp.client_exceptions import ClientResponseError, ClientConnectionError, ClientPayloadError, \
-    InvalidURL
+    InvalidURL, WSServerHandshakeError
+from marshmallow import ValidationError
+from yarl import URL
 
 from data.model.mapper import map_domain_to_pump_activation
-from data.model.model import CircuitData, OneTimeActivationData, ScheduledActivationData
-from data.model.schema import CircuitSchema
+from data.model.model import CircuitData
+from data.smart_garden.auth_token import TokenStore, token_expiry
+from data.smart_garden.connectivity import ConnectivityMonitor, ConnectivityState
+from data.smart_garden.decoder import PayloadDecoder
+from data.smart_garden.encoding import ContentNegotiator
 from data.smart_garden.exceptions import SmartGardenResponseError, SmartGardenConnectionError, SmartGardenPayloadError, \
-    SmartGardenInvalidUrl, SmartGardenUnauthorizedError
+    SmartGardenInvalidUrl, SmartGardenUnauthorizedError, SmartGardenException, SmartGardenOfflineError, \
+    SmartGardenRejectedError
 from data.smart_garden.model import SmartGardenAuthData, SmartGardenAuthPayload, SmartGardenAuthRefreshData, \
     SmartGardenAuthRefreshPayload
-from data.smart_garden.schema import SmartGardenAuthPayloadSchema, SmartGardenAuthSchema, \
-    SmartGardenAuthRefreshPayloadSchema, SmartGardenAuthRefreshSchema, PumpActivationSchema
+from data.smart_garden.schema import SmartGardenAuthPayloadSchema, SmartGardenAuthRefreshPayloadSchema
+from data.smart_garden.request_scheduler import RequestScheduler
+from data.smart_garden.transport import LatencyRecorder
+from data.smart_garden.transport_config import TransportConfig
 from domain.model import PumpActivation
 
 
@@ -29,6 +43,34 @@ def map_errors(f):
             raise SmartGardenPayloadError(internal_error=e)
         except InvalidURL as e:
             raise SmartGardenInvalidUrl(internal_error=e)
+        except asyncio.TimeoutError as e:
+            raise SmartGardenConnectionError(internal_error=e)
+
+    return decorated
+
+
+def break_circuit(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        connectivity = args[0].connectivity
+        if not connectivity.allow_request():
+            raise SmartGardenOfflineError()
+
+        try:
+            response = await f(*args, **kwargs)
+        except SmartGardenConnectionError:
+            connectivity.record_failure()
+            raise
+        except BaseException:
+            connectivity.cancel_request()
+            raise
+
+        if response.status >= 500:
+            connectivity.record_failure()
+        else:
+            connectivity.record_success()
+
+        return response
 
     return decorated
 
@@ -36,76 +78,228 @@ def map_errors(f):
 def authenticate(f):
     @wraps(f)
     async def decorated(*args, **kwargs):
+        client = args[0]
+        # noinspection PyProtectedMember
+        token = client._access_token
         try:
-            return await f(*args, **kwargs)
-        except SmartGardenUnauthorizedError:
-            client = args[0]
-            # noinspection PyProtectedMember
-            await client._authenticate()
+            try:
+                result = await f(*args, **kwargs)
+            except SmartGardenUnauthorizedError:
+                # noinspection PyProtectedMember
+                await client._authenticate(stale_token=token)
 
-            return await f(*args, **kwargs)
+                result = await f(*args, **kwargs)
+        except SmartGardenException:
+            client.request_scheduler.record_failure()
+            raise
+
+        client.request_scheduler.record_success()
+        return result
 
     return decorated
 
 
+@dataclass
+class _CachedCircuit:
+    circuit: CircuitData
+    fingerprint: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
 class SmartGardenBackend:
     """
     Represents Smart Garden backend that provides access to the circuit and some config and diagnostic data. It allows
     for fetching the circuit, sending short execution log and sending health checks.
+
+    Circuits are identified by their ids. If no id is given, the single circuit assigned to the account is used.
+
+    Every successful authenticated request is treated by the backend as a liveness signal, so the request scheduler
+    sends explicit health checks only when nothing else was sent recently.
+
+    All requests go through a connectivity monitor that works as a circuit breaker, so when the backend is known to
+    be offline requests fail immediately with SmartGardenOfflineError instead of waiting for a timeout.
+
+    Access tokens are refreshed in the background shortly before they expire and only one authentication request
+    is in flight at a time. If a token store is supplied, tokens are persisted so a restart doesn't require logging in.
+
+    Changes of circuits can also be received through a WebSocket push channel, see subscribe().
+
+    Circuits and execution logs are exchanged in the most compact encoding supported by the backend, see
+    ContentNegotiator.
+    """
+
     """
+    Default address of the backend.
+    """
+    BASE_URL = "https://smart-garden-1.herokuapp.com"
+
+    """
+    Specifies how many seconds before its expiry the access token is refreshed in the background.
+    """
+    TOKEN_REFRESH_MARGIN = 60
 
-    def __init__(self, email: str, password: str, client_session: ClientSession):
-        self._auth_url = "https://smart-garden-1.herokuapp.com/api/auth/token"
-        self._auth_refresh_url = "https://smart-garden-1.herokuapp.com/api/auth/token/refresh"
-        self._circuit_url = "https://smart-garden-1.herokuapp.com/api/circuits/mine"
-        self._activation_log_url = "https://smart-garden-1.herokuapp.com/api/circuits/mine/activation-log"
-        self._health_check_url = "https://smart-garden-1.herokuapp.com/api/circuits/mine/health-check"
+    """
+    Specifies how many seconds before its expiry the access token is no longer used for requests.
+    """
+    TOKEN_EXPIRY_SKEW = 5
+
+    def __init__(self, email: str, password: str, client_session: ClientSession,
+                 token_store: Optional[TokenStore] = None, request_scheduler: Optional[RequestScheduler] = None,
+                 connectivity: Optional[ConnectivityMonitor] = None, transport_config: Optional[TransportConfig] = None,
+                 latency_recorder: Optional[LatencyRecorder] = None, payload_decoder: Optional[PayloadDecoder] = None,
+                 base_url: str = BASE_URL):
+        self._auth_url = "{0}/api/auth/token".format(base_url)
+        self._auth_refresh_url = "{0}/api/auth/token/refresh".format(base_url)
+        self._circuit_url = "{0}/api/circuits/mine".format(base_url)
+        self._activation_log_url = "{0}/api/circuits/mine/activation-log".format(base_url)
+        self._health_check_url = "{0}/api/circuits/mine/health-check".format(base_url)
+        self._circuit_detail_url = base_url + "/api/circuits/{0}"
+        self._circuit_activation_log_url = base_url + "/api/circuits/{0}/activation-log"
+        self._events_url = "{0}/api/circuits/mine/events".format(base_url)
 
         self._email = email
         self._password = password
 
         self._client_session = client_session
+        self.request_scheduler = request_scheduler or RequestScheduler()
+        self.connectivity = connectivity or ConnectivityMonitor()
+        self.latency_recorder = latency_recorder or LatencyRecorder()
+        self._payload_decoder = payload_decoder or PayloadDecoder()
+
+        transport_config = transport_config or TransportConfig()
+        self._fetch_timeout = ClientTimeout(total=transport_config.fetch_timeout)
+        self._log_timeout = ClientTimeout(total=transport_config.log_timeout)
+        self._health_timeout = ClientTimeout(total=transport_config.health_timeout)
+        self._auth_timeout = ClientTimeout(total=transport_config.auth_timeout)
+        self._push_heartbeat = transport_config.push_heartbeat
+        self._negotiator = ContentNegotiator(binary=transport_config.binary_payloads,
+                                             compress=transport_config.compress_requests,
+                                             min_compress_size=transport_config.min_compress_size)
+
+        self._token_store = token_store
+        self._auth_task = None
+        self._refresh_task = None
 
         self._access_token = None
+        self._access_token_expiry = None
         self._refresh_token = None
+        self._refresh_token_expiry = None
+        self._load_tokens()
+
+        self._circuits: Dict[str, _CachedCircuit] = {}
+
+    @staticmethod
+    def _decode(decode, data):
+        try:
+            return decode(data)
+        except ValidationError as e:
+            raise SmartGardenPayloadError(internal_error=e)
+
+    async def _read_payload(self, response: ClientResponse):
+        """
+        Decodes the response body in the encoding chosen by the backend.
+        """
+        try:
+            return self._negotiator.decode(response.content_type, await response.read())
+        except ValueError as e:
+            raise SmartGardenPayloadError(internal_error=e)
+
+    @property
+    def connectivity_state(self) -> ConnectivityState:
+        return self.connectivity.state
 
     @staticmethod
     def _returned_http_200(response: ClientResponse) -> bool:
         return response.status == 200
 
+    @staticmethod
+    def _returned_http_304(response: ClientResponse) -> bool:
+        return response.status == 304
+
     @staticmethod
     def _returned_http_401(response: ClientResponse) -> bool:
         return response.status == 401
 
+    @staticmethod
+    def _expired(expiry: Optional[float], skew: float = 0) -> bool:
+        return expiry is not None and time.time() >= expiry - skew
+
     def _valid_token_present(self) -> bool:
-        return self._access_token is not None
+        return self._access_token is not None and not self._expired(self._access_token_expiry,
+                                                                     self.TOKEN_EXPIRY_SKEW)
+
+    def _set_tokens(self, access: Optional[str], refresh: Optional[str], received_at: Optional[float] = None) -> None:
+        self._access_token = access
+        self._access_token_expiry = token_expiry(access, received_at) if access else None
+        self._refresh_token = refresh
+        self._refresh_token_expiry = token_expiry(refresh, received_at) if refresh else None
+
+    def _load_tokens(self) -> None:
+        if self._token_store is None:
+            return
+
+        auth_data = self._token_store.load()
+        if auth_data is None:
+            return
+
+        self._set_tokens(auth_data.access, auth_data.refresh)
+        if self._expired(self._access_token_expiry):
+            self._access_token = None
+        if self._expired(self._refresh_token_expiry):
+            self._refresh_token = None
 
+    def _store_tokens(self) -> None:
+        if self._token_store is None:
+            return
+
+        try:
+            self._token_store.store(SmartGardenAuthData(access=self._access_token, refresh=self._refresh_token))
+        except OSError:
+            # the tokens are still kept in memory, the next start will simply log in again
+            pass
+
+    async def _send(self, method, url: str, **kwargs) -> ClientResponse:
+        """
+        Sends a request and reads the whole response body, so the connection returns to the keep-alive pool. The
+        duration of the request is recorded for the endpoint.
+        """
+        start = time.perf_counter()
+        try:
+            response = await method(url=url, **kwargs)
+            await response.read()
+
+            return response
+        finally:
+            self.latency_recorder.record(URL(url).path, time.perf_counter() - start)
+
+    @break_circuit
     @map_errors
     async def _get(self, url: str, **kwargs) -> ClientResponse:
-        return await self._client_session.get(url=url, **kwargs)
+        return await self._send(self._client_session.get, url=url, **kwargs)
 
+    @break_circuit
     @map_errors
     async def _patch(self, url: str, data: str, **kwargs) -> ClientResponse:
-        return await self._client_session.patch(url=url, data=data, **kwargs)
+        return await self._send(self._client_session.patch, url=url, data=data, **kwargs)
 
+    @break_circuit
     @map_errors
     async def _post(self, url: str, data: str, **kwargs) -> ClientResponse:
-        return await self._client_session.post(url=url, data=data, **kwargs)
+        return await self._send(self._client_session.post, url=url, data=data, **kwargs)
 
     async def _get_auth_data(self) -> SmartGardenAuthData:
         payload = SmartGardenAuthPayload(email=self._email, password=self._password)
         json = SmartGardenAuthPayloadSchema().dumps(payload)
-        raw_response = await self._post(self._auth_url, data=json, headers={'Content-Type': 'application/json'})
+        raw_response = await self._post(self._auth_url, data=json, headers={'Content-Type': 'application/json'},
+                                        timeout=self._auth_timeout)
 
         if not self._returned_http_200(response=raw_response):
             raise SmartGardenResponseError(response=raw_response)
 
-        schema = SmartGardenAuthSchema()
-        json = await raw_response.json()
-        response = SmartGardenAuthData(**schema.load(data=json))
+        response = self._decode(self._payload_decoder.decode_auth, await raw_response.json())
 
-        self._access_token = response.access
-        self._refresh_token = response.refresh
+        self._set_tokens(response.access, response.refresh, received_at=time.time())
 
         return response
 
@@ -113,37 +307,125 @@ class SmartGardenBackend:
         payload = SmartGardenAuthRefreshPayload(refresh=refresh_token)
         json = SmartGardenAuthRefreshPayloadSchema().dumps(payload)
 
-        raw_response = await self._post(self._auth_refresh_url, data=json, headers={'Content-Type': 'application/json'})
+        raw_response = await self._post(self._auth_refresh_url, data=json, headers={'Content-Type': 'application/json'},
+                                        timeout=self._auth_timeout)
         if not self._returned_http_200(response=raw_response):
             raise SmartGardenResponseError(response=raw_response)
 
-        schema = SmartGardenAuthRefreshSchema()
-        json = await raw_response.json()
-        response = SmartGardenAuthRefreshData(**schema.load(data=json))
+        response = self._decode(self._payload_decoder.decode_auth_refresh, await raw_response.json())
 
-        self._access_token = response.access
-        self._refresh_token = response.refresh
+        self._set_tokens(response.access, response.refresh, received_at=time.time())
 
         return response
 
-    async def _authenticate(self) -> None:
-        if self._refresh_token is not None:
-            await self._refresh_auth_data(refresh_token=self._refresh_token)
+    async def _obtain_tokens(self) -> None:
+        """
+        Refreshes the access token or logs in if there is no usable refresh token or the backend rejects it.
+        """
+        if self._refresh_token is not None and not self._expired(self._refresh_token_expiry):
+            try:
+                await self._refresh_auth_data(refresh_token=self._refresh_token)
+            except SmartGardenResponseError:
+                self._refresh_token = None
+                await self._get_auth_data()
         else:
             await self._get_auth_data()
 
-    @authenticate
-    async def fetch_circuit(self) -> CircuitData:
+        self._store_tokens()
+        self._schedule_refresh()
+
+    async def _authenticate(self, stale_token: Optional[str] = None) -> None:
+        """
+        Obtains a new access token. Concurrent callers share a single in-flight request.
+        :param stale_token: token rejected by the backend; nothing is done if it has already been replaced
+        """
+        if stale_token is not None and stale_token != self._access_token:
+            return
+
+        if self._auth_task is None or self._auth_task.done():
+            self._auth_task = asyncio.ensure_future(self._obtain_tokens())
+
+        await asyncio.shield(self._auth_task)
+
+    async def _ensure_token(self) -> None:
         """
-        Fetches the node data and returns its domain model.
+        Makes sure that a valid access token is present before a request is sent.
         """
-        if not self._access_token:
+        if not self._valid_token_present():
             await self._authenticate()
+        elif self._refresh_task is None:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        """
+        Schedules a background refresh of the access token shortly before it expires.
+        """
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+        if self._access_token_expiry is None:
+            return
+
+        remaining = self._access_token_expiry - time.time()
+        delay = max(remaining - self.TOKEN_REFRESH_MARGIN, remaining / 2, 0)
+        self._refresh_task = asyncio.ensure_future(self._refresh_in_background(delay))
+
+    async def _refresh_in_background(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+        try:
+            await self._authenticate()
+        except SmartGardenException:
+            # the token will be obtained on demand by the next request
+            pass
+
+    @staticmethod
+    def _circuit_validators(cached: Optional[_CachedCircuit]) -> dict:
+        """
+        Builds conditional request headers for the circuit endpoint using the validators of the cached circuit.
+        :param cached: previously fetched circuit
+        :return: headers that should be added to the request
+        """
+        headers = {}
+        if cached is None:
+            return headers
+
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+        return headers
+
+    def _circuit_endpoint(self, circuit_id: Optional[int]) -> str:
+        return self._circuit_url if circuit_id is None else self._circuit_detail_url.format(circuit_id)
+
+    def _activation_log_endpoint(self, circuit_id: Optional[int]) -> str:
+        return self._activation_log_url if circuit_id is None else self._circuit_activation_log_url.format(circuit_id)
+
+    @authenticate
+    async def fetch_circuit(self, circuit_id: Optional[int] = None) -> CircuitData:
+        """
+        Fetches the node data and returns its domain model. Requests are conditional: if the backend reports that
+        the circuit was not modified, or the body is identical to the previously fetched one, the cached instance is
+        returned without parsing it again. Callers can compare the returned object by identity to detect this case.
+        :param circuit_id: id of the circuit, the circuit assigned to the account is fetched if it's not specified
+        """
+        await self._ensure_token()
+
+        url = self._circuit_endpoint(circuit_id)
+        cached = self._circuits.get(url)
 
         headers = {
-            'Authorization': f"Bearer {self._access_token}"
+            'Authorization': f"Bearer {self._access_token}",
+            'Accept': self._negotiator.accept,
+            **self._circuit_validators(cached)
         }
-        raw_response = await self._get(url=self._circuit_url, headers=headers)
+        raw_response = await self._get(url=url, headers=headers, timeout=self._fetch_timeout)
+
+        if self._returned_http_304(response=raw_response) and cached is not None:
+            return cached.circuit
 
         if not self._returned_http_200(response=raw_response):
             if self._returned_http_401(response=raw_response):
@@ -151,54 +433,60 @@ class SmartGardenBackend:
             else:
                 raise SmartGardenResponseError(response=raw_response)
 
-        schema = CircuitSchema()
-        json = await raw_response.json()
-        loaded_data = schema.load(data=json)
-
-        one_time_activation = loaded_data.get('today_one_time_activations', None)
-        if one_time_activation and len(one_time_activation) > 0:
-            activation_data = one_time_activation[0]
-            one_time_activation = OneTimeActivationData(
-                timestamp=activation_data['timestamp'],
-                amount=activation_data['amount']
-            )
-
-        schedule = []
-        if 'schedule' in loaded_data:
-            schedule = [ScheduledActivationData(time=p['time'], amount=p['amount'], active=p['active']) for p in
-                        loaded_data['schedule']]
-
-        return CircuitData(
-            id=loaded_data.get('id', 0),
-            name=loaded_data.get('name'),
-            active=loaded_data.get('active', False),
-            one_time_activation=one_time_activation,
-            schedule=schedule,
-        )
+        self._negotiator.observe(raw_response)
+
+        fingerprint = hashlib.sha1(await raw_response.read()).hexdigest()
+        if cached is None or fingerprint != cached.fingerprint:
+            circuit = self._decode(self._payload_decoder.decode_circuit, await self._read_payload(raw_response))
+        else:
+            circuit = cached.circuit
+
+        self._circuits[url] = _CachedCircuit(circuit=circuit, fingerprint=fingerprint,
+                                             etag=raw_response.headers.get('ETag'),
+                                             last_modified=raw_response.headers.get('Last-Modified'))
+
+        return circuit
 
     @authenticate
-    async def send_execution_log(self, activation: PumpActivation) -> bool:
+    async def send_execution_logs(self, activations: List[PumpActivation], circuit_id: Optional[int] = None) -> bool:
         """
-        Updates data about last pump activation. This may be helpful for checking if the pump was actually activated
-        when it should be according to the schedule.
-        :param activation: activation details with timestamp and water amount
+        Uploads a batch of execution logs in a single request. The activation log endpoint is expected to accept a
+        list of activations as well as a single one, see send_execution_log() for backends that accept only single
+        ones. If the backend rejects the negotiated encoding, the batch is sent again as plain JSON.
+        :param activations: activation details with timestamps and water amounts
+        :param circuit_id: id of the circuit, the circuit assigned to the account is used if it's not specified
         """
-        if not self._access_token:
-            await self._authenticate()
+        execution_logs = [map_domain_to_pump_activation(activation) for activation in activations]
+        return await self._post_execution_log(self._payload_decoder.dump_pump_activations(execution_logs), circuit_id)
 
+    @authenticate
+    async def send_execution_log(self, activation: PumpActivation, circuit_id: Optional[int] = None) -> bool:
+        """
+        Uploads a single execution log as an object, the format the activation log endpoint has always accepted.
+        :param activation: activation details with timestamp and water amount
+        :param circuit_id: id of the circuit, the circuit assigned to the account is used if it's not specified
+        """
         execution_log = map_domain_to_pump_activation(activation)
-        schema = PumpActivationSchema()
-        data = schema.dumps(execution_log)
+        return await self._post_execution_log(self._payload_decoder.dump_pump_activations([execution_log])[0],
+                                              circuit_id)
 
-        headers = {
-            'Authorization': f"Bearer {self._access_token}",
-            'Content-Type': 'application/json'
-        }
-        raw_response = await self._post(url=self._activation_log_url, data=data, headers=headers)
+    async def _post_execution_log(self, payload, circuit_id: Optional[int]) -> bool:
+        await self._ensure_token()
+
+        while True:
+            data, headers = self._negotiator.encode(payload)
+            headers['Authorization'] = f"Bearer {self._access_token}"
+
+            raw_response = await self._post(url=self._activation_log_endpoint(circuit_id), data=data, headers=headers,
+                                            timeout=self._log_timeout)
+            if raw_response.status != 415 or not self._negotiator.reject():
+                break
 
         if not self._returned_http_200(response=raw_response):
             if self._returned_http_401(response=raw_response):
                 raise SmartGardenUnauthorizedError(response=raw_response)
+            elif 400 <= raw_response.status < 500 and raw_response.status not in (408, 429):
+                raise SmartGardenRejectedError(response=raw_response)
             else:
                 raise SmartGardenResponseError(response=raw_response)
 
@@ -209,14 +497,14 @@ class SmartGardenBackend:
         """
         Sends current timestamp so the user can check if his device is alive.
         """
-        if not self._access_token:
-            await self._authenticate()
+        await self._ensure_token()
 
         headers = {
             'Authorization': f"Bearer {self._access_token}"
         }
 
-        raw_response = await self._patch(url=self._health_check_url, data={}, headers=headers)
+        raw_response = await self._patch(url=self._health_check_url, data={}, headers=headers,
+                                         timeout=self._health_timeout)
 
         if not self._returned_http_200(response=raw_response):
             if self._returned_http_401(response=raw_response):
@@ -225,3 +513,77 @@ class SmartGardenBackend:
                 raise SmartGardenResponseError(response=raw_response)
 
         return True
+
+    async def _open_channel(self):
+        """
+        Opens the push channel. The handshake goes through the connectivity monitor like any other request.
+        :return: WebSocket response
+        """
+        await self._ensure_token()
+        if not self.connectivity.allow_request():
+            raise SmartGardenOfflineError()
+
+        token = self._access_token
+        headers = {
+            'Authorization': f"Bearer {token}"
+        }
+        try:
+            channel = await self._client_session.ws_connect(self._events_url, headers=headers,
+                                                            heartbeat=self._push_heartbeat)
+        except WSServerHandshakeError as e:
+            if e.status >= 500:
+                self.connectivity.record_failure()
+            else:
+                self.connectivity.record_success()
+
+            if e.status == 401:
+                await self._authenticate(stale_token=token)
+                raise SmartGardenUnauthorizedError(internal_error=e)
+            raise SmartGardenResponseError(internal_error=e)
+        except (ClientConnectionError, asyncio.TimeoutError) as e:
+            self.connectivity.record_failure()
+            raise SmartGardenConnectionError(internal_error=e)
+        except InvalidURL as e:
+            self.connectivity.cancel_request()
+            raise SmartGardenInvalidUrl(internal_error=e)
+        except BaseException:
+            self.connectivity.cancel_request()
+            raise
+
+        self.connectivity.record_success()
+        return channel
+
+    async def subscribe(self) -> AsyncIterator[CircuitData]:
+        """
+        Opens the push channel and yields circuits of the account every time they are changed on the backend, which
+        includes new one-time activations. All the circuits are pushed right after the channel is opened, so nothing
+        that happened while the channel was closed is missed. Dead connections are detected with heartbeats. The
+        iteration ends when the channel is closed.
+        :raises SmartGardenException: if the channel cannot be opened or an invalid event is received
+        """
+        channel = await self._open_channel()
+
+        async with channel:
+            async for message in channel:
+                if message.type == WSMsgType.ERROR:
+                    break
+                if message.type != WSMsgType.TEXT:
+                    continue
+
+                try:
+                    event = json.loads(message.data)
+                except ValueError as e:
+                    raise SmartGardenPayloadError(internal_error=e)
+
+                if isinstance(event, dict) and event.get('type') == 'circuit':
+                    yield self._decode(self._payload_decoder.decode_circuit, event.get('circuit'))
+
+    async def send_health_check_if_due(self) -> bool:
+        """
+        Sends a health check only if no other request reached the backend within the health check interval.
+        :return: true if the health check was sent
+        """
+        if not self.request_scheduler.health_check_due():
+            return False
+
+        return await self.send_health_check()
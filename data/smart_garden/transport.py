@@ -0,0 +1,95 @@
+import ssl
+from dataclasses import dataclass, field
+from typing import Dict
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+from data.smart_garden.transport_config import TransportConfig
+
+
+@dataclass
+class LatencyStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class LatencyRecorder:
+    """
+    Collects latency of requests sent to the backend grouped by endpoint together with the number of connections that
+    had to be created, so it's possible to check if connections are reused.
+    """
+    endpoints: Dict[str, LatencyStats] = field(default_factory=dict)
+    connections_created: int = 0
+    connections_reused: int = 0
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        """
+        Records the latency of a single request.
+        :param endpoint: endpoint path
+        :param seconds: request duration
+        """
+        stats = self.endpoints.setdefault(endpoint, LatencyStats())
+        stats.count += 1
+        stats.total += seconds
+        stats.max = max(stats.max, seconds)
+
+    def trace_config(self) -> TraceConfig:
+        """
+        Creates a trace config that counts new and reused connections.
+        :return: trace config that should be passed to the client session
+        """
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        return trace_config
+
+    def summary(self) -> str:
+        """
+        Formats collected statistics.
+        :return: human readable summary
+        """
+        endpoints = ', '.join('{0}: n={1} avg={2:.0f}ms max={3:.0f}ms'.format(
+            endpoint, stats.count, stats.average * 1000, stats.max * 1000)
+            for endpoint, stats in self.endpoints.items())
+
+        return 'connections created: {0}, reused: {1}; {2}'.format(self.connections_created, self.connections_reused,
+                                                                  endpoints)
+
+
+def create_client_session(config: TransportConfig, latency_recorder: LatencyRecorder) -> ClientSession:
+    """
+    Creates a client session with a keep-alive connection pool, DNS caching and a single TLS context shared by all
+    connections. Requests are infrequent but regular, so keeping a small number of connections alive avoids a TLS
+    handshake for almost every request. One more connection is allowed for the long-lived push channel, so it doesn't
+    take a slot of the pool.
+    :param config: transport configuration
+    :param latency_recorder: recorder of connection statistics
+    :return: configured client session
+    """
+    connector = TCPConnector(
+        limit=config.pool_size + 1,
+        limit_per_host=config.pool_size + 1,
+        keepalive_timeout=config.keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=config.dns_cache_ttl,
+        ssl=ssl.create_default_context()
+    )
+
+    return ClientSession(
+        connector=connector,
+        timeout=ClientTimeout(total=config.fetch_timeout),
+        trace_configs=[latency_recorder.trace_config()]
+    )
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TransportConfig:
+    """
+    Configuration of the HTTP transport used for communicating with the smart garden backend. Timeouts are specified
+    in seconds for each kind of request, the push heartbeat is the interval of pings sent over the push channel.
+    Binary payloads and compression of request bodies are used only if the backend supports them.
+    """
+    fetch_timeout: float = 10
+    log_timeout: float = 10
+    health_timeout: float = 5
+    auth_timeout: float = 15
+    pool_size: int = 2
+    keepalive_timeout: float = 60
+    dns_cache_ttl: int = 3600
+    push_heartbeat: float = 30
+    binary_payloads: bool = True
+    compress_requests: bool = True
+    min_compress_size: int = 512
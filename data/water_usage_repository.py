@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from datetime import timedelta
+from typing import List, Optional, Dict, Tuple
+
+from data.db.mapper import map_timestamp_to_epoch, map_epoch_to_timestamp, map_epoch_to_date, DATE_TIME_FORMAT
+from data.db.pump_activation_rollup_dao import SECONDS_PER_DAY
+from data.db.water_usage_dao import WaterUsageDao
+from device.clock import Clock
+from domain.model import WaterUsage, MissedActivation
+from domain.schedule import EXECUTION_MARGIN
+
+
+class WaterUsageRepository:
+    """
+    Repository of water usage analytics computed by the local database from pump activations and their daily rollups.
+    Reports take a range of days. Results for periods that are closed, i.e. no activation can be stored for them
+    anymore, are cached, so only the open periods at the end of a range are aggregated again.
+    """
+
+    """
+    Periods of water usage reports.
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    CIRCUIT = 'circuit'
+
+    """
+    Maximum number of cached reports.
+    """
+    CACHE_SIZE = 128
+
+    def __init__(self, water_usage_dao: WaterUsageDao, clock: Optional[Clock] = None):
+        """
+        :param water_usage_dao: water usage dao
+        :param clock: clock determining which periods are closed, the system clock if it's not specified
+        """
+        self._water_usage_dao = water_usage_dao
+        self._clock = clock or Clock()
+        self._cache: Dict[Tuple, List[WaterUsage]] = OrderedDict()
+
+    @staticmethod
+    def _epoch(day: str) -> int:
+        return map_timestamp_to_epoch(day + 'T00:00:00')
+
+    def _closed_until(self, period: str) -> int:
+        """
+        Returns the start of the oldest period that may still change. Activations are stored up to the execution
+        margin after their slot, so the previous day is closed only after the margin passes.
+        """
+        now = map_timestamp_to_epoch(self._clock.now().strftime(DATE_TIME_FORMAT))
+        closed = (now - EXECUTION_MARGIN * 60) // SECONDS_PER_DAY * SECONDS_PER_DAY
+        if period == WaterUsageRepository.WEEK:
+            closed -= (closed // SECONDS_PER_DAY + 3) % 7 * SECONDS_PER_DAY
+
+        return closed
+
+    async def _fetch(self, period: str, since: int, until: int, circuit_id: Optional[int]) -> List[WaterUsage]:
+        if since >= until:
+            return []
+
+        return [WaterUsage(period=map_epoch_to_date(start), count=count, amount=amount,
+                           circuit_id=row_circuit_id)
+                for row_circuit_id, start, count, amount in
+                await self._water_usage_dao.fetch_usage(period, since, until, circuit_id)]
+
+    async def _fetch_closed(self, period: str, since: int, until: int,
+                            circuit_id: Optional[int]) -> List[WaterUsage]:
+        key = (period, since, until, circuit_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        usage = await self._fetch(period, since, until, circuit_id)
+        self._cache[key] = usage
+        if len(self._cache) > WaterUsageRepository.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+        return usage
+
+    async def usage(self, period: str, since: str, until: str, circuit_id: Optional[int] = None) -> List[WaterUsage]:
+        """
+        Returns the number of activations and the total amount of water per period and circuit.
+        :param period: DAY, WEEK starting on Monday, or CIRCUIT for totals of the whole range
+        :param since: the first day of the range in DATE_FORMAT, inclusive
+        :param until: the day after the range in DATE_FORMAT, exclusive
+        :param circuit_id: id of the circuit, all circuits are reported if it's not specified
+        :return: list of water usage ordered by period and circuit, the period is represented by its first day
+        """
+        since, until = self._epoch(since), self._epoch(until)
+        closed_until = max(since, min(until, self._closed_until(period)))
+
+        closed = await self._fetch_closed(period, since, closed_until, circuit_id)
+        recent = await self._fetch(period, closed_until, until, circuit_id)
+        if period != WaterUsageRepository.CIRCUIT:
+            return closed + recent
+
+        totals = OrderedDict()
+        for usage in closed + recent:
+            total = totals.setdefault(usage.circuit_id, WaterUsage(period=map_epoch_to_date(since), count=0, amount=0,
+                                                                   circuit_id=usage.circuit_id))
+            total.count += usage.count
+            total.amount += usage.amount
+
+        return list(totals.values())
+
+    async def missed_activations(self, since: str, until: str,
+                                 circuit_id: Optional[int] = None) -> List[MissedActivation]:
+        """
+        Returns slots of the current schedule of the circuit for which the pump was not activated. Slots that can
+        still be executed are not reported. The result depends on the schedule, so it's not cached.
+        :param since: the first day of the range in DATE_FORMAT, inclusive
+        :param until: the day after the range in DATE_FORMAT, exclusive
+        :param circuit_id: id of the circuit, None stands for the single circuit assigned to the account
+        :return: list of missed activations ordered by timestamp
+        """
+        now = self._clock.now() - timedelta(minutes=EXECUTION_MARGIN)
+        until = min(self._epoch(until), map_timestamp_to_epoch(now.strftime(DATE_TIME_FORMAT)))
+
+        return [MissedActivation(timestamp=map_epoch_to_timestamp(timestamp), amount=amount, circuit_id=circuit_id)
+                for timestamp, amount in
+                await self._water_usage_dao.fetch_missed_activations(self._epoch(since), until, circuit_id)]
@@ -0,0 +1,101 @@
+import asyncio
+import selectors
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class Clock:
+    """
+    Source of the current time. Components that schedule work take the clock as a dependency, so they can be run
+    in simulated time, see SimulatedClock.
+    """
+
+    def now(self) -> datetime:
+        """
+        Returns the current local time.
+        """
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        """
+        Returns the value of a monotonic clock in seconds.
+        """
+        return time.monotonic()
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose time doesn't pass on its own. Whenever there is nothing ready to run, the loop jumps straight to
+    the next timer, so asyncio.sleep(), wait_for() and other timeouts take no real time. Work done in executors, like
+    database calls, is waited for in real time and the virtual time stands still meanwhile. Sockets are not supported,
+    the loop would jump over the time they take.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(selector=_VirtualTimeSelector(self))
+        self._virtual_time = 0.0
+        self._executor_jobs = 0
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float) -> None:
+        self._virtual_time += seconds
+
+    @property
+    def busy(self) -> bool:
+        """
+        True if work submitted to executors has not finished yet.
+        """
+        return self._executor_jobs > 0
+
+    def run_in_executor(self, executor, func, *args) -> asyncio.Future:
+        future = super().run_in_executor(executor, func, *args)
+        self._executor_jobs += 1
+        future.add_done_callback(self._executor_job_done)
+
+        return future
+
+    def _executor_job_done(self, _: asyncio.Future) -> None:
+        self._executor_jobs -= 1
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    """
+    Selector that advances the time of the loop instead of waiting for the next timer.
+    """
+
+    def __init__(self, loop: VirtualTimeEventLoop) -> None:
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout: Optional[float] = None):
+        if self._loop.busy:
+            # executors wake up the loop through its self-pipe once the work is done
+            return super().select(timeout if timeout is None else max(timeout, 0.001))
+
+        events = super().select(0)
+        if not events and timeout:
+            self._loop.advance(timeout)
+
+        return events
+
+
+class SimulatedClock(Clock):
+    """
+    Clock that follows the time of the event loop it's used in, so it runs in virtual time when the loop is
+    VirtualTimeEventLoop.
+    """
+
+    def __init__(self, start: datetime) -> None:
+        """
+        :param start: local time when the time of the event loop was 0
+        """
+        self._start = start
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=asyncio.get_event_loop().time())
+
+    def monotonic(self) -> float:
+        return asyncio.get_event_loop().time()
@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    from gpiozero import InputDevice
+except ImportError:
+    # the flow sensor is optional, pumps without it run for the time calculated from their flow
+    InputDevice = None
+
+
+class Dose:
+    """
+    Amount of water measured by the flow sensor from the given pulse count.
+    """
+
+    def __init__(self, start_pulses: int, target_pulses: int, on_target: Callable[[], None]) -> None:
+        self.start_pulses = start_pulses
+        self.target_pulses = target_pulses
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+        self._on_target = on_target
+
+    def complete(self) -> None:
+        self.finished = time.monotonic()
+        self._on_target()
+        self.done.set()
+
+
+class FlowSensor:
+    """
+    Represents a Hall effect flow sensor that sends a pulse whenever a fixed amount of water flows through it. Pulses
+    are counted by the edge callback of the GPIO pin itself instead of events of a gpiozero input device, which keep
+    the state and time of every change. The callback only increments an integer and compares it with the target of
+    the current dose. It's called from the single callback thread of the pin factory, which is the only writer of the
+    counter, so no lock is needed.
+    """
+
+    """
+    Target of the counter while no dose is measured, it's never reached.
+    """
+    NO_TARGET = sys.maxsize
+
+    def __init__(self, gpio_pin: int, pulses_per_litre: float, pull_up: bool = True, pin_factory=None):
+        """
+        :param gpio_pin: gpio pin the pulse output of the sensor is connected to
+        :param pulses_per_litre: number of pulses the sensor sends per litre, stated by the manufacturer
+        :param pull_up: true if the pin has to be pulled up, as the output of most sensors is an open collector
+        :param pin_factory: gpiozero pin factory, the default one if it's not specified
+        """
+        self._input_device = InputDevice(gpio_pin, pull_up=pull_up, pin_factory=pin_factory)
+        self._ml_per_pulse = 1000.0 / pulses_per_litre
+        self._pulses = 0
+        self._target = FlowSensor.NO_TARGET
+        self._dose: Optional[Dose] = None
+
+        self._input_device.pin.edges = 'rising'
+        self._input_device.pin.when_changed = self._count
+
+    def _count(self, ticks, state) -> None:
+        self._pulses += 1
+        if self._pulses >= self._target:
+            self._target = FlowSensor.NO_TARGET
+            self._dose.complete()
+
+    @property
+    def pulses(self) -> int:
+        """
+        Number of pulses counted since the sensor was created.
+        """
+        return self._pulses
+
+    def measured(self, dose: Dose) -> float:
+        """
+        Returns the amount of water in ml that has flown through the sensor since the start of the dose.
+        """
+        return (self._pulses - dose.start_pulses) * self._ml_per_pulse
+
+    def start_dose(self, water_in_ml: float, on_target: Callable[[], None]) -> Dose:
+        """
+        Starts measuring a dose of water, the previous dose is stopped.
+        :param water_in_ml: amount of water in ml
+        :param on_target: function called from the callback thread once the amount has flown through the sensor
+        :return: started dose
+        """
+        start = self._pulses
+        dose = Dose(start_pulses=start, target_pulses=start + max(1, round(water_in_ml / self._ml_per_pulse)),
+                    on_target=on_target)
+
+        self._target = FlowSensor.NO_TARGET
+        self._dose = dose
+        self._target = dose.target_pulses
+
+        return dose
+
+    def stop_dose(self) -> None:
+        """
+        Stops measuring the current dose, its callback is not called anymore.
+        """
+        self._target = FlowSensor.NO_TARGET
+
+    def close(self) -> None:
+        self._input_device.close()
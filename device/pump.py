@@ -1,6 +1,13 @@
-from time import sleep
+import time
+from typing import Optional
 
-from gpiozero import DigitalOutputDevice
+from device.flow_sensor import FlowSensor, Dose
+
+try:
+    from gpiozero import DigitalOutputDevice
+except ImportError:
+    # only the pump driven through GPIO needs gpiozero, the mock and simulated pumps provide their own output devices
+    DigitalOutputDevice = None
 
 
 class Pump:
@@ -8,17 +15,42 @@ class Pump:
     Represents a DC water pump that can be controlled by simple turning it on for some time and turning it off.
     The amount of water that flows through the pump has to be measured for each device and supplied when constructing
     an instance of this class.
+
+    If the pump has a flow sensor, it's turned off once the sensor measures the requested amount of water, so the
+    amount doesn't drift as the flow changes, and the flow is calibrated from the measured one after every run. The
+    calculated watering time is then used only as a safety limit.
     """
 
     ML_PER_SECOND = 18.0
 
-    def __init__(self, gpio_pin: int, ml_per_second=ML_PER_SECOND):
+    """
+    Multiple of the calculated watering time after which the pump is turned off even if the flow sensor didn't measure
+    the requested amount of water.
+    """
+    MAX_TIME_FACTOR = 2.0
+
+    """
+    Weight of the flow measured in the last run when the flow of the pump is calibrated.
+    """
+    CALIBRATION_WEIGHT = 0.3
+
+    def __init__(self, gpio_pin: int, ml_per_second=ML_PER_SECOND, flow_sensor: Optional[FlowSensor] = None):
         """
         :param gpio_pin: gpio pin that is used to control the pump
         :param ml_per_second:   specifies how much water flows through the pump in a second
+        :param flow_sensor: flow sensor measuring the water that flows through the pump, if there is one
         """
-        self._output_device = DigitalOutputDevice(gpio_pin)
+        self._output_device = self._create_output_device(gpio_pin)
         self._ml_per_second = ml_per_second
+        self._flow_sensor = flow_sensor
+        self._dose: Optional[Dose] = None
+        self._max_time = 0.0
+
+    def _create_output_device(self, gpio_pin: int):
+        """
+        Creates the device that switches the pump, it has to provide on(), off() and blink() of DigitalOutputDevice.
+        """
+        return DigitalOutputDevice(gpio_pin)
 
     def _calculate_watering_time(self, ml: float) -> float:
         """
@@ -28,24 +60,76 @@ class Pump:
         """
         return ml / self._ml_per_second
 
+    @property
+    def ml_per_second(self) -> float:
+        """
+        Flow of the pump, it's calibrated after every run if the pump has a flow sensor.
+        """
+        return self._ml_per_second
+
+    def _calibrate(self, water_in_ml: float, seconds: float) -> None:
+        if water_in_ml > 0 and seconds > 0:
+            self._ml_per_second += Pump.CALIBRATION_WEIGHT * (water_in_ml / seconds - self._ml_per_second)
+
+    def _start_dose(self, water_in_ml: int) -> None:
+        """
+        Calibrates the flow from the previous dose and starts measuring a new one, the pump is turned off from the
+        callback thread of the flow sensor once it's complete.
+        """
+        self._finish_dose()
+        self._max_time = self._calculate_watering_time(float(water_in_ml)) * Pump.MAX_TIME_FACTOR
+        self._dose = self._flow_sensor.start_dose(water_in_ml, self._output_device.off)
+
+    def _finish_dose(self) -> None:
+        """
+        Stops measuring the dose and calibrates the flow from it. If the dose was not completed, because the safety
+        limit was hit or the pump was turned off, the flow is calibrated from the water measured until then.
+        """
+        dose = self._dose
+        if dose is None:
+            return
+
+        self._flow_sensor.stop_dose()
+        self._dose = None
+        finished = dose.finished if dose.finished is not None else min(time.monotonic(),
+                                                                         dose.started + self._max_time)
+        self._calibrate(self._flow_sensor.measured(dose), finished - dose.started)
+
     def on(self, water_in_ml: int) -> None:
         """
         Turns on the pump.
         :param water_in_ml: specifies how much water should flow through the pump
         """
+        if self._flow_sensor is None:
+            self._output_device.on()
+            time.sleep(self._calculate_watering_time(float(water_in_ml)))
+            self._output_device.off()
+            return
+
+        self._start_dose(water_in_ml)
         self._output_device.on()
-        sleep(self._calculate_watering_time(float(water_in_ml)))
+        self._dose.done.wait(self._max_time)
         self._output_device.off()
+        self._finish_dose()
 
     def on_async(self, water_in_ml: int) -> None:
         """
         Turns on the pump on a dedicated GPIO thread.
         :param water_in_ml: specifies how much water should flow through the pump
         """
-        self._output_device.blink(on_time=self._calculate_watering_time(water_in_ml), n=1, background=True)
+        if self._flow_sensor is None:
+            self._output_device.blink(on_time=self._calculate_watering_time(water_in_ml), n=1, background=True)
+            return
+
+        # the dose is started first, so the target can't be missed if the pump is turned off by the sensor while it's
+        # being turned on
+        self._start_dose(water_in_ml)
+        self._output_device.blink(on_time=self._max_time, n=1, background=True)
 
     def off(self) -> None:
         """
         Turns off the pump.
         """
         self._output_device.off()
+        if self._flow_sensor is not None:
+            self._finish_dose()
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from device.clock import Clock
+from device.pump import Pump
+
+
+@dataclass
+class PumpRun:
+    started: datetime
+    water: int
+    duration: float
+
+
+class SimulatedPump(Pump):
+    """
+    Pump that is not connected to GPIO and records every run with the time of the given clock instead.
+    """
+
+    def __init__(self, clock: Clock, ml_per_second=Pump.ML_PER_SECOND):
+        """
+        :param clock: clock used for recording the start of runs
+        :param ml_per_second:   specifies how much water flows through the pump in a second
+        """
+        super().__init__(gpio_pin=None, ml_per_second=ml_per_second)
+        self._clock = clock
+        self.runs: List[PumpRun] = []
+
+    def _create_output_device(self, gpio_pin: int):
+        return None
+
+    def _record(self, water_in_ml: int) -> None:
+        self.runs.append(PumpRun(started=self._clock.now(), water=water_in_ml,
+                                 duration=self._calculate_watering_time(float(water_in_ml))))
+
+    def on(self, water_in_ml: int) -> None:
+        self._record(water_in_ml)
+
+    def on_async(self, water_in_ml: int) -> None:
+        self._record(water_in_ml)
+
+    def off(self) -> None:
+        pass
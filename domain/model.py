@@ -20,7 +20,7 @@ class Circuit:
     id: int
     name: str
     active: bool
-    one_time_activation: Optional[OneTimeActivation]
+    one_time_activations: List[OneTimeActivation]
     schedule: List[ScheduledActivation]
 
 
@@ -28,3 +28,29 @@ class Circuit:
 class PumpActivation:
     timestamp: str
     amount: int
+    circuit_id: Optional[int] = None
+
+
+@dataclass
+class PumpActivationRollup:
+    day: str
+    count: int
+    amount: int
+    first_timestamp: str
+    last_timestamp: str
+    circuit_id: Optional[int] = None
+
+
+@dataclass
+class WaterUsage:
+    period: str
+    count: int
+    amount: int
+    circuit_id: Optional[int] = None
+
+
+@dataclass
+class MissedActivation:
+    timestamp: str
+    amount: int
+    circuit_id: Optional[int] = None
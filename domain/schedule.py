@@ -0,0 +1,182 @@
+import logging
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from logging import Logger
+from typing import List, Optional
+
+from domain.model import Circuit, ScheduledActivation
+
+"""
+Date and time format of timestamps of activations.
+"""
+DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+"""
+Time format of slots in the schedule.
+"""
+TIME_FORMAT = '%H:%M:%S'
+
+"""
+Execution margin specified in minutes, time after a slot within which its activation is still executed.
+"""
+EXECUTION_MARGIN = 60
+
+SECONDS_PER_DAY = 86400
+
+"""
+Logger of skipped slots and activations used when no logger is given.
+"""
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DueActivation:
+    """
+    Activation of the pump due at the given instant, the timestamp is the instant in DATE_TIME_FORMAT.
+    """
+    instant: datetime
+    timestamp: str
+    amount: int
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+class CompiledSchedule:
+    """
+    Schedule of a circuit compiled for lookups by time. Active slots are kept as a sorted array of seconds since
+    midnight with their amounts and formatted times, so finding the slots due within a window is a binary search and
+    timestamps of activations are built without parsing or formatting dates. It's compiled once per version of the
+    circuit.
+    """
+
+    def __init__(self, schedule: List[ScheduledActivation], logger: Optional[Logger] = None) -> None:
+        """
+        :param schedule: slots of the schedule, slots whose time is not in TIME_FORMAT are skipped
+        :param logger: logger of skipped slots, LOGGER if it's not specified
+        """
+        slots = []
+        for item in schedule:
+            if item.active:
+                try:
+                    t = datetime.strptime(item.time, TIME_FORMAT).time()
+                except ValueError:
+                    (logger or LOGGER).warning('skipping the slot with invalid time {0!r}'.format(item.time))
+                    continue
+                slots.append((t.hour * 3600 + t.minute * 60 + t.second, item.amount))
+        slots.sort(key=lambda slot: slot[0])
+
+        self.offsets = [offset for offset, _ in slots]
+        self.amounts = [amount for _, amount in slots]
+        self.times = ['{0:02d}:{1:02d}:{2:02d}'.format(offset // 3600, offset // 60 % 60, offset % 60)
+                      for offset in self.offsets]
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def between(self, start: datetime, end: datetime) -> List[DueActivation]:
+        """
+        Returns activations of the slots due within the window, including both ends, ordered by instant.
+        :param start: start of the window
+        :param end: end of the window
+        :return: list of due activations
+        """
+        due = []
+        day = start.date()
+        # slots are whole seconds, so the start is rounded up and the end down
+        first = start.hour * 3600 + start.minute * 60 + start.second + (1 if start.microsecond else 0)
+        while day <= end.date() and self.offsets:
+            last = end.hour * 3600 + end.minute * 60 + end.second if day == end.date() else SECONDS_PER_DAY
+            midnight = _midnight(day)
+            prefix = day.isoformat() + 'T'
+            for i in range(bisect_left(self.offsets, first), bisect_right(self.offsets, last)):
+                due.append(DueActivation(instant=midnight + timedelta(seconds=self.offsets[i]),
+                                         timestamp=prefix + self.times[i], amount=self.amounts[i]))
+            day += timedelta(days=1)
+            first = 0
+
+        return due
+
+    def next_instant(self, start: datetime) -> Optional[datetime]:
+        """
+        Returns the instant of the first slot due at or after the start, None if there are no active slots.
+        """
+        if not self.offsets:
+            return None
+
+        offset = start.hour * 3600 + start.minute * 60 + start.second + (1 if start.microsecond else 0)
+        i = bisect_left(self.offsets, offset)
+        if i < len(self.offsets):
+            return _midnight(start.date()) + timedelta(seconds=self.offsets[i])
+        return _midnight(start.date() + timedelta(days=1)) + timedelta(seconds=self.offsets[0])
+
+
+class ActivationQueue:
+    """
+    Queue of upcoming activations of a circuit ordered by the instant they are due. The queue keeps the instant up to
+    which activations were taken out and looks up the following ones in the compiled schedule, so it rolls over
+    midnight by itself. One-time activations are kept in a list ordered by instant. Activations that were due within
+    the execution margin before the queue was created are included, so they are caught up.
+    """
+
+    def __init__(self, circuit: Optional[Circuit], now: datetime, margin: timedelta,
+                 logger: Optional[Logger] = None) -> None:
+        """
+        :param circuit: circuit whose activations are queued, the queue is empty if it's None or inactive
+        :param now: current time
+        :param margin: time after which a missed activation is not executed anymore
+        :param logger: logger of skipped slots and one-time activations whose time is invalid, LOGGER if it's not
+        specified
+        """
+        self._margin = margin
+        self._since = now - margin
+        self._one_time: List[DueActivation] = []
+
+        if not circuit or not circuit.active:
+            self._schedule = CompiledSchedule([])
+            return
+
+        self._schedule = CompiledSchedule(circuit.schedule, logger)
+        for activation in circuit.one_time_activations:
+            try:
+                instant = datetime.strptime(activation.timestamp, DATE_TIME_FORMAT)
+            except ValueError:
+                (logger or LOGGER).warning('skipping the one-time activation with invalid timestamp {0!r}'.format(
+                    activation.timestamp))
+                continue
+            if instant >= self._since:
+                self._one_time.append(DueActivation(instant=instant, timestamp=instant.strftime(DATE_TIME_FORMAT),
+                                                    amount=activation.amount))
+        self._one_time.sort(key=lambda activation: activation.instant)
+
+    def next_instant(self) -> Optional[datetime]:
+        """
+        Returns the instant of the next activation or None if the queue is empty.
+        """
+        instant = self._schedule.next_instant(self._since)
+        if self._one_time and (instant is None or self._one_time[0].instant < instant):
+            return self._one_time[0].instant
+        return instant
+
+    def pop_due(self, now: datetime) -> List[DueActivation]:
+        """
+        Takes out all activations due at the given time. Activations that are older than the execution margin, e.g.
+        because the device was suspended, are dropped.
+        :param now: current time
+        :return: list of due activations ordered by instant
+        """
+        if now < self._since:
+            return []
+
+        due = self._schedule.between(max(self._since, now - self._margin), now)
+        if self._one_time and self._one_time[0].instant <= now:
+            while self._one_time and self._one_time[0].instant <= now:
+                activation = self._one_time.pop(0)
+                if activation.instant >= now - self._margin:
+                    due.append(activation)
+            due.sort(key=lambda activation: activation.instant)
+
+        self._since = now.replace(microsecond=0) + timedelta(seconds=1)
+        return due
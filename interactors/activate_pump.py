@@ -1,9 +1,10 @@
 import asyncio
-import datetime
 from logging import Logger
+from typing import Optional
 
+from data.execution_log_repository import ExecutionLogRepository
 from data.pump_activation_repository import PumpActivationRepository
-from data.smart_garden.smart_garden_backend import SmartGardenBackend
+from device.clock import Clock
 from device.pump import Pump
 from domain.model import PumpActivation
 
@@ -11,28 +12,36 @@ from domain.model import PumpActivation
 class ActivatePump:
     DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
-    def __init__(self, pump: Pump, repository: PumpActivationRepository, backend: SmartGardenBackend,
-                 logger: Logger) -> None:
+    def __init__(self, pump: Pump, repository: PumpActivationRepository,
+                 execution_log_repository: ExecutionLogRepository, logger: Logger,
+                 clock: Optional[Clock] = None) -> None:
+        """
+        :param pump: pump of the circuit, it can be the mock or simulated one
+        :param clock: clock used for timestamps of execution logs, the system clock if it's not specified
+        """
         self._pump = pump
         self._repository = repository
-        self._backend = backend
+        self._execution_log_repository = execution_log_repository
         self._logger = logger
+        self._clock = clock or Clock()
 
     async def execute(self, timestamp: str, water: int) -> None:
         """
-        Activates the pump and logs it in the backend.
+        Activates the pump and queues the execution log for upload to the backend.
         :param timestamp: timestamp of pump activation
         :param water: amount of water
         """
-        self._logger.info('activating the pump, ts: {0}, water: {1} ml'.format(timestamp, water))
+        self._logger.info('activating the pump, circuit: {0}, ts: {1}, water: {2} ml'.format(
+            self._repository.circuit_id, timestamp, water))
         self._pump.on_async(water)
 
         await asyncio.gather(
             self._repository.store(PumpActivation(timestamp=timestamp, amount=water)),
-            self._backend.send_execution_log(
-                activation=PumpActivation(
-                    timestamp=datetime.datetime.now().strftime(ActivatePump.DATE_TIME_FORMAT),
-                    amount=water
+            self._execution_log_repository.store(
+                PumpActivation(
+                    timestamp=self._clock.now().strftime(ActivatePump.DATE_TIME_FORMAT),
+                    amount=water,
+                    circuit_id=self._repository.circuit_id
                 )
             )
         )
@@ -8,5 +8,11 @@ class FetchCircuit:
     def __init__(self, circuit_repository: CircuitRepository):
         self._repository = circuit_repository
 
-    async def execute(self) -> Optional[Circuit]:
-        return await self._repository.fetch()
+    def execute(self) -> Optional[Circuit]:
+        """
+        Returns the snapshot of the circuit, it's kept in sync by RunCircuitSyncLoop, so no I/O is done.
+        """
+        return self._repository.circuit
+
+    async def wait_for_update(self, timeout: Optional[float] = None) -> None:
+        await self._repository.wait_for_update(timeout)
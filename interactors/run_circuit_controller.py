@@ -0,0 +1,31 @@
+import asyncio
+from logging import Logger
+from typing import Dict, Optional
+
+from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+from interactors.run_supervised_loop import RunSupervisedLoop
+
+
+class RunCircuitController:
+    """
+    Specifies for how long a crashed schedule execution loop is paused before it's restarted, in seconds.
+    """
+    RESTART_DELAY = 60
+
+    def __init__(self, loops: Dict[Optional[int], RunScheduleExecutionLoop], logger: Logger) -> None:
+        """
+        :param loops: schedule execution loops by circuit ids
+        :param logger: logger
+        """
+        self._loops = loops
+        self._logger = logger
+
+    async def execute(self) -> None:
+        """
+        Runs schedule execution loops of all circuits as separate tasks. A crashed loop is restarted after a pause, so
+        a failure of one circuit doesn't stop the others. All the circuits share the same backend client and database
+        connection.
+        """
+        await asyncio.gather(*(RunSupervisedLoop(loop.execute, 'circuit {0}'.format(circuit_id), self._logger,
+                                                 RunCircuitController.RESTART_DELAY).execute()
+                               for circuit_id, loop in self._loops.items()))
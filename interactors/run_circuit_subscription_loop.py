@@ -0,0 +1,93 @@
+import asyncio
+import random
+import time
+from logging import Logger
+from typing import Dict, Optional
+
+from data.circuit_repository import CircuitRepository
+from data.smart_garden.exceptions import SmartGardenException
+from data.smart_garden.smart_garden_backend import SmartGardenBackend
+
+
+class RunCircuitSubscriptionLoop:
+    """
+    Initial and maximum delay in seconds between attempts to reopen the push channel.
+    """
+    MIN_BACKOFF = 1
+    MAX_BACKOFF = 300
+
+    """
+    Time in seconds the channel has to stay open before the backoff is reset, so a channel that is closed right after
+    pushing a circuit is not reopened at the minimum delay over and over.
+    """
+    STABLE_TIME = 60
+
+    def __init__(self, backend: SmartGardenBackend, repositories: Dict[Optional[int], CircuitRepository],
+                 logger: Logger) -> None:
+        """
+        :param backend: smart garden backend
+        :param repositories: circuit repositories by circuit ids
+        :param logger: logger
+        """
+        self._backend = backend
+        self._repositories = repositories
+        self._logger = logger
+        self._backoff = RunCircuitSubscriptionLoop.MIN_BACKOFF
+
+    def _set_subscribed(self, subscribed: bool) -> None:
+        for repository in self._repositories.values():
+            repository.subscribed = subscribed
+
+    def _repository_of(self, circuit_id: int) -> Optional[CircuitRepository]:
+        """
+        Returns the repository tracking the pushed circuit. The repository of the single circuit of the account tracks
+        the circuit it has synced, other circuits of the account are ignored, so its snapshot never flips between them.
+        """
+        repository = self._repositories.get(circuit_id)
+        if repository:
+            return repository
+
+        repository = self._repositories.get(None)
+        if repository and repository.circuit and repository.circuit.id == circuit_id:
+            return repository
+
+        return None
+
+    async def execute(self) -> None:
+        """
+        Runs an infinite loop in which circuits pushed by the backend are applied to the repositories of the
+        circuits. While the channel is down, the repositories fall back to polling and the channel is reopened with
+        exponential backoff.
+        """
+        while True:
+            opened = None
+            # noinspection PyBroadException
+            try:
+                async for circuit_data in self._backend.subscribe():
+                    if opened is None:
+                        opened = time.monotonic()
+                        self._set_subscribed(True)
+
+                    repository = self._repository_of(circuit_data.id)
+                    if repository:
+                        # noinspection PyBroadException
+                        try:
+                            await repository.apply(circuit_data)
+                        except Exception:
+                            self._logger.error('could not apply circuit {0}'.format(circuit_data.id), exc_info=True)
+
+                self._logger.info('push channel closed')
+            except SmartGardenException as e:
+                self._logger.error('push channel unavailable: {0}'.format(e))
+            except Exception:
+                self._logger.error('push channel failed', exc_info=True)
+            finally:
+                self._set_subscribed(False)
+
+            if opened is not None and time.monotonic() - opened >= RunCircuitSubscriptionLoop.STABLE_TIME:
+                self._backoff = RunCircuitSubscriptionLoop.MIN_BACKOFF
+
+            delay = random.uniform(self._backoff / 2, self._backoff)
+            self._backoff = min(self._backoff * 2, RunCircuitSubscriptionLoop.MAX_BACKOFF)
+
+            await asyncio.sleep(delay)
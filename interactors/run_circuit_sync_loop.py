@@ -0,0 +1,37 @@
+import asyncio
+from logging import Logger
+from typing import Dict, Optional
+
+from data.circuit_repository import CircuitRepository
+
+
+class RunCircuitSyncLoop:
+    def __init__(self, repositories: Dict[Optional[int], CircuitRepository], logger: Logger) -> None:
+        """
+        :param repositories: circuit repositories by circuit ids
+        :param logger: logger
+        """
+        self._repositories = repositories
+        self._logger = logger
+
+    async def _run(self, circuit_id: Optional[int], repository: CircuitRepository) -> None:
+        """
+        Keeps the snapshot of a single circuit in sync, so a slow or unreachable backend doesn't delay schedule
+        execution.
+        """
+        while True:
+            # noinspection PyBroadException
+            try:
+                await repository.sync()
+            except Exception:
+                self._logger.error('could not sync circuit {0}'.format(circuit_id), exc_info=True)
+
+            await repository.wait_for_sync()
+
+    async def execute(self) -> None:
+        """
+        Runs an infinite loop for every circuit in which the snapshot of the circuit is synced with the backend
+        whenever its sync interval passes.
+        """
+        await asyncio.gather(*(self._run(circuit_id, repository) for circuit_id, repository in
+                               self._repositories.items()))
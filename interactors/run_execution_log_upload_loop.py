@@ -0,0 +1,56 @@
+import asyncio
+import random
+from logging import Logger
+
+from data.execution_log_repository import ExecutionLogRepository
+from data.smart_garden.exceptions import SmartGardenException
+
+
+class RunExecutionLogUploadLoop:
+    """
+    Batch size used when uploading execution logs.
+    """
+    BATCH_SIZE = 50
+
+    """
+    Specifies how often the outbox is checked if nothing new is stored, in seconds.
+    """
+    IDLE_INTERVAL = 60
+
+    """
+    Initial and maximum delay in seconds between retries when the upload fails.
+    """
+    MIN_BACKOFF = 5
+    MAX_BACKOFF = 600
+
+    def __init__(self, repository: ExecutionLogRepository, logger: Logger) -> None:
+        self._repository = repository
+        self._logger = logger
+        self._backoff = RunExecutionLogUploadLoop.MIN_BACKOFF
+
+    async def execute(self) -> None:
+        """
+        Runs an infinite loop in which execution logs from the outbox are uploaded to the backend. Failed uploads are
+        retried with exponential backoff so an unreachable backend is not flooded with requests, and so are failures
+        of the local database.
+        """
+        while True:
+            # noinspection PyBroadException
+            try:
+                uploaded = await self._repository.upload(RunExecutionLogUploadLoop.BATCH_SIZE)
+                if uploaded:
+                    self._logger.info('uploaded {0} execution logs'.format(uploaded))
+
+                self._backoff = RunExecutionLogUploadLoop.MIN_BACKOFF
+                await self._repository.wait_for_pending(RunExecutionLogUploadLoop.IDLE_INTERVAL)
+                continue
+            except SmartGardenException as e:
+                self._logger.error('could not upload execution logs: {0}'.format(e))
+            except Exception:
+                # errors of the local database, the logs stay in the outbox and are retried like failed uploads
+                self._logger.error('could not upload execution logs', exc_info=True)
+
+            delay = random.uniform(self._backoff / 2, self._backoff)
+            self._backoff = min(self._backoff * 2, RunExecutionLogUploadLoop.MAX_BACKOFF)
+
+            await asyncio.sleep(delay)
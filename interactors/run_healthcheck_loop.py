@@ -1,19 +1,23 @@
 import asyncio
 
+from data.smart_garden.exceptions import SmartGardenException
 from data.smart_garden.smart_garden_backend import SmartGardenBackend
 
 
 class RunHealthCheckLoop:
-    def __init__(self, backend: SmartGardenBackend, interval: int = 5) -> None:
+    def __init__(self, backend: SmartGardenBackend) -> None:
         self._backend = backend
-        self._interval = interval
 
     async def execute(self) -> None:
         """
-        Runs an infinite loop in which health checks are sent so the user knows that his device is alive.
+        Runs an infinite loop in which health checks are sent so the user knows that his device is alive. A health
+        check is sent only if no other request reached the backend within the health check interval.
         """
         while True:
-            await asyncio.gather(
-                asyncio.sleep(self._interval),
-                self._backend.send_health_check()
-            )
+            await asyncio.sleep(self._backend.request_scheduler.time_until_health_check())
+
+            try:
+                await self._backend.send_health_check_if_due()
+            except SmartGardenException:
+                # the failure is recorded by the request scheduler which postpones the next attempt
+                pass
@@ -0,0 +1,19 @@
+import asyncio
+from logging import Logger
+
+from data.smart_garden.transport import LatencyRecorder
+
+
+class RunLatencyReportLoop:
+    def __init__(self, latency_recorder: LatencyRecorder, logger: Logger, interval: int = 900) -> None:
+        self._latency_recorder = latency_recorder
+        self._logger = logger
+        self._interval = interval
+
+    async def execute(self) -> None:
+        """
+        Runs an infinite loop in which latency of backend requests is periodically written to the log.
+        """
+        while True:
+            await asyncio.sleep(self._interval)
+            self._logger.info('backend latency: {0}'.format(self._latency_recorder.summary()))
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from logging import Logger
+from typing import Dict, List, Optional, Tuple
+
+from data.circuit_repository import CircuitRepository
+from data.retention_repository import RetentionRepository
+from device.clock import Clock
+from domain.model import Circuit
+from domain.schedule import DATE_TIME_FORMAT, CompiledSchedule
+
+
+class RunRetentionLoop:
+    """
+    Specifies how often old pump activations are compacted, in seconds.
+    """
+    INTERVAL = 3600
+
+    """
+    Pause between compacting two days, in seconds, so a long history doesn't keep the database thread busy.
+    """
+    STEP_PAUSE = 1
+
+    """
+    Minimal ratio of unused space in the database file for which the database is vacuumed.
+    """
+    VACUUM_THRESHOLD = 0.25
+
+    """
+    Specifies in minutes how far from any scheduled activation the database can be vacuumed.
+    """
+    IDLE_MARGIN = 15
+
+    """
+    Specifies how often it's checked whether the database can be vacuumed, in seconds.
+    """
+    IDLE_CHECK_INTERVAL = 60
+
+    def __init__(self, repository: RetentionRepository, circuit_repositories: List[CircuitRepository],
+                 retention_days: int, logger: Logger, clock: Optional[Clock] = None) -> None:
+        """
+        :param repository: retention repository
+        :param circuit_repositories: repositories of all circuits, their schedules determine idle windows
+        :param retention_days: number of past days for which all pump activations are kept
+        :param logger: logger
+        :param clock: clock determining the retention period and idle windows, the system clock if it's not specified
+        """
+        self._repository = repository
+        self._circuit_repositories = circuit_repositories
+        self._retention_days = retention_days
+        self._logger = logger
+        self._clock = clock or Clock()
+        self._schedules: Dict[CircuitRepository, Tuple[Circuit, CompiledSchedule]] = {}
+
+    def _cutoff(self) -> str:
+        """
+        Returns the timestamp of the start of the oldest day that is kept.
+        """
+        start = datetime.combine(self._clock.now().date(), time()) - timedelta(days=self._retention_days)
+        return start.strftime(DATE_TIME_FORMAT)
+
+    def _compiled_schedule(self, repository: CircuitRepository, circuit: Circuit) -> CompiledSchedule:
+        """
+        Returns the compiled schedule of the circuit, it's compiled again only when the snapshot of the circuit changes.
+        """
+        cached = self._schedules.get(repository)
+        if cached is None or cached[0] is not circuit:
+            cached = (circuit, CompiledSchedule(circuit.schedule, self._logger))
+            self._schedules[repository] = cached
+
+        return cached[1]
+
+    def _is_idle(self) -> bool:
+        """
+        Checks if no known activation of any circuit is scheduled within the idle margin from now. Circuits that were
+        not fetched from the backend yet are not taken into account.
+        """
+        now = self._clock.now()
+        margin = timedelta(minutes=RunRetentionLoop.IDLE_MARGIN)
+
+        for repository in self._circuit_repositories:
+            circuit = repository.circuit
+            if not circuit or not circuit.active:
+                continue
+
+            for activation in circuit.one_time_activations:
+                try:
+                    timestamp = datetime.strptime(activation.timestamp, DATE_TIME_FORMAT)
+                except ValueError:
+                    # skipped by the schedule execution loop as well
+                    continue
+                if abs(timestamp - now) <= margin:
+                    return False
+
+            if self._compiled_schedule(repository, circuit).between(now - margin, now + margin):
+                return False
+
+        return True
+
+    async def _compact(self) -> int:
+        """
+        Compacts all pump activations older than the retention period, one day at a time.
+        :return: number of compacted activations
+        """
+        cutoff = self._cutoff()
+        total = 0
+        while True:
+            compacted = await self._repository.compact(cutoff)
+            if not compacted:
+                return total
+
+            total += compacted
+            await asyncio.sleep(RunRetentionLoop.STEP_PAUSE)
+
+    async def _vacuum_when_idle(self) -> None:
+        """
+        Vacuums the database in the first idle window within the loop interval.
+        """
+        for _ in range(RunRetentionLoop.INTERVAL // RunRetentionLoop.IDLE_CHECK_INTERVAL):
+            if self._is_idle():
+                started = self._clock.monotonic()
+                await self._repository.vacuum()
+                self._logger.info('vacuumed the local database in {0:.1f} s'.format(self._clock.monotonic() - started))
+                return
+
+            await asyncio.sleep(RunRetentionLoop.IDLE_CHECK_INTERVAL)
+
+    async def execute(self) -> None:
+        """
+        Runs an infinite loop in which pump activations older than the retention period are compacted into daily
+        rollups. Once enough space is freed, the database is vacuumed while no pump activation is due, since vacuum
+        blocks all other database calls.
+        """
+        while True:
+            # noinspection PyBroadException
+            try:
+                compacted = await self._compact()
+                if compacted:
+                    self._logger.info('compacted {0} pump activations'.format(compacted))
+
+                if await self._repository.free_space_ratio() >= RunRetentionLoop.VACUUM_THRESHOLD:
+                    await self._vacuum_when_idle()
+            except Exception as e:
+                self._logger.error('could not apply the retention: {0}'.format(e))
+
+            await asyncio.sleep(RunRetentionLoop.INTERVAL)
@@ -1,108 +1,98 @@
-import asyncio
-from datetime import datetime, date
+from datetime import datetime, timedelta
 from logging import Logger
+from typing import Optional
 
 from data.pump_activation_repository import PumpActivationRepository
-from domain.model import ScheduledActivation, OneTimeActivation
+from device.clock import Clock
+from domain.model import Circuit
+from domain import schedule
+from domain.schedule import ActivationQueue
 from interactors.activate_pump import ActivatePump
 from interactors.fetch_circuit import FetchCircuit
 
 
 class RunScheduleExecutionLoop:
     """
-    Date and time format for all timestamps.
+    Execution margin specified in minutes for determining if given plan item is still valid.
     """
-    DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+    EXECUTION_MARGIN = schedule.EXECUTION_MARGIN
 
     """
-    Time format for used for describing time slots in the schedule.
+    Longest time in seconds the loop sleeps without reading the clock, so a change of the wall clock is noticed even if
+    the next activation is hours away.
     """
-    TIME_FORMAT = '%H:%M:%S'
+    MAX_WAIT = 60
 
     """
-    Execution margin specified in minutes for determining if given plan item is still valid. 
+    Difference in seconds between the time passed on the wall clock and on the monotonic clock after which the wall
+    clock is considered to have been set, e.g. by NTP or a change of daylight saving time.
     """
-    EXECUTION_MARGIN = 60
-
-    """
-    Specifies how often the schedule should po fetched from the backend.
-    """
-    FETCH_INTERVAL = 5
+    CLOCK_STEP_TOLERANCE = 5
 
     def __init__(self, fetch_circuit: FetchCircuit, activate_pump: ActivatePump, repository: PumpActivationRepository,
-                 logger: Logger) -> None:
+                 logger: Logger, clock: Optional[Clock] = None) -> None:
+        """
+        :param clock: clock the schedule is executed by, the system clock if it's not specified
+        """
         self._fetch_circuit = fetch_circuit
         self._activate_pump = activate_pump
         self._repository = repository
         self._logger = logger
+        self._clock = clock or Clock()
+        self._circuit: Optional[Circuit] = None
+        self._rebuild_queue(None, self._clock.now())
 
-    @staticmethod
-    def _extract_slot_ts(item: ScheduledActivation) -> str:
+    def _timeout(self) -> float:
         """
-        Extracts the timestamp of given plan item in DATE_TIME_FORMAT.
-        :param item: plan item
-        :return: properly formatted timestamp
+        Returns the number of seconds the loop should sleep, until the next activation is due but at most MAX_WAIT.
+        The wait is measured by the monotonic clock of the event loop, so it has to be short enough for the wall clock
+        to be read again soon after it's set.
         """
-        time = datetime.strptime(item.time, RunScheduleExecutionLoop.TIME_FORMAT).time()
-        slot = datetime.combine(date.today(), time)
+        instant = self._queue.next_instant()
+        if instant is None:
+            return RunScheduleExecutionLoop.MAX_WAIT
 
-        return slot.strftime(RunScheduleExecutionLoop.DATE_TIME_FORMAT)
+        return min(max((instant - self._clock.now()).total_seconds(), 0), RunScheduleExecutionLoop.MAX_WAIT)
 
-    async def _should_start_pump(self, item: ScheduledActivation, margin_in_minutes=60) -> bool:
+    def _rebuild_queue(self, circuit: Optional[Circuit], now: datetime) -> None:
         """
-        Checks if the water pump should be activated for given plan item taking into account time margin. The margin
-        specifies the limit beyond which plan items are recognized as invalid and are not executed.
-        :param item: plan item
-        :param margin_in_minutes: the margin for determining if given plan item is still valid
-        :return:true if the plan item should be executed
+        Rebuilds the queue from the circuit, which becomes the executed circuit only once its queue is built, so a
+        circuit that can't be queued is tried again on the next tick.
         """
-        time = datetime.strptime(item.time, RunScheduleExecutionLoop.TIME_FORMAT).time()
-        now = datetime.now().time()
-
-        slot = datetime.combine(date.today(), time)
-
-        slot_str = slot.strftime(RunScheduleExecutionLoop.DATE_TIME_FORMAT)
-        delta = datetime.combine(date.today(), now) - slot
-
-        return now > time and delta.seconds < margin_in_minutes * 60 and not await self._repository.exists(slot_str)
-
-    async def _should_start_one_time_activation(self, item: OneTimeActivation, margin_in_minutes=60) -> bool:
-        """
-        Checks if the water pump should be activated for given activation item taking into account time margin.
-        The margin specifies the limit beyond which plan items are recognized as invalid and are not executed.
-        :param item: one-time activation item
-        :param margin_in_minutes: the margin for determining if given plan item is still valid
-        :return:true if the activate item should be executed
-        """
-        one_time_date = datetime.strptime(item.timestamp, RunScheduleExecutionLoop.DATE_TIME_FORMAT)
-        now = datetime.now()
-
-        slot_str = one_time_date.strftime(RunScheduleExecutionLoop.DATE_TIME_FORMAT)
-        delta = now - one_time_date
-
-        return now > one_time_date and delta.seconds < margin_in_minutes * 60 and not \
-            await self._repository.exists(slot_str)
+        self._queue = ActivationQueue(circuit, now, timedelta(minutes=RunScheduleExecutionLoop.EXECUTION_MARGIN),
+                                      self._logger)
+        self._circuit = circuit
 
     async def execute(self) -> None:
         """
-        Runs an infinite loop in which the schedule is constantly fetched and its items are executed. This method
-        contains the logic responsible for managing water pump activation with regard to the timetable created by
-        the user.
+        Runs an infinite loop which executes the schedule of the circuit. The loop reads only the snapshot of the
+        circuit, which is synced in the background, so it never waits for the backend. Upcoming activations are kept in
+        a queue that is rebuilt whenever the snapshot changes, and the loop sleeps until the next one is due or the
+        snapshot changes. Activations missed by less than EXECUTION_MARGIN minutes, e.g. after a restart, are caught
+        up. When the wall clock is set, the queue is rebuilt from the new time, activations repeated after the clock was
+        set back are skipped because they are already stored.
         """
+        last_now, last_monotonic = self._clock.now(), self._clock.monotonic()
         while True:
-            schedule = await self._fetch_circuit.execute()
-
-            if schedule and schedule.active:
+            circuit = self._fetch_circuit.execute()
+            now, monotonic = self._clock.now(), self._clock.monotonic()
+            step = (now - last_now).total_seconds() - (monotonic - last_monotonic)
+            last_now, last_monotonic = now, monotonic
+
+            try:
+                if circuit != self._circuit:
+                    self._rebuild_queue(circuit, now)
+                elif abs(step) > RunScheduleExecutionLoop.CLOCK_STEP_TOLERANCE:
+                    self._logger.warning('the clock was set by {0:.0f} seconds, rebuilding the schedule'.format(step))
+                    self._rebuild_queue(circuit, now)
+            except Exception as e:
+                self._logger.error('an exception occurred: {0}'.format(str(e)))
+
+            for activation in self._queue.pop_due(now):
                 try:
-                    if schedule.one_time_activation and await self._should_start_one_time_activation(
-                            schedule.one_time_activation, RunScheduleExecutionLoop.EXECUTION_MARGIN):
-                        await self._activate_pump.execute(timestamp=schedule.one_time_activation.timestamp,
-                                                          water=schedule.one_time_activation.amount)
-
-                    for item in [pi for pi in schedule.schedule if pi.active]:
-                        if await self._should_start_pump(item, RunScheduleExecutionLoop.EXECUTION_MARGIN):
-                            await self._activate_pump.execute(timestamp=self._extract_slot_ts(item), water=item.amount)
+                    if not await self._repository.exists(activation.timestamp):
+                        await self._activate_pump.execute(timestamp=activation.timestamp, water=activation.amount)
                 except Exception as e:
                     self._logger.error('an exception occurred: {0}'.format(str(e)))
 
-            await asyncio.sleep(RunScheduleExecutionLoop.FETCH_INTERVAL)
+            await self._fetch_circuit.wait_for_update(self._timeout())
@@ -0,0 +1,38 @@
+import asyncio
+from logging import Logger
+from typing import Awaitable, Callable
+
+
+class RunSupervisedLoop:
+    """
+    Specifies for how long a crashed loop is paused before it's restarted, in seconds.
+    """
+    RESTART_DELAY = 60
+
+    def __init__(self, execute: Callable[[], Awaitable[None]], name: str, logger: Logger,
+                 restart_delay: float = RESTART_DELAY) -> None:
+        """
+        :param execute: execute method of the supervised loop
+        :param name: name of the loop used in the log
+        :param logger: logger
+        :param restart_delay: number of seconds the loop is paused for after it crashes
+        """
+        self._execute = execute
+        self._name = name
+        self._logger = logger
+        self._restart_delay = restart_delay
+
+    async def execute(self) -> None:
+        """
+        Runs the loop and restarts it after a pause whenever it crashes, so a failure of one loop neither stops nor
+        duplicates the loops running next to it.
+        """
+        while True:
+            # noinspection PyBroadException
+            try:
+                await self._execute()
+            except Exception:
+                self._logger.error('unexpected error occurred in {0}'.format(self._name), exc_info=True)
+                self._logger.info('pausing {0} for {1} seconds'.format(self._name, self._restart_delay))
+
+                await asyncio.sleep(self._restart_delay)
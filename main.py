@@ -1,79 +1,132 @@
 import asyncio
-
-from aiohttp import ClientSession
+from typing import Optional, Callable
 
 from data.circuit_repository import CircuitRepository
 from data.db.circuit_dao import CircuitDao
-from data.db.db_common import Session
+from data.db.db_common import database
+from data.db.execution_log_dao import ExecutionLogDao
+from data.db.maintenance_dao import MaintenanceDao
 from data.db.pump_activation_dao import PumpActivationDao
+from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
 from data.db.scheduled_activation_dao import ScheduledActivationDao
+from data.execution_log_repository import ExecutionLogRepository
 from data.pump_activation_repository import PumpActivationRepository
+from data.retention_repository import RetentionRepository
+from data.smart_garden.auth_token import TokenStore
+from data.smart_garden.decoder import PayloadDecoder
+from data.smart_garden.request_scheduler import RequestScheduler
 from data.smart_garden.smart_garden_backend import SmartGardenBackend
+from data.smart_garden.transport import LatencyRecorder, create_client_session
+from device.flow_sensor import FlowSensor
 from device.pump import Pump
 from interactors.activate_pump import ActivatePump
 from interactors.fetch_circuit import FetchCircuit
+from interactors.run_circuit_controller import RunCircuitController
+from interactors.run_circuit_subscription_loop import RunCircuitSubscriptionLoop
+from interactors.run_circuit_sync_loop import RunCircuitSyncLoop
+from interactors.run_execution_log_upload_loop import RunExecutionLogUploadLoop
 from interactors.run_healthcheck_loop import RunHealthCheckLoop
+from interactors.run_latency_report_loop import RunLatencyReportLoop
+from interactors.run_retention_loop import RunRetentionLoop
 from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+from interactors.run_supervised_loop import RunSupervisedLoop
 from log.logger import logger
 from settings import Settings
 
 
-async def main() -> None:
+def create_gpio_pump(circuit_id: Optional[int], settings: Settings) -> Pump:
+    """
+    Creates the pump of the circuit driven through GPIO, with its flow sensor if one is configured.
+    """
+    flow_sensor = None
+    if circuit_id in settings.flow_sensors:
+        flow_sensor = FlowSensor(gpio_pin=settings.flow_sensors[circuit_id], pulses_per_litre=settings.pulses_per_litre)
+
+    return Pump(gpio_pin=settings.pumps[circuit_id], ml_per_second=settings.pump_ml_per_second(circuit_id),
+                flow_sensor=flow_sensor)
+
+
+async def main(latency_recorder: Optional[LatencyRecorder] = None,
+               create_pump: Callable[[Optional[int], Settings], Pump] = create_gpio_pump) -> None:
     """
     Main function that is responsible for:
         - creating and configuring all the components,
-        - starting infinite schedule execution,
-        - starting infinite health check loop.
+        - starting infinite schedule execution of every circuit,
+        - starting infinite circuit sync loop,
+        - starting infinite health check loop,
+        - starting infinite execution log upload loop,
+        - starting infinite backend latency report loop,
+        - starting infinite retention loop,
+        - starting infinite push channel loop if push updates are enabled.
+    :param latency_recorder: recorder of backend latency, a new one is created if it's not specified
+    :param create_pump: creates the pump of the circuit with the given id according to the settings
     """
 
     settings = Settings()
+    latency_recorder = latency_recorder or LatencyRecorder()
 
-    async with ClientSession() as session:
+    async with create_client_session(settings.transport_config, latency_recorder) as session:
         smart_garden_backend = SmartGardenBackend(
             email=settings.email,
             password=settings.password,
-            client_session=session
+            client_session=session,
+            base_url=settings.backend_url,
+            token_store=TokenStore(settings.token_cache_path),
+            request_scheduler=RequestScheduler(interval=settings.health_check_interval),
+            transport_config=settings.transport_config,
+            latency_recorder=latency_recorder,
+            payload_decoder=PayloadDecoder(strict=settings.strict_payloads)
         )
-        session = Session()
+        plan_item_dao = ScheduledActivationDao(database=database)
+        schedule_dao = CircuitDao(database=database)
+        pump_activation_dao = PumpActivationDao(database=database)
+        execution_log_dao = ExecutionLogDao(database=database)
+        rollup_dao = PumpActivationRollupDao(database=database)
 
-        plan_item_dao = ScheduledActivationDao(session=session)
-        schedule_dao = CircuitDao(session=session)
-        pump_activation_dao = PumpActivationDao(session=session)
+        execution_log_repository = ExecutionLogRepository(execution_log_dao, smart_garden_backend, logger)
+        retention_repository = RetentionRepository(rollup_dao, MaintenanceDao(database=database))
 
-        schedule_repository = CircuitRepository(smart_garden_backend, plan_item_dao, schedule_dao, logger)
-        pump_activation_repository = PumpActivationRepository(pump_activation_dao)
+        schedule_repositories = {}
+        schedule_execution_loops = {}
+        for circuit_id in settings.pumps:
+            schedule_repository = CircuitRepository(smart_garden_backend, plan_item_dao, schedule_dao, logger,
+                                                    circuit_id=circuit_id, poll_interval=settings.poll_interval)
+            schedule_repositories[circuit_id] = schedule_repository
+            pump_activation_repository = PumpActivationRepository(pump_activation_dao, circuit_id=circuit_id,
+                                                                  rollup_dao=rollup_dao)
 
-        pump = Pump(
-            gpio_pin=settings.pin_number,
-            ml_per_second=settings.ml_per_seconds
-        )
+            pump = create_pump(circuit_id, settings)
 
-        activate_pump = ActivatePump(
-            pump=pump,
-            repository=pump_activation_repository,
-            backend=smart_garden_backend,
-            logger=logger
-        )
-        fetch_circuit = FetchCircuit(circuit_repository=schedule_repository)
+            activate_pump = ActivatePump(
+                pump=pump,
+                repository=pump_activation_repository,
+                execution_log_repository=execution_log_repository,
+                logger=logger
+            )
+            fetch_circuit = FetchCircuit(circuit_repository=schedule_repository)
+            schedule_execution_loops[circuit_id] = RunScheduleExecutionLoop(
+                fetch_circuit=fetch_circuit,
+                activate_pump=activate_pump,
+                repository=pump_activation_repository, logger=logger
+            )
+
+        run_circuit_controller = RunCircuitController(loops=schedule_execution_loops, logger=logger)
+        run_circuit_sync_loop = RunCircuitSyncLoop(repositories=schedule_repositories, logger=logger)
         run_healthcheck_loop = RunHealthCheckLoop(backend=smart_garden_backend)
-        run_schedule_execution_loop = RunScheduleExecutionLoop(
-            fetch_circuit=fetch_circuit,
-            activate_pump=activate_pump,
-            repository=pump_activation_repository, logger=logger
-        )
+        run_execution_log_upload_loop = RunExecutionLogUploadLoop(repository=execution_log_repository, logger=logger)
+        run_latency_report_loop = RunLatencyReportLoop(latency_recorder=latency_recorder, logger=logger)
+        run_retention_loop = RunRetentionLoop(repository=retention_repository,
+                                              circuit_repositories=list(schedule_repositories.values()),
+                                              retention_days=settings.retention_days, logger=logger)
+
+        loops = [run_healthcheck_loop, run_circuit_sync_loop, run_circuit_controller, run_execution_log_upload_loop,
+                 run_latency_report_loop, run_retention_loop]
+        if settings.push_updates:
+            loops.append(RunCircuitSubscriptionLoop(backend=smart_garden_backend, repositories=schedule_repositories,
+                                                    logger=logger))
 
-        while True:
-            # noinspection PyBroadException
-            try:
-                await asyncio.gather(
-                    run_healthcheck_loop.execute(),
-                    run_schedule_execution_loop.execute()
-                )
-            except Exception:
-                logger.error('unexpected error occurred', exc_info=True)
-                logger.info('pausing for 60 seconds')
-
-                await asyncio.sleep(60)
+        await asyncio.gather(*(RunSupervisedLoop(loop.execute, type(loop).__name__, logger).execute()
+                               for loop in loops))
 
 
 if __name__ == "__main__":
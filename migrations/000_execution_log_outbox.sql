@@ -0,0 +1,6 @@
+CREATE TABLE IF NOT EXISTS execution_log_outbox (
+	id INTEGER NOT NULL,
+	timestamp VARCHAR,
+	amount INTEGER,
+	PRIMARY KEY (id)
+);
@@ -0,0 +1,5 @@
+ALTER TABLE pump_activations ADD COLUMN circuit_id INTEGER;
+ALTER TABLE execution_log_outbox ADD COLUMN circuit_id INTEGER;
+
+-- the cached circuit keeps its local id and serves as the offline fallback of the single circuit of the account until
+-- it's replaced by the circuit stored with the id assigned by the backend
@@ -0,0 +1,24 @@
+-- pump activation timestamps are stored as integer epochs of the local time taken as UTC, which is what strftime('%s')
+-- returns, and every circuit can be activated only once for a timestamp; duplicates are dropped, the first one is kept
+BEGIN TRANSACTION;
+
+CREATE TABLE pump_activations_new (
+	id INTEGER NOT NULL,
+	timestamp INTEGER NOT NULL,
+	amount INTEGER,
+	circuit_id INTEGER,
+	PRIMARY KEY (id)
+);
+
+INSERT INTO pump_activations_new (id, timestamp, amount, circuit_id)
+SELECT MIN(id), CAST(strftime('%s', timestamp) AS INTEGER) AS epoch, amount, circuit_id
+FROM pump_activations
+WHERE strftime('%s', timestamp) IS NOT NULL
+GROUP BY IFNULL(circuit_id, 0), epoch;
+
+DROP TABLE pump_activations;
+ALTER TABLE pump_activations_new RENAME TO pump_activations;
+
+CREATE UNIQUE INDEX ix_pump_activations_circuit_slot ON pump_activations (IFNULL(circuit_id, 0), timestamp);
+
+COMMIT;
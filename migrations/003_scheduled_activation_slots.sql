@@ -0,0 +1,9 @@
+-- scheduled activations are upserted by circuit and time, duplicates are dropped keeping the first one
+BEGIN TRANSACTION;
+
+DELETE FROM scheduled_activations
+WHERE id NOT IN (SELECT MIN(id) FROM scheduled_activations GROUP BY circuit_id, time);
+
+CREATE UNIQUE INDEX ix_scheduled_activations_circuit_time ON scheduled_activations (circuit_id, time);
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- pump activations older than the retention period are compacted into daily rollups of every circuit, days and
+-- timestamps are integer epochs like in pump_activations
+BEGIN TRANSACTION;
+
+CREATE TABLE pump_activation_rollups (
+	id INTEGER NOT NULL,
+	day INTEGER NOT NULL,
+	count INTEGER NOT NULL,
+	amount INTEGER NOT NULL,
+	first_timestamp INTEGER NOT NULL,
+	last_timestamp INTEGER NOT NULL,
+	circuit_id INTEGER,
+	PRIMARY KEY (id)
+);
+
+CREATE UNIQUE INDEX ix_pump_activation_rollups_circuit_day ON pump_activation_rollups (IFNULL(circuit_id, 0), day);
+
+COMMIT;
@@ -1,4 +1,13 @@
 import os
+from typing import Dict, Optional
+
+from data.db.storage import StorageProfile, STORAGE_PROFILES
+from data.smart_garden.transport_config import TransportConfig
+
+"""
+Number of pulses flow sensors send per litre if PULSES_PER_LITRE is not set.
+"""
+PULSES_PER_LITRE = 450.0
 
 
 class Settings:
@@ -7,15 +16,83 @@ class Settings:
     """
 
     def __init__(self, email: str = None, password: str = None, local_db_name: str = None, pin_number: int = None,
-                 ml_per_second: int = None):
+                 ml_per_second: int = None, token_cache_path: str = None, health_check_interval: int = None,
+                 strict_payloads: bool = None, pumps: Dict[Optional[int], int] = None, backend_url: str = None,
+                 push_updates: bool = None, poll_interval: float = None, storage_profile: str = None,
+                 retention_days: int = None, flow_sensors: Dict[Optional[int], int] = None,
+                 pulses_per_litre: float = None, pump_flow_rates: Dict[Optional[int], int] = None):
         from dotenv import load_dotenv
         load_dotenv()
 
         self._email = email or os.getenv('EMAIL')
         self._password = password or os.getenv('PASSWORD')
         self._local_db_name = local_db_name or os.getenv('DB_NAME')
+        self._storage_profile = STORAGE_PROFILES[storage_profile or os.getenv('DB_PROFILE', 'default')]
         self._ml_per_second = int(ml_per_second or os.getenv('ML_PER_SECOND'))
         self._pin_number = pin_number or os.getenv('PIN')
+        self._pumps = pumps or self._parse_pins(os.getenv('PUMPS')) or {None: self._pin_number}
+        self._pump_flow_rates = pump_flow_rates or self._parse_flow_rates(os.getenv('PUMPS'))
+        self._flow_sensors = flow_sensors or self._parse_pins(os.getenv('FLOW_SENSORS')) or \
+            ({None: int(os.getenv('FLOW_SENSOR_PIN'))} if os.getenv('FLOW_SENSOR_PIN') else {})
+        self._pulses_per_litre = float(pulses_per_litre or os.getenv('PULSES_PER_LITRE', PULSES_PER_LITRE))
+        self._backend_url = backend_url or os.getenv('BACKEND_URL', 'https://smart-garden-1.herokuapp.com')
+        self._token_cache_path = token_cache_path or os.getenv('TOKEN_CACHE') or \
+            os.path.join(os.path.expanduser('~'), '.pytomatoes_tokens.json')
+        self._health_check_interval = int(health_check_interval or os.getenv('HEALTH_CHECK_INTERVAL', 30))
+        self._strict_payloads = strict_payloads if strict_payloads is not None else \
+            os.getenv('STRICT_PAYLOADS', '').lower() in ('1', 'true', 'yes')
+        self._push_updates = push_updates if push_updates is not None else \
+            os.getenv('PUSH_UPDATES', '').lower() in ('1', 'true', 'yes')
+        self._poll_interval = float(poll_interval or os.getenv('POLL_INTERVAL', 5))
+        self._retention_days = max(1, int(retention_days or os.getenv('RETENTION_DAYS', 90)))
+        self._transport_config = TransportConfig(
+            fetch_timeout=float(os.getenv('HTTP_FETCH_TIMEOUT', TransportConfig.fetch_timeout)),
+            log_timeout=float(os.getenv('HTTP_LOG_TIMEOUT', TransportConfig.log_timeout)),
+            health_timeout=float(os.getenv('HTTP_HEALTH_TIMEOUT', TransportConfig.health_timeout)),
+            auth_timeout=float(os.getenv('HTTP_AUTH_TIMEOUT', TransportConfig.auth_timeout)),
+            pool_size=int(os.getenv('HTTP_POOL_SIZE', TransportConfig.pool_size)),
+            keepalive_timeout=float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', TransportConfig.keepalive_timeout)),
+            dns_cache_ttl=int(os.getenv('DNS_CACHE_TTL', TransportConfig.dns_cache_ttl)),
+            push_heartbeat=float(os.getenv('PUSH_HEARTBEAT', TransportConfig.push_heartbeat)),
+            binary_payloads=os.getenv('BINARY_PAYLOADS', 'true').lower() in ('1', 'true', 'yes'),
+            compress_requests=os.getenv('COMPRESS_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+        )
+
+    @staticmethod
+    def _parse_pins(value: Optional[str]) -> Dict[Optional[int], int]:
+        """
+        Parses pump or flow sensor configuration in the format circuit_id:pin[,circuit_id:pin...]. Flow rates that
+        follow the pins of pumps are skipped, see _parse_flow_rates().
+        :param value: pump or flow sensor configuration
+        :return: gpio pins by circuit ids
+        """
+        if not value:
+            return {}
+
+        pins = {}
+        for item in value.split(','):
+            circuit_id, pin = item.split(':')[:2]
+            pins[int(circuit_id)] = int(pin)
+
+        return pins
+
+    @staticmethod
+    def _parse_flow_rates(value: Optional[str]) -> Dict[Optional[int], int]:
+        """
+        Parses flow rates of pumps in the format circuit_id:pin[:ml_per_second][,circuit_id:pin[:ml_per_second]...].
+        :param value: pump configuration
+        :return: flow rates in ml per second by circuit ids of the pumps that specify one
+        """
+        if not value:
+            return {}
+
+        flow_rates = {}
+        for item in value.split(','):
+            fields = item.split(':')
+            if len(fields) == 3:
+                flow_rates[int(fields[0])] = int(fields[2])
+
+        return flow_rates
 
     @property
     def email(self) -> str:
@@ -29,6 +106,13 @@ class Settings:
     def local_db_name(self) -> str:
         return self._local_db_name
 
+    @property
+    def storage_profile(self) -> StorageProfile:
+        """
+        SQLite settings of the local database selected by the name of the profile, see STORAGE_PROFILES.
+        """
+        return self._storage_profile
+
     @property
     def pin_number(self) -> int:
         return self._pin_number
@@ -36,3 +120,70 @@ class Settings:
     @property
     def ml_per_seconds(self) -> int:
         return self._ml_per_second
+
+    @property
+    def pumps(self) -> Dict[Optional[int], int]:
+        """
+        Gpio pins of the pumps by ids of the circuits they belong to. If PUMPS is not configured, the pump connected to
+        PIN is assigned to the single circuit of the account, represented by None.
+        """
+        return self._pumps
+
+    def pump_ml_per_second(self, circuit_id: Optional[int]) -> int:
+        """
+        Returns how much water flows through the pump of the circuit in a second, ML_PER_SECOND unless PUMPS specifies
+        the flow rate of the pump.
+        :param circuit_id: id of the circuit
+        """
+        return self._pump_flow_rates.get(circuit_id, self._ml_per_second)
+
+    @property
+    def flow_sensors(self) -> Dict[Optional[int], int]:
+        """
+        Gpio pins of the flow sensors by ids of the circuits whose pumps they measure. Pumps without a flow sensor run
+        for the time calculated from ML_PER_SECOND.
+        """
+        return self._flow_sensors
+
+    @property
+    def pulses_per_litre(self) -> float:
+        return self._pulses_per_litre
+
+    @property
+    def backend_url(self) -> str:
+        return self._backend_url
+
+    @property
+    def token_cache_path(self) -> str:
+        return self._token_cache_path
+
+    @property
+    def health_check_interval(self) -> int:
+        return self._health_check_interval
+
+    @property
+    def transport_config(self) -> TransportConfig:
+        return self._transport_config
+
+    @property
+    def strict_payloads(self) -> bool:
+        return self._strict_payloads
+
+    @property
+    def push_updates(self) -> bool:
+        return self._push_updates
+
+    @property
+    def poll_interval(self) -> float:
+        """
+        Number of seconds between fetches of a circuit from the backend when the push channel is not connected.
+        """
+        return self._poll_interval
+
+    @property
+    def retention_days(self) -> int:
+        """
+        Number of past days for which all pump activations are kept, older ones are compacted into daily rollups. It's
+        at least 1, so activations of the previous day are always available.
+        """
+        return self._retention_days
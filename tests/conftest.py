@@ -0,0 +1,25 @@
+import os
+import sqlite3
+
+import pytest
+
+# importing the database module reads the settings, the tests don't depend on an .env file
+os.environ.setdefault('ML_PER_SECOND', '1')
+os.environ.setdefault('DB_NAME', ':memory:')
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.schema')
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Local database created from db.schema in a temporary directory.
+    """
+    from data.db.db_common import create_database
+    from data.db.storage import STORAGE_PROFILES
+
+    path = str(tmp_path / 'test.sqlite3')
+    with open(SCHEMA) as schema, sqlite3.connect(path) as connection:
+        connection.executescript(schema.read())
+
+    return create_database(path, STORAGE_PROFILES['default'])
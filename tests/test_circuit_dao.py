@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy import event
+
+from data.db.circuit_dao import CircuitDao
+from data.db.model import CircuitEntity, ScheduledActivationEntity
+
+
+def circuit(circuit_id: int, *slots) -> CircuitEntity:
+    return CircuitEntity(id=circuit_id, name='circuit', active=True,
+                         schedule=[ScheduledActivationEntity(time=time, amount=amount, active=active)
+                                   for time, amount, active in slots])
+
+
+def stored_slots(dao: CircuitDao, circuit_id: int) -> dict:
+    stored = asyncio.run(dao.fetch(circuit_id))
+    return {slot.time: (slot.id, slot.amount, slot.active) for slot in stored.schedule}
+
+
+def test_unchanged_circuit_writes_nothing(database):
+    dao = CircuitDao(database)
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 100, True), ('19:00:00', 200, True))))
+
+    writes = []
+
+    @event.listens_for(database.engine, 'before_cursor_execute')
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+            writes.append(statement)
+
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 100, True), ('19:00:00', 200, True))))
+
+    assert writes == []
+
+
+def test_changed_slots_are_updated_in_place_and_removed_slots_are_deleted(database):
+    dao = CircuitDao(database)
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 100, True), ('12:00:00', 150, True), ('19:00:00', 200, True))))
+    before = stored_slots(dao, 1)
+
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 120, False), ('19:00:00', 200, True), ('21:00:00', 50, True))))
+    after = stored_slots(dao, 1)
+
+    assert set(after) == {'07:00:00', '19:00:00', '21:00:00'}
+    assert after['07:00:00'] == (before['07:00:00'][0], 120, False)
+    assert after['19:00:00'] == before['19:00:00']
+    assert database.engine.execute('SELECT COUNT(*) FROM scheduled_activations').scalar() == 3
+
+
+def test_first_active_slot_is_kept_for_duplicate_times(database):
+    dao = CircuitDao(database)
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 100, False), ('07:00:00', 120, True), ('07:00:00', 140, True))))
+
+    assert [(amount, active) for _, amount, active in stored_slots(dao, 1).values()] == [(120, True)]
+
+
+def test_circuits_are_stored_side_by_side_unless_exclusive(database):
+    dao = CircuitDao(database)
+    asyncio.run(dao.store(circuit(1, ('07:00:00', 100, True))))
+    asyncio.run(dao.store(circuit(2, ('08:00:00', 100, True))))
+
+    assert asyncio.run(dao.fetch(1)) is not None and asyncio.run(dao.fetch(2)) is not None
+
+    asyncio.run(dao.store(circuit(3, ('09:00:00', 100, True)), exclusive=True))
+
+    assert asyncio.run(dao.fetch(1)) is None and asyncio.run(dao.fetch(2)) is None
+    assert list(stored_slots(dao, 3)) == ['09:00:00']
@@ -0,0 +1,104 @@
+import pytest
+
+from data.smart_garden import connectivity
+from data.smart_garden.connectivity import ConnectivityMonitor, ConnectivityState
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(connectivity.time, 'monotonic', lambda: now[0])
+    # the longest backoff is drawn, so the time of the next probe is known
+    monkeypatch.setattr(connectivity.random, 'uniform', lambda a, b: b)
+    return now
+
+
+def offline_monitor() -> ConnectivityMonitor:
+    monitor = ConnectivityMonitor(offline_threshold=3, min_backoff=5, max_backoff=20)
+    for _ in range(3):
+        monitor.record_failure()
+    return monitor
+
+
+def test_monitor_starts_online():
+    monitor = ConnectivityMonitor()
+
+    assert monitor.state == ConnectivityState.ONLINE
+    assert monitor.allow_request()
+
+
+def test_failures_below_the_threshold_degrade_the_backend_but_let_requests_through(clock):
+    monitor = ConnectivityMonitor(offline_threshold=3)
+    monitor.record_failure()
+    monitor.record_failure()
+
+    assert monitor.state == ConnectivityState.DEGRADED
+    assert monitor.allow_request()
+
+
+def test_success_resets_the_count_of_consecutive_failures(clock):
+    monitor = ConnectivityMonitor(offline_threshold=3)
+    monitor.record_failure()
+    monitor.record_failure()
+    monitor.record_success()
+    monitor.record_failure()
+
+    assert monitor.state == ConnectivityState.DEGRADED
+
+
+def test_backend_goes_offline_at_the_threshold_and_requests_fail_fast(clock):
+    monitor = offline_monitor()
+
+    assert monitor.state == ConnectivityState.OFFLINE
+    assert not monitor.allow_request()
+
+
+def test_single_probe_is_let_through_once_the_backoff_passes(clock):
+    monitor = offline_monitor()
+    clock[0] += 5
+
+    assert monitor.allow_request()
+    assert not monitor.allow_request()
+
+
+def test_failed_probe_doubles_the_backoff_up_to_the_maximum(clock):
+    monitor = offline_monitor()
+    clock[0] += 5
+    assert monitor.allow_request()
+
+    for backoff in (10, 20, 20):
+        monitor.record_failure()
+
+        clock[0] += backoff - 1
+        assert not monitor.allow_request()
+        clock[0] += 1
+        assert monitor.allow_request()
+
+    assert monitor.state == ConnectivityState.OFFLINE
+
+
+def test_successful_probe_brings_the_backend_online_and_resets_the_backoff(clock):
+    monitor = offline_monitor()
+    clock[0] += 5
+    monitor.allow_request()
+    monitor.record_failure()
+    clock[0] += 10
+    monitor.allow_request()
+    monitor.record_success()
+
+    assert monitor.state == ConnectivityState.ONLINE
+    assert monitor.allow_request()
+
+    for _ in range(3):
+        monitor.record_failure()
+    clock[0] += 5
+    assert monitor.allow_request()
+
+
+def test_cancelled_probe_releases_the_next_one(clock):
+    monitor = offline_monitor()
+    clock[0] += 5
+    monitor.allow_request()
+    monitor.cancel_request()
+
+    assert monitor.allow_request()
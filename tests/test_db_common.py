@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from data.db.db_common import create_database
+from data.db.storage import StorageProfile
+
+
+def insert(database, item_id: int):
+    return lambda: database.session.execute('INSERT INTO items (id) VALUES (:id)', {'id': item_id})
+
+
+def item_ids(database) -> list:
+    return database.run_outside_transaction(
+        lambda connection: [row[0] for row in connection.execute('SELECT id FROM items ORDER BY id')])
+
+
+async def create_items(database) -> None:
+    await database.run_outside_transaction(
+        lambda connection: connection.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)'))
+
+
+@pytest.mark.parametrize('commit_window', [0, 0.05])
+def test_failed_unit_is_rolled_back_without_the_other_writes(tmp_path, commit_window):
+    database = create_database(str(tmp_path / 'test.sqlite3'), StorageProfile(commit_window=commit_window))
+
+    async def scenario():
+        await create_items(database)
+        results = await asyncio.gather(database.run(insert(database, 1)), database.run(insert(database, 1)),
+                                       database.run(insert(database, 2)), return_exceptions=True)
+
+        return results, await item_ids(database)
+
+    results, ids = asyncio.run(scenario())
+
+    assert isinstance(results[1], IntegrityError)
+    assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+    assert ids == [1, 2]
+
+
+def test_writes_of_a_group_are_committed_together(tmp_path):
+    database = create_database(str(tmp_path / 'test.sqlite3'), StorageProfile(commit_window=0.05))
+    commits = []
+
+    async def scenario():
+        await create_items(database)
+        database.engine.dialect.do_commit = lambda connection: commits.append(connection.commit())
+        await asyncio.gather(*(database.run(insert(database, item_id)) for item_id in range(10)))
+
+        return await item_ids(database)
+
+    assert asyncio.run(scenario()) == list(range(10))
+    assert len(commits) == 1
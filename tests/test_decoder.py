@@ -0,0 +1,61 @@
+import pytest
+from marshmallow import ValidationError
+
+from data.smart_garden.decoder import PayloadDecoder, _UnsupportedPayload, _decode_circuit_fast
+
+CIRCUIT = {
+    'id': 7,
+    'name': 'tomatoes',
+    'active': True,
+    'healthy': True,
+    'unknown': 'ignored',
+    'one_time_activation': None,
+    'today_one_time_activations': [{'timestamp': '2024-03-01T12:00:00', 'amount': 100},
+                                   {'timestamp': '2024-03-01T18:00:00'}],
+    'schedule': [{'time': '06:00:00', 'amount': 50, 'active': True},
+                 {'time': '18:00:00', 'active': False},
+                 {'time': '12:00:00'}],
+}
+
+PAYLOADS = [
+    CIRCUIT,
+    {'id': 1},
+    {'id': 1, 'name': 'empty', 'active': False, 'schedule': [], 'today_one_time_activations': []},
+    {'id': 1, 'schedule': None, 'today_one_time_activations': None},
+]
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_fast_path_decodes_like_marshmallow(payload):
+    assert _decode_circuit_fast(payload) == PayloadDecoder(strict=True).decode_circuit(payload)
+
+
+@pytest.mark.parametrize('payload', [
+    {'id': '7', 'active': 'true'},
+    {'id': 1, 'schedule': [{'time': '06:00:00', 'amount': '50', 'active': 1}]},
+    {'id': 1, 'today_one_time_activations': [{'timestamp': '2024-03-01T12:00:00', 'amount': '5'}]},
+])
+def test_payloads_that_need_coercion_fall_back_to_marshmallow(payload):
+    with pytest.raises(_UnsupportedPayload):
+        _decode_circuit_fast(payload)
+
+    assert PayloadDecoder().decode_circuit(payload) == PayloadDecoder(strict=True).decode_circuit(payload)
+
+
+@pytest.mark.parametrize('payload', [
+    {'id': 1, 'today_one_time_activations': [{'amount': 5}]},
+    {'id': 1, 'schedule': [{'amount': 5}]},
+    {'id': 1, 'schedule': 'daily'},
+    {'id': 'seven'},
+])
+def test_invalid_payloads_raise_validation_error_on_both_paths(payload):
+    for strict in (False, True):
+        with pytest.raises(ValidationError):
+            PayloadDecoder(strict=strict).decode_circuit(payload)
+
+
+def test_all_one_time_activations_of_the_day_are_kept():
+    circuit = PayloadDecoder().decode_circuit(CIRCUIT)
+
+    assert [(a.timestamp, a.amount) for a in circuit.one_time_activations] == [('2024-03-01T12:00:00', 100),
+                                                                              ('2024-03-01T18:00:00', 0)]
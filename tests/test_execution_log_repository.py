@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from data.db.execution_log_dao import ExecutionLogDao
+from data.execution_log_repository import ExecutionLogRepository
+from data.smart_garden.exceptions import SmartGardenRejectedError, SmartGardenConnectionError
+from domain.model import PumpActivation
+
+
+class BackendStub:
+    """
+    Rejects batches and the single logs with the given amounts, or fails like an unreachable backend.
+    """
+
+    def __init__(self, reject_batches=False, rejected_amounts=(), offline=False) -> None:
+        self.reject_batches = reject_batches
+        self.rejected_amounts = set(rejected_amounts)
+        self.offline = offline
+        self.received = []
+
+    async def send_execution_logs(self, activations, circuit_id=None) -> bool:
+        if self.offline:
+            raise SmartGardenConnectionError()
+        if self.reject_batches:
+            raise SmartGardenRejectedError(response=SimpleNamespace(status=400))
+        self.received.extend(activation.amount for activation in activations)
+        return True
+
+    async def send_execution_log(self, activation, circuit_id=None) -> bool:
+        if activation.amount in self.rejected_amounts:
+            raise SmartGardenRejectedError(response=SimpleNamespace(status=422))
+        self.received.append(activation.amount)
+        return True
+
+
+def upload(database, backend: BackendStub, amounts) -> list:
+    dao = ExecutionLogDao(database=database)
+    repository = ExecutionLogRepository(dao, backend, logging.getLogger('test'))
+
+    async def scenario():
+        for i, amount in enumerate(amounts):
+            await repository.store(PumpActivation(timestamp='2024-03-01T12:00:{0:02d}'.format(i), amount=amount))
+        try:
+            await repository.upload(50)
+        except SmartGardenConnectionError:
+            pass
+        return [log.amount for log in await dao.fetch_batch(50)]
+
+    return asyncio.run(scenario())
+
+
+def test_uploaded_batch_is_removed_from_the_outbox(database):
+    backend = BackendStub()
+
+    assert upload(database, backend, [1, 2, 3]) == []
+    assert backend.received == [1, 2, 3]
+
+
+def test_logs_stay_in_the_outbox_while_the_backend_is_unreachable(database):
+    assert upload(database, BackendStub(offline=True), [1, 2, 3]) == [1, 2, 3]
+
+
+def test_rejected_batch_is_sent_one_by_one_and_rejected_logs_are_dropped(database):
+    backend = BackendStub(reject_batches=True, rejected_amounts=[2])
+
+    assert upload(database, backend, [1, 2, 3]) == []
+    assert backend.received == [1, 3]
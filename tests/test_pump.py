@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from device.flow_sensor import FlowSensor
+from device.pump import Pump
+
+gpiozero = pytest.importorskip('gpiozero')
+MockFactory = pytest.importorskip('gpiozero.pins.mock').MockFactory
+
+SENSOR_PIN = 27
+PUMP_PIN = 17
+
+
+@pytest.fixture
+def pins():
+    gpiozero.Device.pin_factory = MockFactory()
+    yield gpiozero.Device.pin_factory.pin(SENSOR_PIN), gpiozero.Device.pin_factory.pin(PUMP_PIN)
+    gpiozero.Device.pin_factory.reset()
+    gpiozero.Device.pin_factory = None
+
+
+def flow(sensor_pin, output_pin, stop: threading.Event) -> threading.Thread:
+    """
+    Sends a pulse of the flow sensor whenever the pump is on, like water flowing through the sensor.
+    """
+    def run():
+        while not stop.is_set():
+            if output_pin.state:
+                sensor_pin.drive_low()
+                sensor_pin.drive_high()
+            else:
+                time.sleep(0.001)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_pump_is_turned_off_at_the_target_pulse_count(pins):
+    sensor_pin, output_pin = pins
+    sensor = FlowSensor(SENSOR_PIN, pulses_per_litre=1000)
+    pump = Pump(PUMP_PIN, ml_per_second=1, flow_sensor=sensor)
+    stop = threading.Event()
+    thread = flow(sensor_pin, output_pin, stop)
+
+    try:
+        pump.on(50)
+        pulses = sensor.pulses
+        time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert pulses == 50
+    assert sensor.pulses == 50
+    assert not output_pin.state
+    # far more water flowed than 1 ml/s, so the flow was calibrated up
+    assert pump.ml_per_second > 1
+
+
+def test_safety_limit_turns_the_pump_off_without_pulses(pins):
+    _, output_pin = pins
+    pump = Pump(PUMP_PIN, ml_per_second=1000, flow_sensor=FlowSensor(SENSOR_PIN, pulses_per_litre=1000))
+
+    started = time.monotonic()
+    pump.on(100)
+
+    assert Pump.MAX_TIME_FACTOR * 0.1 <= time.monotonic() - started < 1
+    assert not output_pin.state
+
+
+def test_runs_without_measured_flow_are_not_used_for_calibration(pins):
+    pump = Pump(PUMP_PIN, ml_per_second=1000, flow_sensor=FlowSensor(SENSOR_PIN, pulses_per_litre=1000))
+
+    pump.on(100)
+    pump.on_async(100)
+    pump.off()
+
+    assert pump.ml_per_second == 1000
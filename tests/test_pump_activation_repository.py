@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+
+from data.db.pump_activation_dao import PumpActivationDao
+from data.pump_activation_repository import PumpActivationRepository
+from device.clock import Clock
+from domain.model import PumpActivation
+
+
+class FixedClock(Clock):
+    def __init__(self, now: datetime) -> None:
+        self.current = now
+
+    def now(self) -> datetime:
+        return self.current
+
+
+class CountingDao(PumpActivationDao):
+    """
+    Counts lookups that reach the database.
+    """
+
+    def __init__(self, database) -> None:
+        super().__init__(database)
+        self.lookups = 0
+        self.loads = 0
+
+    async def exists(self, timestamp, circuit_id=None) -> bool:
+        self.lookups += 1
+        return await super().exists(timestamp, circuit_id)
+
+    async def fetch_timestamps(self, since, circuit_id=None):
+        self.loads += 1
+        return await super().fetch_timestamps(since, circuit_id)
+
+
+def test_recent_slots_are_looked_up_in_memory(database):
+    dao = CountingDao(database)
+    repository = PumpActivationRepository(dao, circuit_id=1, clock=FixedClock(datetime(2024, 3, 2, 12)))
+
+    async def scenario():
+        await repository.store(PumpActivation(timestamp='2024-03-02T07:00:00', amount=100))
+        return [await repository.exists('2024-03-02T07:00:00'), await repository.exists('2024-03-01T07:00:00'),
+                await repository.exists('2024-03-02T08:00:00')]
+
+    assert asyncio.run(scenario()) == [True, False, False]
+    assert dao.lookups == 0
+    assert dao.loads == 1
+
+
+def test_index_is_loaded_from_the_database_for_the_circuit(database):
+    clock = FixedClock(datetime(2024, 3, 2, 12))
+    writer = PumpActivationRepository(PumpActivationDao(database), circuit_id=1, clock=clock)
+    other = PumpActivationRepository(PumpActivationDao(database), circuit_id=2, clock=clock)
+
+    async def scenario():
+        await writer.store(PumpActivation(timestamp='2024-03-01T07:00:00', amount=100))
+        await other.store(PumpActivation(timestamp='2024-03-02T07:00:00', amount=100))
+
+        reader = PumpActivationRepository(PumpActivationDao(database), circuit_id=1, clock=clock)
+        return [await reader.exists('2024-03-01T07:00:00'), await reader.exists('2024-03-02T07:00:00')]
+
+    assert asyncio.run(scenario()) == [True, False]
+
+
+def test_slots_older_than_the_window_are_looked_up_in_the_database(database):
+    dao = CountingDao(database)
+    clock = FixedClock(datetime(2024, 3, 2, 12))
+    repository = PumpActivationRepository(dao, circuit_id=1, clock=clock)
+
+    async def scenario():
+        await repository.store(PumpActivation(timestamp='2024-03-01T07:00:00', amount=100))
+        clock.current = datetime(2024, 3, 3, 0, 0, 1)
+        in_window = await repository.exists('2024-03-02T07:00:00')
+        lookups = dao.lookups
+
+        # the day rolled out of the window, it's still found in the database
+        return in_window, lookups, await repository.exists('2024-03-01T07:00:00')
+
+    assert asyncio.run(scenario()) == (False, 0, True)
+    assert dao.lookups == 1
+    assert dao.loads == 1
@@ -0,0 +1,75 @@
+import asyncio
+
+from data.db.maintenance_dao import MaintenanceDao
+from data.db.pump_activation_dao import PumpActivationDao
+from data.db.pump_activation_rollup_dao import PumpActivationRollupDao
+from data.pump_activation_repository import PumpActivationRepository
+from data.retention_repository import RetentionRepository
+from domain.model import PumpActivation, PumpActivationRollup
+
+
+def store(database, circuit_id, *activations) -> PumpActivationRepository:
+    repository = PumpActivationRepository(PumpActivationDao(database), circuit_id=circuit_id,
+                                          rollup_dao=PumpActivationRollupDao(database))
+
+    async def scenario():
+        for timestamp, amount in activations:
+            await repository.store(PumpActivation(timestamp=timestamp, amount=amount))
+
+    asyncio.run(scenario())
+    return repository
+
+
+def compact_all(retention: RetentionRepository, before: str) -> list:
+    async def scenario():
+        compacted = []
+        while True:
+            count = await retention.compact(before)
+            if not count:
+                return compacted
+            compacted.append(count)
+
+    return asyncio.run(scenario())
+
+
+def test_old_activations_are_compacted_into_daily_rollups_per_circuit(database):
+    single = store(database, 1, ('2024-03-01T07:00:00', 100), ('2024-03-01T19:00:00', 200),
+                   ('2024-03-02T07:00:00', 50), ('2024-03-03T07:00:00', 70))
+    other = store(database, 2, ('2024-03-01T08:00:00', 30))
+    retention = RetentionRepository(PumpActivationRollupDao(database), MaintenanceDao(database))
+
+    # one day per call, both circuits of the day at once
+    assert compact_all(retention, '2024-03-03T00:00:00') == [3, 1]
+
+    assert asyncio.run(single.fetch_rollups()) == [
+        PumpActivationRollup(day='2024-03-01', count=2, amount=300, first_timestamp='2024-03-01T07:00:00',
+                             last_timestamp='2024-03-01T19:00:00', circuit_id=1),
+        PumpActivationRollup(day='2024-03-02', count=1, amount=50, first_timestamp='2024-03-02T07:00:00',
+                             last_timestamp='2024-03-02T07:00:00', circuit_id=1)]
+    assert asyncio.run(other.fetch_rollups()) == [
+        PumpActivationRollup(day='2024-03-01', count=1, amount=30, first_timestamp='2024-03-01T08:00:00',
+                             last_timestamp='2024-03-01T08:00:00', circuit_id=2)]
+    assert [activation.timestamp for activation in asyncio.run(single.fetch())] == ['2024-03-03T07:00:00']
+    assert asyncio.run(other.fetch()) == []
+
+
+def test_cutoff_within_a_day_extends_its_rollup_later(database):
+    repository = store(database, None, ('2024-03-01T07:00:00', 100), ('2024-03-01T19:00:00', 200))
+    retention = RetentionRepository(PumpActivationRollupDao(database), MaintenanceDao(database))
+
+    assert compact_all(retention, '2024-03-01T12:00:00') == [1]
+    assert [activation.amount for activation in asyncio.run(repository.fetch())] == [200]
+
+    assert compact_all(retention, '2024-03-02T00:00:00') == [1]
+    assert asyncio.run(repository.fetch_rollups()) == [
+        PumpActivationRollup(day='2024-03-01', count=2, amount=300, first_timestamp='2024-03-01T07:00:00',
+                             last_timestamp='2024-03-01T19:00:00')]
+
+
+def test_nothing_is_compacted_within_the_retention_period(database):
+    repository = store(database, None, ('2024-03-01T07:00:00', 100))
+    retention = RetentionRepository(PumpActivationRollupDao(database), MaintenanceDao(database))
+
+    assert compact_all(retention, '2024-03-01T00:00:00') == []
+    assert asyncio.run(repository.fetch_rollups()) == []
+    assert len(asyncio.run(repository.fetch())) == 1
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+from data.model.model import CircuitData
+from domain.model import Circuit
+from interactors.run_circuit_subscription_loop import RunCircuitSubscriptionLoop
+
+
+class RepositoryStub:
+    def __init__(self, circuit=None) -> None:
+        self.circuit = circuit
+        self.subscribed = False
+        self.applied = []
+
+    async def apply(self, circuit_data: CircuitData) -> None:
+        self.applied.append(circuit_data.id)
+
+
+class BackendStub:
+    def __init__(self, pushed) -> None:
+        self._pushed = pushed
+
+    async def subscribe(self):
+        for circuit_id in self._pushed:
+            yield CircuitData(id=circuit_id, name=str(circuit_id), active=True, one_time_activations=[], schedule=[])
+        await asyncio.sleep(3600)
+
+
+def push(repositories, pushed) -> None:
+    async def scenario():
+        loop = RunCircuitSubscriptionLoop(BackendStub(pushed), repositories, logging.getLogger('test'))
+        task = asyncio.ensure_future(loop.execute())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_pushed_circuits_are_applied_to_their_repositories():
+    repositories = {1: RepositoryStub(), 2: RepositoryStub()}
+    push(repositories, [2, 1, 3])
+
+    assert repositories[1].applied == [1]
+    assert repositories[2].applied == [2]
+
+
+def test_single_circuit_repository_ignores_other_circuits_of_the_account():
+    repository = RepositoryStub(Circuit(id=5, name='5', active=True, one_time_activations=[], schedule=[]))
+    push({None: repository}, [5, 6, 5])
+
+    assert repository.applied == [5, 5]
+
+
+def test_single_circuit_repository_ignores_pushes_until_it_has_synced():
+    repository = RepositoryStub()
+    push({None: repository}, [5])
+
+    assert repository.applied == []
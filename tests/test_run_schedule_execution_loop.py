@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from device.clock import Clock
+from domain.model import Circuit, ScheduledActivation
+from interactors import run_schedule_execution_loop
+from interactors.run_schedule_execution_loop import RunScheduleExecutionLoop
+
+
+class FixedClock(Clock):
+    def now(self) -> datetime:
+        return datetime(2024, 3, 1, 7, 0, 30)
+
+
+class FetchCircuitStub:
+    """
+    Returns the same snapshot on every tick and stops the loop after the given number of ticks.
+    """
+
+    def __init__(self, circuit: Circuit, ticks: int) -> None:
+        self._circuit = circuit
+        self._ticks = ticks
+
+    def execute(self) -> Circuit:
+        return self._circuit
+
+    async def wait_for_update(self, timeout=None) -> None:
+        self._ticks -= 1
+        if not self._ticks:
+            raise asyncio.CancelledError()
+
+
+class ActivatePumpStub:
+    def __init__(self) -> None:
+        self.executed = []
+
+    async def execute(self, timestamp: str, water: int) -> None:
+        self.executed.append(timestamp)
+
+
+class RepositoryStub:
+    async def exists(self, timestamp: str) -> bool:
+        return False
+
+
+def test_circuit_is_queued_again_after_the_rebuild_failed(monkeypatch):
+    failures = []
+
+    def activation_queue(*args):
+        if failures:
+            raise failures.pop()
+        return queue_type(*args)
+
+    queue_type = run_schedule_execution_loop.ActivationQueue
+    monkeypatch.setattr(run_schedule_execution_loop, 'ActivationQueue', activation_queue)
+
+    circuit = Circuit(id=1, name='test', active=True, one_time_activations=[],
+                      schedule=[ScheduledActivation(time='07:00:00', amount=10, active=True)])
+    activate_pump = ActivatePumpStub()
+    loop = RunScheduleExecutionLoop(FetchCircuitStub(circuit, ticks=2), activate_pump, RepositoryStub(),
+                                    logging.getLogger('test'), clock=FixedClock())
+    failures.append(ValueError('broken schedule'))
+
+    try:
+        asyncio.run(loop.execute())
+    except asyncio.CancelledError:
+        pass
+
+    assert activate_pump.executed == ['2024-03-01T07:00:00']
@@ -0,0 +1,30 @@
+import asyncio
+import logging
+
+from interactors.run_supervised_loop import RunSupervisedLoop
+
+
+def test_crashed_loop_is_restarted_without_affecting_the_others():
+    runs = {'failing': 0, 'healthy': 0}
+
+    async def failing():
+        runs['failing'] += 1
+        raise RuntimeError('crash')
+
+    async def healthy():
+        runs['healthy'] += 1
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        loops = [RunSupervisedLoop(failing, 'failing', logging.getLogger('test'), restart_delay=0.01),
+                 RunSupervisedLoop(healthy, 'healthy', logging.getLogger('test'), restart_delay=0.01)]
+        tasks = [asyncio.ensure_future(loop.execute()) for loop in loops]
+        await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert runs['failing'] > 2
+    assert runs['healthy'] == 1
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+from domain.model import Circuit, OneTimeActivation, ScheduledActivation
+from domain.schedule import EXECUTION_MARGIN, ActivationQueue, CompiledSchedule
+
+MARGIN = timedelta(minutes=EXECUTION_MARGIN)
+
+
+def circuit(times, one_time=(), active=True) -> Circuit:
+    return Circuit(id=1, name='test', active=active,
+                   one_time_activations=[OneTimeActivation(timestamp=timestamp, amount=amount)
+                                         for timestamp, amount in one_time],
+                   schedule=[ScheduledActivation(time=time, amount=10, active=True) for time in times])
+
+
+def timestamps(activations) -> list:
+    return [activation.timestamp for activation in activations]
+
+
+def test_compiled_schedule_skips_inactive_slots_and_sorts_the_rest():
+    schedule = CompiledSchedule([ScheduledActivation(time='18:00:00', amount=2, active=True),
+                                 ScheduledActivation(time='06:30:00', amount=1, active=True),
+                                 ScheduledActivation(time='12:00:00', amount=3, active=False)])
+
+    assert schedule.offsets == [6 * 3600 + 30 * 60, 18 * 3600]
+    assert schedule.amounts == [1, 2]
+    assert schedule.times == ['06:30:00', '18:00:00']
+
+
+def test_compiled_schedule_skips_slots_with_invalid_time(caplog):
+    schedule = CompiledSchedule(circuit(['18:00:00', '07:00', 'noon', '06:30:00']).schedule)
+
+    assert schedule.times == ['06:30:00', '18:00:00']
+    assert ["'07:00'" in message for message in caplog.messages] == [True, False]
+
+
+def test_between_includes_both_ends_and_spans_midnight():
+    schedule = CompiledSchedule(circuit(['00:00:00', '12:00:00', '23:59:59']).schedule)
+
+    due = schedule.between(datetime(2024, 3, 1, 12, 0), datetime(2024, 3, 2, 12, 0))
+
+    assert timestamps(due) == ['2024-03-01T12:00:00', '2024-03-01T23:59:59', '2024-03-02T00:00:00',
+                               '2024-03-02T12:00:00']
+
+
+def test_between_rounds_a_start_with_microseconds_up():
+    schedule = CompiledSchedule(circuit(['12:00:00']).schedule)
+
+    assert schedule.between(datetime(2024, 3, 1, 12, 0, 0, 1), datetime(2024, 3, 1, 13, 0)) == []
+
+
+def test_next_instant_rolls_over_midnight():
+    schedule = CompiledSchedule(circuit(['06:00:00']).schedule)
+
+    assert schedule.next_instant(datetime(2024, 12, 31, 6, 0)) == datetime(2024, 12, 31, 6, 0)
+    assert schedule.next_instant(datetime(2024, 12, 31, 6, 0, 1)) == datetime(2025, 1, 1, 6, 0)
+
+
+def test_next_instant_of_an_empty_schedule_is_none():
+    assert CompiledSchedule([]).next_instant(datetime(2024, 3, 1)) is None
+
+
+def test_queue_of_an_inactive_circuit_is_empty():
+    queue = ActivationQueue(circuit(['12:00:00'], active=False), datetime(2024, 3, 1, 12, 0), MARGIN)
+
+    assert queue.next_instant() is None
+    assert queue.pop_due(datetime(2024, 3, 1, 12, 0)) == []
+
+
+def test_queue_catches_up_activations_missed_within_the_margin():
+    now = datetime(2024, 3, 1, 12, 0)
+    queue = ActivationQueue(circuit(['10:59:59', '11:00:00', '11:30:00']), now, MARGIN)
+
+    assert timestamps(queue.pop_due(now)) == ['2024-03-01T11:00:00', '2024-03-01T11:30:00']
+
+
+def test_queue_pops_every_activation_once():
+    now = datetime(2024, 3, 1, 12, 0)
+    queue = ActivationQueue(circuit(['12:00:00']), now, MARGIN)
+
+    assert timestamps(queue.pop_due(now)) == ['2024-03-01T12:00:00']
+    assert queue.pop_due(now) == []
+    assert queue.pop_due(now + timedelta(seconds=30)) == []
+    assert queue.next_instant() == datetime(2024, 3, 2, 12, 0)
+
+
+def test_queue_rolls_over_midnight():
+    queue = ActivationQueue(circuit(['00:00:05', '23:59:55']), datetime(2024, 2, 28, 23, 0), MARGIN)
+    queue.pop_due(datetime(2024, 2, 28, 23, 0))
+
+    assert queue.next_instant() == datetime(2024, 2, 28, 23, 59, 55)
+    assert timestamps(queue.pop_due(datetime(2024, 2, 28, 23, 59, 55))) == ['2024-02-28T23:59:55']
+    assert queue.next_instant() == datetime(2024, 2, 29, 0, 0, 5)
+    assert timestamps(queue.pop_due(datetime(2024, 2, 29, 0, 0, 5))) == ['2024-02-29T00:00:05']
+
+
+def test_queue_drops_activations_older_than_the_margin_after_a_suspension():
+    queue = ActivationQueue(circuit(['08:00:00', '10:00:00', '11:30:00']), datetime(2024, 3, 1, 7, 0), MARGIN)
+    queue.pop_due(datetime(2024, 3, 1, 7, 0))
+
+    assert timestamps(queue.pop_due(datetime(2024, 3, 1, 11, 45))) == ['2024-03-01T11:30:00']
+
+
+def test_queue_returns_nothing_before_the_time_it_was_popped_at():
+    queue = ActivationQueue(circuit(['12:00:00']), datetime(2024, 3, 1, 12, 0), MARGIN)
+    queue.pop_due(datetime(2024, 3, 1, 12, 0))
+
+    assert queue.pop_due(datetime(2024, 3, 1, 11, 0)) == []
+
+
+def test_queue_orders_one_time_activations_among_slots():
+    now = datetime(2024, 3, 1, 12, 0)
+    queue = ActivationQueue(circuit(['12:30:00'], one_time=[('2024-03-01T13:00:00', 5), ('2024-03-01T12:10:00', 7)]),
+                            now, MARGIN)
+    queue.pop_due(now)
+
+    assert queue.next_instant() == datetime(2024, 3, 1, 12, 10)
+    due = queue.pop_due(datetime(2024, 3, 1, 13, 0))
+    assert timestamps(due) == ['2024-03-01T12:10:00', '2024-03-01T12:30:00', '2024-03-01T13:00:00']
+    assert [activation.amount for activation in due] == [7, 10, 5]
+    assert queue.next_instant() == datetime(2024, 3, 2, 12, 30)
+
+
+def test_queue_skips_one_time_activations_older_than_the_margin():
+    now = datetime(2024, 3, 1, 12, 0)
+    queue = ActivationQueue(circuit([], one_time=[('2024-03-01T10:59:59', 5), ('2024-03-01T11:15:00', 7)]), now,
+                            MARGIN)
+
+    assert timestamps(queue.pop_due(now)) == ['2024-03-01T11:15:00']
+    assert queue.next_instant() is None
+
+
+def test_queue_drops_one_time_activations_missed_during_a_suspension():
+    queue = ActivationQueue(circuit([], one_time=[('2024-03-01T09:00:00', 5)]), datetime(2024, 3, 1, 8, 0), MARGIN)
+
+    assert queue.pop_due(datetime(2024, 3, 1, 10, 30)) == []
+    assert queue.next_instant() is None
+
+
+def test_queue_fires_the_valid_activations_of_a_circuit_with_invalid_ones():
+    now = datetime(2024, 3, 1, 12, 0)
+    queue = ActivationQueue(circuit(['11:30:00', '07:00', '12:30:00'],
+                                    one_time=[('2024-03-01 12:10', 5), ('2024-03-01T12:20:00', 7)]), now, MARGIN)
+
+    assert timestamps(queue.pop_due(now)) == ['2024-03-01T11:30:00']
+    assert timestamps(queue.pop_due(datetime(2024, 3, 1, 12, 30))) == ['2024-03-01T12:20:00', '2024-03-01T12:30:00']